@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: fused clean_and_split vs the original multi-pass cleaner.
+
+Collects message texts from a synthetic export and times both cleaning
+paths over the same corpus, best of several repeats. The baseline is a
+frozen copy of the pre-fusion pipeline (three regex passes in clean_text,
+then findall plus sub in separate_code):
+
+    python benchmarks/bench_clean.py --conversations 2000 --code-ratio 0.3
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+
+from chatgpt_search.synthetic import SyntheticConfig, generate_export, parse_language_mix
+from chatgpt_search.utils import clean_and_split
+
+_PUA_PATTERN = re.compile(r"[\ue000-\uf8ff]")
+_CITETURN_PATTERN = re.compile(r"citeturn\d+\w+\d*")
+_CODE_BLOCK_PATTERN = re.compile(r"```(?:\w+)?\s*\n(.*?)```", re.DOTALL)
+
+
+def _corpus(config: SyntheticConfig) -> list[str]:
+    texts = []
+    for conv in generate_export(config):
+        for node in conv["mapping"].values():
+            message = node["message"]
+            if message and message["content"]["parts"][0]:
+                texts.append(message["content"]["parts"][0])
+    return texts
+
+
+def _legacy(text: str) -> tuple[str, str]:
+    text = _PUA_PATTERN.sub("", text)
+    text = _CITETURN_PATTERN.sub("", text)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    code_blocks = _CODE_BLOCK_PATTERN.findall(text)
+    prose = _CODE_BLOCK_PATTERN.sub("", text).strip()
+    code = "\n\n".join(block.strip() for block in code_blocks if block.strip())
+    return prose, code
+
+
+def _best_of(func, texts: list[str], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--code-ratio", type=float, default=0.2)
+    parser.add_argument("--citation-ratio", type=float, default=0.05)
+    parser.add_argument("--langs", default="en=0.7,ru=0.15,de=0.1,es=0.05")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = SyntheticConfig(
+        conversations=args.conversations,
+        code_ratio=args.code_ratio,
+        citation_ratio=args.citation_ratio,
+        languages=parse_language_mix(args.langs),
+        seed=args.seed,
+    )
+    print(f"Generating {config.conversations} conversations...", file=sys.stderr)
+    texts = _corpus(config)
+    mb = sum(len(t.encode("utf-8")) for t in texts) / (1024 * 1024)
+
+    results = {"messages": len(texts), "mb": round(mb, 2)}
+    for name, func in (("legacy", _legacy), ("fused", clean_and_split)):
+        seconds = _best_of(func, texts, args.repeats)
+        results[name] = {
+            "seconds": round(seconds, 4),
+            "mb_per_s": round(mb / seconds, 1),
+            "messages_per_s": round(len(texts) / seconds),
+        }
+    results["speedup"] = round(
+        results["legacy"]["seconds"] / results["fused"]["seconds"], 2
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""Benchmark harness for chatgpt-search.
+
+Generates a deterministic synthetic export, then measures parse throughput,
+index build time, database size, enrichment time, search latency
+percentiles per query type and CLI import time. Results are written as JSON so runs can be
+compared across commits:
+
+    python benchmarks/run_benchmarks.py --conversations 2000 --out before.json
+    git checkout my-branch
+    python benchmarks/run_benchmarks.py --conversations 2000 --out after.json \\
+        --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from chatgpt_search.db import init_db
+from chatgpt_search.enrichment import extract_keywords_tfidf
+from chatgpt_search.indexer import build_index
+from chatgpt_search.parser import parse_export
+from chatgpt_search.searcher import search, search_many
+from chatgpt_search.synthetic import (
+    MODELS,
+    VOCABULARY,
+    SyntheticConfig,
+    parse_language_mix,
+    write_export,
+)
+
+QUERY_TYPES = [
+    "term",
+    "multi_term",
+    "phrase",
+    "prefix",
+    "role_filter",
+    "model_filter",
+    "lang_filter",
+    "date_filter",
+]
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def _latency_summary(samples_ms: list[float]) -> dict:
+    values = sorted(samples_ms)
+    return {
+        "n": len(values),
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(_percentile(values, 50), 3),
+        "p95_ms": round(_percentile(values, 95), 3),
+        "p99_ms": round(_percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def _make_queries(
+    query_type: str, n: int, langs: list[str], rng: random.Random
+) -> list[dict]:
+    """Build n search() keyword-argument dicts for one query type."""
+    queries = []
+    for _ in range(n):
+        lang = rng.choice(langs)
+        # Skip short function words; they match nearly everything
+        vocab = [w for w in VOCABULARY[lang] if len(w) > 3] or VOCABULARY[lang]
+        word = rng.choice(vocab)
+        q: dict = {"query": word}
+        if query_type == "multi_term":
+            q["query"] = f"{word} {rng.choice(vocab)}"
+        elif query_type == "phrase":
+            q["query"] = f'"{word} {rng.choice(vocab)}"'
+        elif query_type == "prefix":
+            q["query"] = word[: max(3, len(word) // 2)] + "*"
+        elif query_type == "role_filter":
+            q["role"] = rng.choice(["user", "assistant"])
+        elif query_type == "model_filter":
+            q["model"] = rng.choice(MODELS)
+        elif query_type == "lang_filter":
+            q["lang"] = lang
+        elif query_type == "date_filter":
+            q["since"] = 1672531200.0 + rng.randint(0, 730) * 86400
+            q["until"] = q["since"] + 180 * 86400
+        queries.append(q)
+    return queries
+
+
+def bench_parse(export_path: Path) -> dict:
+    size = export_path.stat().st_size
+    start = time.perf_counter()
+    conversations = 0
+    messages = 0
+    for conv in parse_export(export_path, progress=False):
+        conversations += 1
+        messages += conv.message_count
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": round(elapsed, 3),
+        "bytes": size,
+        "mb_per_s": round(size / (1024 * 1024) / elapsed, 2),
+        "conversations_per_s": round(conversations / elapsed, 1),
+        "messages_per_s": round(messages / elapsed, 1),
+    }
+
+
+def bench_index(export_path: Path, db_path: Path, workers: int) -> dict:
+    start = time.perf_counter()
+    stats = build_index(
+        export_path, db_path, rebuild=True, progress=False, workers=workers
+    )
+    elapsed = time.perf_counter() - start
+
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+    return {
+        "seconds": round(elapsed, 3),
+        "workers": workers,
+        "conversations": stats["conversation_count"],
+        "messages": stats["message_count"],
+        "keywords": stats.get("keyword_count", 0),
+        "db_size_mb": round(db_path.stat().st_size / (1024 * 1024), 3),
+    }
+
+
+def bench_enrichment(db_path: Path) -> dict:
+    conn = init_db(db_path)
+    try:
+        conn.execute("DELETE FROM keywords")
+        conn.commit()
+        start = time.perf_counter()
+        keywords = extract_keywords_tfidf(conn, progress=False)
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.close()
+    return {"seconds": round(elapsed, 3), "keywords": keywords}
+
+
+def bench_search(
+    db_path: Path, langs: list[str], per_type: int, seed: int
+) -> dict:
+    rng = random.Random(seed)
+    results = {}
+    for query_type in QUERY_TYPES:
+        samples = []
+        hits = 0
+        for q in _make_queries(query_type, per_type, langs, rng):
+            start = time.perf_counter()
+            found = search(db_path, **q)
+            samples.append((time.perf_counter() - start) * 1000)
+            hits += len(found)
+        summary = _latency_summary(samples)
+        summary["avg_hits"] = round(hits / max(1, len(samples)), 2)
+        results[query_type] = summary
+    return results
+
+
+def bench_batch(
+    db_path: Path, langs: list[str], n: int, seed: int
+) -> dict:
+    """Compare n multi-term searches run one by one against search_many."""
+    rng = random.Random(seed)
+    queries = [q["query"] for q in _make_queries("multi_term", n, langs, rng)]
+
+    start = time.perf_counter()
+    for query in queries:
+        search(db_path, query)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in search_many(db_path, queries):
+        pass
+    batch = time.perf_counter() - start
+
+    return {
+        "queries": len(queries),
+        "single_ms_per_query": round(single * 1000 / len(queries), 3),
+        "batch_ms_per_query": round(batch * 1000 / len(queries), 3),
+        "speedup": round(single / batch, 2) if batch > 0 else 0.0,
+    }
+
+
+# Modules a query command should never pay for at startup
+_HEAVY_MODULES = (
+    "chatgpt_search.indexer",
+    "chatgpt_search.enrichment",
+    "chatgpt_search.languages",
+    "sklearn",
+    "langdetect",
+)
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def bench_startup(runs: int) -> dict:
+    """Measure `import chatgpt_search.cli` with `python -X importtime`.
+
+    Each run is a fresh interpreter. Reports the median cumulative import
+    time of the CLI module, process wall time, and which heavy modules a
+    plain search pays for.
+    """
+    import statistics
+
+    cumulative_us = []
+    wall_ms = []
+    modules: dict[str, list[int]] = {}
+    heavy: set[str] = set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import chatgpt_search.cli"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        wall_ms.append((time.perf_counter() - start) * 1000)
+        for line in proc.stderr.splitlines():
+            m = _IMPORTTIME_LINE.match(line)
+            if m is None:
+                continue
+            cumulative, name = int(m.group(2)), m.group(4)
+            if name in _HEAVY_MODULES:
+                heavy.add(name)
+            if name == "chatgpt_search.cli":
+                cumulative_us.append(cumulative)
+            elif name.startswith("chatgpt_search"):
+                modules.setdefault(name, []).append(cumulative)
+
+    return {
+        "runs": runs,
+        "cli_import_ms": round(statistics.median(cumulative_us) / 1000, 2),
+        "process_wall_ms": round(statistics.median(wall_ms), 2),
+        "modules_ms": {
+            name: round(statistics.median(v) / 1000, 2)
+            for name, v in sorted(modules.items())
+        },
+        "heavy_modules": sorted(heavy),
+    }
+
+
+def _flatten(d: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in d.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old: dict, new: dict) -> None:
+    """Print metric deltas between two result files."""
+    sections = [k for k in new if k != "meta"]
+    old_flat = _flatten({k: old.get(k, {}) for k in sections})
+    new_flat = _flatten({k: new[k] for k in sections})
+    print(
+        f"\n  {'Metric':<40} {'Old':>12} {'New':>12} {'Change':>9}",
+    )
+    print(f"  {'─'*40} {'─'*12} {'─'*12} {'─'*9}")
+    for name, new_value in new_flat.items():
+        old_value = old_flat.get(name)
+        if old_value is None:
+            continue
+        change = (
+            f"{(new_value - old_value) / old_value * 100:+.1f}%"
+            if old_value
+            else "n/a"
+        )
+        print(f"  {name:<40} {old_value:>12} {new_value:>12} {change:>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--min-turns", type=int, default=2)
+    parser.add_argument("--max-turns", type=int, default=10)
+    parser.add_argument(
+        "--branching",
+        type=float,
+        default=0.1,
+        help="Chance an assistant turn has regenerated siblings",
+    )
+    parser.add_argument("--min-words", type=int, default=10)
+    parser.add_argument("--max-words", type=int, default=150)
+    parser.add_argument("--code-ratio", type=float, default=0.2)
+    parser.add_argument(
+        "--langs",
+        default="en=0.7,ru=0.15,de=0.1,es=0.05",
+        help="Language mix, e.g. en=0.7,ru=0.2,de=0.1",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--queries", type=int, default=50, help="Queries per query type"
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--startup-runs",
+        type=int,
+        default=10,
+        help="Fresh interpreters for the CLI import-time benchmark",
+    )
+    parser.add_argument(
+        "--zip", action="store_true", help="Generate the export as a .zip"
+    )
+    parser.add_argument("--workdir", help="Keep generated files in this directory")
+    parser.add_argument("--out", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Previous results JSON to diff against")
+    args = parser.parse_args()
+
+    config = SyntheticConfig(
+        conversations=args.conversations,
+        min_turns=args.min_turns,
+        max_turns=args.max_turns,
+        branching=args.branching,
+        min_words=args.min_words,
+        max_words=args.max_words,
+        code_ratio=args.code_ratio,
+        languages=parse_language_mix(args.langs),
+        seed=args.seed,
+    )
+
+    tmp = None
+    if args.workdir:
+        workdir = Path(args.workdir)
+        workdir.mkdir(parents=True, exist_ok=True)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="chatgpt-search-bench-")
+        workdir = Path(tmp.name)
+
+    try:
+        export_path = workdir / (
+            "export.zip" if args.zip else "conversations.json"
+        )
+        db_path = workdir / "index.db"
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+
+        print(f"Generating {config.conversations} conversations...", file=sys.stderr)
+        write_export(export_path, config)
+
+        print("Benchmarking parse...", file=sys.stderr)
+        parse = bench_parse(export_path)
+        print("Benchmarking index build...", file=sys.stderr)
+        index = bench_index(export_path, db_path, args.workers)
+        print("Benchmarking enrichment...", file=sys.stderr)
+        enrichment = bench_enrichment(db_path)
+        print("Benchmarking search...", file=sys.stderr)
+        search_results = bench_search(
+            db_path, list(config.languages), args.queries, args.seed
+        )
+        print("Benchmarking batch search...", file=sys.stderr)
+        batch = bench_batch(
+            db_path, list(config.languages), args.queries, args.seed
+        )
+        print("Benchmarking CLI startup...", file=sys.stderr)
+        startup = bench_startup(args.startup_runs)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "config": vars(config),
+            "queries_per_type": args.queries,
+        },
+        "parse": parse,
+        "index": index,
+        "enrichment": enrichment,
+        "search": search_results,
+        "batch": batch,
+        "startup": startup,
+    }
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+        print(f"Results written to {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        compare(old, results)
+
+
+if __name__ == "__main__":
+    main()
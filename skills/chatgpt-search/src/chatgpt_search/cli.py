@@ -2,25 +2,44 @@
 
 import argparse
 import json
+import os
 import sqlite3
 import sys
+from dataclasses import asdict
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from . import __version__
-from .indexer import build_index
 from .searcher import (
+    LIST_SORTS,
+    QueryTrace,
+    SearchFacets,
+    TIMELINE_BUCKETS,
+    fuzzy_search,
     get_conversation,
     get_conversation_keywords,
+    get_slow_queries,
+    get_slow_query_summary,
     get_stats,
+    get_timeline,
     get_top_keywords,
+    list_conversations,
+    parse_rank_profile,
     search,
+    search_code,
+    search_many,
 )
-from .languages import LANGUAGE_NAMES
-from .utils import format_timestamp, parse_date_filter
+from .utils import format_timestamp, parse_date_filter, truncate
+
+# Query commands import only the searcher. The indexer, enrichment and
+# languages modules (stopword tables, sklearn, langdetect) are imported
+# inside the commands that need them, keeping per-call startup low.
 
 
 def _lang_display_name(code: str) -> str:
     """Format a language code for display, e.g. 'en (English)'."""
+    from .languages import LANGUAGE_NAMES
+
     name = LANGUAGE_NAMES.get(code, "")
     if name:
         return f"{code} ({name})"
@@ -31,6 +50,9 @@ def _lang_display_name(code: str) -> str:
 DEFAULT_DB = Path.home() / ".chatgpt-search" / "index.db"
 DEFAULT_EXPORT = None  # Must be provided for --rebuild
 
+# Slow query log threshold in ms (unset = no logging)
+SLOW_MS_ENV = "CHATGPT_SEARCH_SLOW_MS"
+
 
 def _find_db(args_db: str | None) -> Path:
     """Resolve database path."""
@@ -52,8 +74,9 @@ def _ensure_db_exists(db_path: Path) -> None:
 
     conn = None
     try:
-        # Open read-write without creating new files and validate SQLite parsing.
-        conn = sqlite3.connect(f"file:{db_path}?mode=rw", uri=True)
+        # Open read-only (snapshots may sit on read-only storage) without
+        # creating new files, and validate SQLite parsing.
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
         conn.execute("SELECT 1").fetchone()
     except sqlite3.DatabaseError as e:
         print(
@@ -76,27 +99,63 @@ def cmd_search(args: argparse.Namespace) -> None:
     try:
         since = parse_date_filter(args.since) if args.since else None
         until = parse_date_filter(args.until) if args.until else None
+        rank_profile = parse_rank_profile(args.rank) if args.rank else None
     except ValueError as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
 
     lang_filter = getattr(args, "lang", None)
+    trace = QueryTrace() if args.trace else None
+    facets = SearchFacets() if args.facets else None
 
-    try:
-        results = search(
-            db_path=db_path,
-            query=args.query,
-            role=args.role,
-            model=args.model,
-            since=since,
-            until=until,
-            lang=lang_filter,
-            limit=args.limit,
+    if args.fuzzy and (trace is not None or facets is not None or rank_profile):
+        print(
+            "Error: --fuzzy cannot be combined with --trace, --facets or --rank",
+            file=sys.stderr,
         )
+        sys.exit(1)
+
+    try:
+        if args.fuzzy:
+            results = fuzzy_search(
+                db_path=db_path,
+                query=args.query,
+                role=args.role,
+                model=args.model,
+                since=since,
+                until=until,
+                lang=lang_filter,
+                limit=args.limit,
+                include_branches=args.include_branches,
+                slow_ms=args.slow_ms,
+            )
+        else:
+            results = search(
+                db_path=db_path,
+                query=args.query,
+                role=args.role,
+                model=args.model,
+                since=since,
+                until=until,
+                lang=lang_filter,
+                limit=args.limit,
+                trace=trace,
+                slow_ms=args.slow_ms,
+                facets=facets,
+                collapse=not args.show_duplicates,
+                include_branches=args.include_branches,
+                rank_profile=rank_profile,
+            )
     except ValueError as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
 
+    if trace is not None:
+        _print_trace(trace)
+
+    if facets is not None:
+        _print_facets(facets)
+
     if not results:
         print("No results found.")
         return
@@ -121,8 +180,12 @@ def cmd_search(args: argparse.Namespace) -> None:
         print()
 
         for r in conv_results:
-            role_tag = f"[{r.role}]"
+            role_tag = f"[{r.role}]" if r.is_canonical else f"[{r.role}*]"
             print(f"    {role_tag:12} {r.content_snippet}")
+            if r.duplicates:
+                print(f"    {'':12} (+{r.duplicates} identical elsewhere)")
+            if r.similar:
+                print(f"    {'':12} (+{r.similar} similar)")
             if r.code_snippet:
                 print(f"    {'':12} code: {r.code_snippet}")
             print()
@@ -130,12 +193,313 @@ def cmd_search(args: argparse.Namespace) -> None:
         print(f"  {'─'*60}\n")
 
 
+def _read_batch_queries(stream: Iterable[str]) -> Iterator[str]:
+    """Yield queries from JSONL lines: a JSON string or {"query": ...}."""
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Warning: Skipping batch line {line_no}: {e}", file=sys.stderr)
+            continue
+        query = item.get("query") if isinstance(item, dict) else item
+        if not isinstance(query, str) or not query.strip():
+            print(
+                f"Warning: Skipping batch line {line_no}: no query string",
+                file=sys.stderr,
+            )
+            continue
+        yield query
+
+
+def cmd_batch(args: argparse.Namespace) -> None:
+    """Run JSONL queries from stdin over one connection, streaming JSONL results."""
+    db_path = _find_db(args.db)
+    _ensure_db_exists(db_path)
+
+    try:
+        since = parse_date_filter(args.since) if args.since else None
+        until = parse_date_filter(args.until) if args.until else None
+        rank_profile = parse_rank_profile(args.rank) if args.rank else None
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    batch = search_many(
+        db_path=db_path,
+        queries=_read_batch_queries(sys.stdin),
+        role=args.role,
+        model=args.model,
+        since=since,
+        until=until,
+        lang=getattr(args, "lang", None),
+        limit=args.limit,
+        collapse=not args.show_duplicates,
+        include_branches=args.include_branches,
+        rank_profile=rank_profile,
+    )
+    for item in batch:
+        record: dict = {"query": item.query}
+        if item.error is not None:
+            record["error"] = item.error
+        else:
+            record["results"] = [asdict(r) for r in item.results]
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+
+
+def cmd_code(args: argparse.Namespace) -> None:
+    """Search individual code blocks."""
+    db_path = _find_db(args.db)
+    _ensure_db_exists(db_path)
+
+    if args.fuzzy or args.facets or args.timeline or args.trace or args.rank:
+        print(
+            "Error: --code cannot be combined with --fuzzy, --facets, "
+            "--timeline, --trace or --rank",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    try:
+        since = parse_date_filter(args.since) if args.since else None
+        until = parse_date_filter(args.until) if args.until else None
+        results = search_code(
+            db_path=db_path,
+            query=args.query,
+            code_lang=args.code_lang,
+            role=args.role,
+            model=args.model,
+            since=since,
+            until=until,
+            lang=getattr(args, "lang", None),
+            limit=args.limit,
+            include_branches=args.include_branches,
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not results:
+        print("No code blocks found.")
+        return
+
+    print(f"\n{'='*70}")
+    print(f"  {len(results)} code blocks")
+    print(f"{'='*70}\n")
+
+    for r in results:
+        print(f"  [{r.date_str}] {r.conversation_title}")
+        print(
+            f"  ID: {r.conversation_id[:12]}...  [{r.role}]  "
+            f"block {r.ordinal + 1}  lang: {r.fence_lang or '-'}"
+        )
+        print()
+        for line in r.code_snippet.splitlines():
+            print(f"    {line}")
+        print(f"\n  {'─'*60}\n")
+
+
+# Width of the longest --timeline bar
+_TIMELINE_BAR_WIDTH = 40
+
+
+def cmd_timeline(args: argparse.Namespace) -> None:
+    """Show search hit counts over time."""
+    if (
+        args.fuzzy or args.facets or args.trace or args.rank
+        or args.show_duplicates or args.reverse or args.offset
+    ):
+        print(
+            "Error: --timeline cannot be combined with --fuzzy, --facets, "
+            "--trace, --rank, --show-duplicates, --reverse or --offset",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    db_path = _find_db(args.db)
+    _ensure_db_exists(db_path)
+
+    try:
+        since = parse_date_filter(args.since) if args.since else None
+        until = parse_date_filter(args.until) if args.until else None
+        buckets = get_timeline(
+            db_path=db_path,
+            query=args.query,
+            bucket=args.bucket,
+            role=args.role,
+            model=args.model,
+            since=since,
+            until=until,
+            lang=args.lang,
+            include_branches=args.include_branches,
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not buckets:
+        print("No results found.")
+        return
+
+    total = sum(b.count for b in buckets)
+    peak = max(b.count for b in buckets)
+    print(f"\n{'='*70}")
+    print(f"  {total:,} hits for {args.query!r} by {args.bucket}")
+    print(f"{'='*70}\n")
+    for b in buckets:
+        bar = "█" * round(b.count / peak * _TIMELINE_BAR_WIDTH) if peak else ""
+        print(f"  {b.bucket:10} {b.count:>7,}  {bar}")
+    print()
+
+
+# Facet values shown per facet in CLI output
+_FACET_DISPLAY_LIMIT = 10
+
+
+def _print_facets(facets: SearchFacets) -> None:
+    """Print facet counts for a search."""
+    print(f"\n{'='*70}")
+    print(f"  {facets.total:,} total hits")
+    print(f"{'='*70}")
+    sections = [
+        ("role", facets.role),
+        ("model", facets.model),
+        ("language", facets.lang),
+        ("month", facets.month),
+    ]
+    for name, counts in sections:
+        if not counts:
+            continue
+        print(f"\n  By {name}:")
+        for value, count in list(counts.items())[:_FACET_DISPLAY_LIMIT]:
+            if name == "language" and value:
+                value = _lang_display_name(value)
+            label = value if value is not None else "(none)"
+            pct = count / facets.total * 100 if facets.total else 0.0
+            print(f"    {label:30} {count:>7,}  ({pct:.1f}%)")
+        hidden = len(counts) - _FACET_DISPLAY_LIMIT
+        if hidden > 0:
+            print(f"    ... {hidden} more")
+
+
+def _print_trace(trace: QueryTrace) -> None:
+    """Print a query trace to stderr."""
+    print(f"  Trace: fts_query={trace.fts_query!r}", file=sys.stderr)
+    print(f"         filters={trace.filters}", file=sys.stderr)
+    print(
+        f"         sql={trace.sql_ms:.2f}ms post={trace.post_ms:.2f}ms "
+        f"total={trace.total_ms:.2f}ms vm_steps~{trace.vm_steps:,} "
+        f"rows={trace.result_count}",
+        file=sys.stderr,
+    )
+    for line in trace.query_plan:
+        print(f"         plan: {line}", file=sys.stderr)
+    if trace.logged:
+        print("         (logged to slow query log)", file=sys.stderr)
+
+
+def cmd_slow_queries(args: argparse.Namespace) -> None:
+    """Report the slow query log."""
+    db_path = _find_db(args.db)
+    _ensure_db_exists(db_path)
+
+    entries = get_slow_queries(db_path, limit=args.limit)
+    if not entries:
+        print(
+            f"No slow queries logged. Set --slow-ms or {SLOW_MS_ENV} to enable logging."
+        )
+        return
+
+    print(f"\n{'='*70}")
+    print(f"  Slow queries by filter combination")
+    print(f"{'='*70}\n")
+    print(f"  {'Filters':<30} {'Count':>6} {'Avg ms':>9} {'Max ms':>9} {'Avg steps':>11}")
+    print(f"  {'─'*30} {'─'*6} {'─'*9} {'─'*9} {'─'*11}")
+    for row in get_slow_query_summary(db_path):
+        print(
+            f"  {row['filter_keys']:<30} {row['n']:>6} {row['avg_ms']:>9.1f} "
+            f"{row['max_ms']:>9.1f} {row['avg_steps'] or 0:>11,.0f}"
+        )
+
+    print(f"\n  Slowest {len(entries)} queries:\n")
+    for entry in entries:
+        print(
+            f"  [{entry.date_str}] {entry.total_ms:.1f}ms "
+            f"(sql {entry.sql_ms:.1f}ms, post {entry.post_ms:.1f}ms, "
+            f"{entry.result_count} rows, ~{entry.vm_steps:,} steps)"
+        )
+        print(f"    query:   {entry.query}")
+        if entry.filters:
+            print(f"    filters: {entry.filters}")
+        for line in entry.query_plan.splitlines():
+            print(f"    plan:    {line}")
+        print()
+
+
+def cmd_list(args: argparse.Namespace) -> None:
+    """List conversations by date, size or title without a search term."""
+    db_path = _find_db(args.db)
+    _ensure_db_exists(db_path)
+
+    try:
+        since = parse_date_filter(args.since) if args.since else None
+        until = parse_date_filter(args.until) if args.until else None
+        convs = list_conversations(
+            db_path,
+            sort=args.sort,
+            reverse=args.reverse,
+            limit=args.limit,
+            offset=args.offset,
+            model=args.model,
+            since=since,
+            until=until,
+            lang=args.lang,
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not convs:
+        print("No conversations found.")
+        return
+
+    print(f"\n{'='*70}")
+    print(
+        f"  Conversations {args.offset + 1}-{args.offset + len(convs)} "
+        f"(by {args.sort}{', reversed' if args.reverse else ''})"
+    )
+    print(f"{'='*70}\n")
+
+    for conv in convs:
+        print(f"  [{conv.date_str}] {conv.title}")
+        details = [
+            f"{conv.message_count:,} messages",
+            f"{conv.word_count:,} words",
+            f"{conv.code_count:,} code blocks",
+        ]
+        if conv.model:
+            details.append(conv.model)
+        if conv.lang:
+            details.append(conv.lang)
+        print(f"  ID: {conv.id[:12]}...  {', '.join(details)}")
+        if conv.first_prompt:
+            print(f"    > {truncate(' '.join(conv.first_prompt.split()), 100)}")
+        if conv.keywords:
+            print(f"    Keywords: {', '.join(conv.keywords)}")
+        print()
+
+    if len(convs) == args.limit:
+        print(f"  Next page: --offset {args.offset + args.limit}\n")
+
+
 def cmd_conversation(args: argparse.Namespace) -> None:
     """Browse a full conversation."""
     db_path = _find_db(args.db)
     _ensure_db_exists(db_path)
 
-    conv = get_conversation(db_path, args.conversation)
+    conv = get_conversation(db_path, args.conversation, lazy=True)
     if conv is None:
         print(f"Conversation not found: {args.conversation}", file=sys.stderr)
         sys.exit(1)
@@ -147,11 +511,11 @@ def cmd_conversation(args: argparse.Namespace) -> None:
     print(f"{'='*70}\n")
 
     for msg in conv.messages:
-        role = msg["role"]
-        content = msg["content"] or ""
-        code = msg["code"] or ""
-        model = msg["model_slug"]
-        ts = format_timestamp(msg["created_at"])
+        role = msg.role
+        content = msg.content or ""
+        code = msg.code or ""
+        model = msg.model_slug
+        ts = format_timestamp(msg.created_at)
 
         header = f"[{role}]"
         if model:
@@ -180,6 +544,8 @@ def cmd_conversation(args: argparse.Namespace) -> None:
 
 def cmd_rebuild(args: argparse.Namespace) -> None:
     """Rebuild the search index."""
+    from .indexer import build_index
+
     export_path = Path(args.export)
     if not export_path.exists():
         print(f"Error: Export file not found: {export_path}", file=sys.stderr)
@@ -192,27 +558,103 @@ def cmd_rebuild(args: argparse.Namespace) -> None:
     print(f"Database: {db_path}")
     print()
 
+    metrics_out = None
+    if args.metrics == "-":
+        metrics_out = sys.stderr
+    elif args.metrics:
+        metrics_out = open(args.metrics, "a", encoding="utf-8")
+
+    build_kwargs = dict(
+        json_path=export_path,
+        db_path=db_path,
+        rebuild=True,
+        progress=True,
+        workers=args.workers,
+        metrics_out=metrics_out,
+        fuzzy=args.fuzzy_index,
+        resume=args.resume,
+        branches=args.index_branches,
+        keyword_engine=args.keyword_engine,
+    )
+
     try:
-        stats = build_index(
-            json_path=export_path,
-            db_path=db_path,
-            rebuild=True,
-            progress=True,
-        )
+        if args.profile:
+            from .profiling import profile_call
+
+            stats = profile_call(build_index, Path(args.profile), **build_kwargs)
+        else:
+            stats = build_index(**build_kwargs)
     except json.JSONDecodeError as e:
         print(f"Error: Invalid JSON in export file: {e}", file=sys.stderr)
         sys.exit(1)
     except ValueError as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if metrics_out is not None and metrics_out is not sys.stderr:
+            metrics_out.close()
 
     print(f"\nIndex built successfully:")
+    if stats.get("resumed_from"):
+        print(f"  Resumed: from the {stats['resumed_from']} phase checkpoint")
     print(f"  Conversations: {stats['conversation_count']}")
     print(f"  Messages: {stats['message_count']}")
     print(f"  Keywords: {stats.get('keyword_count', 0)}")
     print(f"  Duration: {stats['duration_s']}s")
+    print(f"  Throughput: {stats['messages_per_s']:,.0f} messages/s, "
+          f"{stats['mb_per_s']} MB/s")
     print(f"  Database: {stats['db_path']}")
 
+    phases = stats.get("phases", {})
+    if phases:
+        print(f"\n  Time by phase:")
+        for name, seconds in sorted(phases.items(), key=lambda kv: -kv[1]):
+            print(f"    {name:20} {seconds:>9.3f}s")
+
+
+def cmd_publish_snapshot(args: argparse.Namespace) -> None:
+    """Publish a read-only snapshot of the index."""
+    from .db import publish_snapshot
+
+    db_path = _find_db(args.db)
+    _ensure_db_exists(db_path)
+
+    snapshot_path = Path(args.publish_snapshot)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        info = publish_snapshot(db_path, snapshot_path)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Snapshot published: {info['snapshot_path']}")
+    print(f"  Size: {info['size_mb']} MB")
+    print(f"  Duration: {info['duration_s']}s")
+    print(f"  Query it with: chatgpt-search --db {info['snapshot_path']} \"query\"")
+
+
+def cmd_watch(args: argparse.Namespace) -> None:
+    """Watch a directory and index new exports as they arrive."""
+    from .watcher import watch
+
+    db_path = _find_db(args.db)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def report(path: Path, stats: dict) -> None:
+        print(
+            f"Indexed {path.name}: {stats['added']} new, "
+            f"{stats['updated']} changed, {stats['unchanged']} unchanged "
+            f"(generation {stats['index_generation']})"
+        )
+
+    try:
+        watch(Path(args.watch), db_path, interval=args.interval, on_indexed=report)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nStopped watching.", file=sys.stderr)
+
 
 def cmd_stats(args: argparse.Namespace) -> None:
     """Show corpus statistics."""
@@ -227,9 +669,16 @@ def cmd_stats(args: argparse.Namespace) -> None:
 
     print(f"  Conversations:  {stats.conversation_count:,}")
     print(f"  Messages:       {stats.message_count:,}")
+    if stats.message_count:
+        saved = 1 - stats.body_count / stats.message_count
+        print(
+            f"  Unique bodies:  {stats.body_count:,}  "
+            f"({saved:.1%} of messages deduplicated)"
+        )
     print(f"  Keywords:       {stats.keyword_count:,}")
     print(f"  Date range:     {stats.date_range[0]} to {stats.date_range[1]}")
     print(f"  Database size:  {stats.db_size_mb:.1f} MB")
+    print(f"  Generation:     {stats.index_generation}")
 
     print(f"\n  Messages by role:")
     for role, count in stats.role_distribution.items():
@@ -316,10 +765,24 @@ Examples:
   chatgpt-search "pytorch" --model gpt-5
   chatgpt-search "machine learning" --lang ru
   chatgpt-search --conversation abc123
+  chatgpt-search --list --sort words --model gpt-4o --since 2025-01
+  chatgpt-search --list --lang de --limit 50 --offset 50
   chatgpt-search --rebuild --export ~/Downloads/conversations.json
+  chatgpt-search --rebuild --export ~/Downloads/chatgpt-export.zip
+  chatgpt-search --rebuild --export ~/Downloads/conversations.json --workers 0
+  chatgpt-search --rebuild --export ~/Downloads/conversations.json --resume
+  chatgpt-search --rebuild --export ~/Downloads/conversations.json --index-branches
+  chatgpt-search --rebuild --export ~/Downloads/conversations.json --keyword-engine builtin
   chatgpt-search --stats
   chatgpt-search --keywords
   chatgpt-search --keywords --keywords-conversation abc123
+  chatgpt-search "kubernetes" --lang en --trace
+  chatgpt-search --slow-queries
+  chatgpt-search "sort_items" --code-lang python
+  chatgpt-search "retry backoff" --include-branches
+  chatgpt-search "deploy checklist" --rank recent-user
+  chatgpt-search "sql index" --rank "recent,half_life=30,user=2"
+  printf '"kubernetes"\n{"query": "pytorch"}\n' | chatgpt-search --batch --limit 5
         """,
     )
 
@@ -337,6 +800,11 @@ Examples:
     group.add_argument(
         "--conversation", "-c", metavar="ID", help="Browse a conversation by ID"
     )
+    group.add_argument(
+        "--list",
+        action="store_true",
+        help="List conversations without a search term (see --sort, --offset)",
+    )
     group.add_argument(
         "--rebuild", action="store_true", help="Rebuild the search index"
     )
@@ -348,6 +816,26 @@ Examples:
         action="store_true",
         help="List top keywords in the corpus",
     )
+    group.add_argument(
+        "--slow-queries",
+        action="store_true",
+        help="Report the slow query log",
+    )
+    group.add_argument(
+        "--publish-snapshot",
+        metavar="PATH",
+        help="Write an optimized, read-only snapshot of the index to PATH",
+    )
+    group.add_argument(
+        "--batch",
+        action="store_true",
+        help="Read JSONL queries from stdin and write JSONL results to stdout",
+    )
+    group.add_argument(
+        "--watch",
+        metavar="DIR",
+        help="Watch DIR for new exports and index them incrementally",
+    )
 
     # Search filters
     parser.add_argument(
@@ -370,6 +858,94 @@ Examples:
         "--limit", "-n", type=int, default=20, help="Max results (default: 20)"
     )
 
+    parser.add_argument(
+        "--facets",
+        action="store_true",
+        help="Also show hit counts by role, model, language and month",
+    )
+
+    parser.add_argument(
+        "--rank",
+        metavar="PROFILE",
+        help="Ranking profile: default, recent, user or recent-user, and/or "
+        "comma-separated overrides of title/content/code weights, half_life "
+        "(days) and role multipliers, e.g. 'recent,user=2' or 'title=5,code=2'",
+    )
+
+    parser.add_argument(
+        "--include-branches",
+        action="store_true",
+        help="Also match regenerated/edited branches (needs --rebuild "
+        "--index-branches); branch hits are marked with *",
+    )
+    parser.add_argument(
+        "--show-duplicates",
+        action="store_true",
+        help="List every matching message instead of collapsing identical "
+        "and near-duplicate (MinHash-similar) bodies",
+    )
+
+    parser.add_argument(
+        "--fuzzy",
+        action="store_true",
+        help="Typo-tolerant substring search over titles and code "
+        "(needs --rebuild --fuzzy-index)",
+    )
+    parser.add_argument(
+        "--code",
+        action="store_true",
+        help="Search individual code blocks instead of messages",
+    )
+    parser.add_argument(
+        "--code-lang",
+        metavar="LANG",
+        help="Only code blocks fenced with this language (implies --code)",
+    )
+    parser.add_argument(
+        "--timeline",
+        action="store_true",
+        help="Show hit counts per time bucket instead of results",
+    )
+    parser.add_argument(
+        "--bucket",
+        choices=TIMELINE_BUCKETS,
+        default="month",
+        help="Time bucket for --timeline (default: month)",
+    )
+
+    # Query diagnostics
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Print query timing, VM steps and query plan to stderr",
+    )
+    parser.add_argument(
+        "--slow-ms",
+        type=float,
+        default=float(os.environ[SLOW_MS_ENV]) if os.environ.get(SLOW_MS_ENV) else None,
+        metavar="MS",
+        help=f"Log searches slower than MS to the slow query log (env: {SLOW_MS_ENV})",
+    )
+
+    # Listing options
+    parser.add_argument(
+        "--sort",
+        choices=list(LIST_SORTS),
+        default="date",
+        help="Order for --list: newest/largest first, titles A-Z (default: date)",
+    )
+    parser.add_argument(
+        "--reverse",
+        action="store_true",
+        help="Reverse the --list order",
+    )
+    parser.add_argument(
+        "--offset",
+        type=int,
+        default=0,
+        help="Skip this many conversations in --list (pagination, default: 0)",
+    )
+
     # Keyword options
     parser.add_argument(
         "--keywords-conversation",
@@ -379,7 +955,57 @@ Examples:
 
     # Rebuild options
     parser.add_argument(
-        "--export", help="Path to conversations.json (required for --rebuild)"
+        "--export",
+        help="Path to conversations.json or the export .zip (required for --rebuild)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for --rebuild (0 = one per CPU core, default: 1)",
+    )
+    parser.add_argument(
+        "--fuzzy-index",
+        action="store_true",
+        help="Also build the trigram index used by --fuzzy (larger database)",
+    )
+    parser.add_argument(
+        "--index-branches",
+        action="store_true",
+        help="Also index regenerated answers and edited prompts off the "
+        "current thread (searched with --include-branches)",
+    )
+    parser.add_argument(
+        "--keyword-engine",
+        choices=["auto", "sklearn", "builtin"],
+        default="auto",
+        help="TF-IDF engine for --rebuild: scikit-learn, or the pure-Python "
+        "builtin (no extra dependencies). auto uses scikit-learn if installed",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted --rebuild of the same export from its "
+        "checkpoint instead of starting over",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="Append per-phase build metrics as JSON lines to PATH ('-' for stderr)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Run --rebuild under cProfile and dump stats to PATH",
+    )
+
+    # Watch options
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        metavar="SECONDS",
+        help="Polling interval for --watch (default: 5)",
     )
 
     args = parser.parse_args()
@@ -388,16 +1014,36 @@ Examples:
         print("Error: --limit must be greater than 0", file=sys.stderr)
         sys.exit(1)
 
+    if args.offset < 0:
+        print("Error: --offset must not be negative", file=sys.stderr)
+        sys.exit(1)
+
     if args.rebuild:
         if not args.export:
-            parser.error("--rebuild requires --export /path/to/conversations.json")
+            parser.error(
+                "--rebuild requires --export /path/to/conversations.json (or export .zip)"
+            )
         cmd_rebuild(args)
     elif args.stats:
         cmd_stats(args)
     elif args.keywords:
         cmd_keywords(args)
+    elif args.slow_queries:
+        cmd_slow_queries(args)
+    elif args.batch:
+        cmd_batch(args)
+    elif args.watch:
+        cmd_watch(args)
+    elif args.publish_snapshot:
+        cmd_publish_snapshot(args)
+    elif args.list:
+        cmd_list(args)
     elif args.conversation:
         cmd_conversation(args)
+    elif args.query and (args.code or args.code_lang):
+        cmd_code(args)
+    elif args.query and args.timeline:
+        cmd_timeline(args)
     elif args.query:
         cmd_search(args)
     else:
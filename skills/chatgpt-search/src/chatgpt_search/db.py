@@ -1,9 +1,19 @@
 """SQLite database management — schema creation and connection handling."""
 
+import hashlib
+import json
+import os
 import sqlite3
+import time
 from pathlib import Path
+from typing import Optional
 
-SCHEMA_VERSION = 4
+from .utils import has_cjk, minhash_bands, segment_cjk
+
+SCHEMA_VERSION = 12
+
+# Memory-map this much of a published snapshot (SQLite caps it at ~2GB)
+SNAPSHOT_MMAP_SIZE = 1 << 30
 
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS meta (
@@ -20,32 +30,47 @@ CREATE TABLE IF NOT EXISTS conversations (
     message_count INTEGER DEFAULT 0
 );
 
+-- Model slugs are stored once here and referenced by integer id
+CREATE TABLE IF NOT EXISTS models (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE
+);
+
+-- Message text is stored once per distinct (content, code) pair and
+-- referenced by integer id; hash is body_hash() of the pair and lsh is
+-- body_lsh() (MinHash band hashes, used to fold near-duplicate hits)
+CREATE TABLE IF NOT EXISTS bodies (
+    id INTEGER PRIMARY KEY,
+    hash BLOB NOT NULL UNIQUE,
+    content TEXT,
+    code TEXT,
+    lsh BLOB
+);
+
 CREATE TABLE IF NOT EXISTS messages (
     id TEXT PRIMARY KEY,
     conversation_id TEXT NOT NULL,
     role TEXT NOT NULL,
-    content TEXT,
-    code TEXT,
+    body_id INTEGER,
     content_type TEXT,
-    model_slug TEXT,
+    model_id INTEGER,
     created_at REAL,
     turn_index INTEGER,
     lang TEXT,
-    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+    parent_id TEXT,  -- previous message on the same branch
+    is_canonical INTEGER NOT NULL DEFAULT 1,  -- 0 for regenerated/edited branches
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id),
+    FOREIGN KEY (body_id) REFERENCES bodies(id),
+    FOREIGN KEY (model_id) REFERENCES models(id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id);
 CREATE INDEX IF NOT EXISTS idx_messages_role ON messages(role);
-CREATE INDEX IF NOT EXISTS idx_messages_model ON messages(model_slug);
-CREATE INDEX IF NOT EXISTS idx_messages_created ON messages(created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_model ON messages(model_id);
+-- is_canonical rides along so canonical-only timelines stay index-only
+CREATE INDEX IF NOT EXISTS idx_messages_created ON messages(created_at, is_canonical);
 CREATE INDEX IF NOT EXISTS idx_messages_lang ON messages(lang);
-
-CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
-    title,
-    content,
-    code,
-    tokenize='porter unicode61 remove_diacritics 2'
-);
+CREATE INDEX IF NOT EXISTS idx_messages_body ON messages(body_id);
 
 CREATE TABLE IF NOT EXISTS keywords (
     id INTEGER PRIMARY KEY,
@@ -59,6 +84,116 @@ CREATE INDEX IF NOT EXISTS idx_keywords_keyword ON keywords(keyword);
 CREATE INDEX IF NOT EXISTS idx_keywords_conversation ON keywords(conversation_id);
 """
 
+SLOW_QUERIES_SQL = """
+CREATE TABLE IF NOT EXISTS slow_queries (
+    id INTEGER PRIMARY KEY,
+    logged_at REAL NOT NULL,
+    query TEXT,
+    fts_query TEXT,
+    filters TEXT,        -- JSON object of active filters
+    filter_keys TEXT,    -- e.g. 'lang+model', for grouping
+    result_count INTEGER,
+    sql_ms REAL,
+    post_ms REAL,
+    total_ms REAL,
+    vm_steps INTEGER,    -- approximate SQLite VM instructions executed
+    query_plan TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_slow_queries_total ON slow_queries(total_ms);
+"""
+
+CJK_FTS_SQL = """
+-- Messages containing CJK text, re-indexed as character bigrams
+-- (utils.segment_cjk). rowid = messages.rowid, like messages_fts.
+CREATE VIRTUAL TABLE IF NOT EXISTS cjk_fts USING fts5(
+    title,
+    content,
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+CODE_BLOCKS_SQL = """
+-- One row per fenced code block; bodies.code keeps their join
+CREATE TABLE IF NOT EXISTS code_blocks (
+    id INTEGER PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,
+    fence_lang TEXT,
+    text TEXT NOT NULL,
+    FOREIGN KEY (message_id) REFERENCES messages(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_code_blocks_message ON code_blocks(message_id);
+CREATE INDEX IF NOT EXISTS idx_code_blocks_lang ON code_blocks(fence_lang);
+
+-- External-content index over code_blocks.text (rowid = code_blocks.id).
+-- No stemming: identifiers are matched as written.
+CREATE VIRTUAL TABLE IF NOT EXISTS code_fts USING fts5(
+    text,
+    content='code_blocks',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+MESSAGES_FTS_SQL = """
+-- One document per message, read back through a view so the index stores
+-- no copy of the text. rowid = messages.rowid.
+CREATE VIEW IF NOT EXISTS message_docs AS
+    SELECT m.rowid AS doc_id, c.title AS title, b.content AS content, b.code AS code
+    FROM messages m
+    JOIN conversations c ON c.id = m.conversation_id
+    JOIN bodies b ON b.id = m.body_id;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    title,
+    content,
+    code,
+    content='message_docs',
+    content_rowid='doc_id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+"""
+
+SUMMARY_SQL = """
+-- One row per conversation with everything a listing shows, filled at
+-- index time (keywords after enrichment) so --list never scans messages.
+-- Counts cover the canonical thread only.
+CREATE TABLE IF NOT EXISTS conversation_summary (
+    conversation_id TEXT PRIMARY KEY,
+    title TEXT,
+    created_at REAL,
+    updated_at REAL,
+    model TEXT,              -- conversations.default_model_slug
+    message_count INTEGER NOT NULL DEFAULT 0,
+    word_count INTEGER NOT NULL DEFAULT 0,
+    code_count INTEGER NOT NULL DEFAULT 0,  -- fenced code blocks
+    lang TEXT,               -- dominant message language
+    first_prompt TEXT,       -- excerpt of the first user message
+    keywords TEXT,           -- top TF-IDF keywords, comma-separated
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_summary_created ON conversation_summary(created_at);
+CREATE INDEX IF NOT EXISTS idx_summary_updated ON conversation_summary(updated_at);
+CREATE INDEX IF NOT EXISTS idx_summary_words ON conversation_summary(word_count);
+"""
+
+SCHEMA_SQL += (
+    MESSAGES_FTS_SQL + SLOW_QUERIES_SQL + CJK_FTS_SQL + CODE_BLOCKS_SQL + SUMMARY_SQL
+)
+
+# Optional typo/substring index over titles and code (opt-in at build time).
+# rowid = messages.rowid, like messages_fts. Needs SQLite 3.34+.
+FUZZY_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS fuzzy_fts USING fts5(
+    title,
+    code,
+    tokenize='trigram'
+);
+"""
+
 
 # ---------------------------------------------------------------------------
 # Migration helpers
@@ -148,6 +283,415 @@ def _migrate_v3_to_v4(conn: sqlite3.Connection) -> None:
     conn.commit()
 
 
+def _migrate_v4_to_v5(conn: sqlite3.Connection) -> None:
+    """Migrate schema from v4 to v5: add slow_queries log table."""
+    conn.executescript(SLOW_QUERIES_SQL)
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("schema_version", "5"),
+    )
+    conn.commit()
+
+
+def _migrate_v5_to_v6(conn: sqlite3.Connection) -> None:
+    """Migrate schema from v5 to v6: normalise model_slug into a models table."""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS models (
+            id INTEGER PRIMARY KEY,
+            slug TEXT NOT NULL UNIQUE
+        )"""
+    )
+    columns = [
+        row[1]
+        for row in conn.execute("PRAGMA table_info(messages)").fetchall()
+    ]
+    if "model_id" not in columns:
+        conn.execute(
+            "ALTER TABLE messages ADD COLUMN model_id INTEGER REFERENCES models(id)"
+        )
+    if "model_slug" in columns:
+        conn.execute(
+            """INSERT OR IGNORE INTO models (slug)
+               SELECT DISTINCT model_slug FROM messages
+               WHERE model_slug IS NOT NULL"""
+        )
+        conn.execute(
+            """UPDATE messages SET model_id = (
+                   SELECT id FROM models WHERE slug = messages.model_slug
+               )"""
+        )
+        conn.execute("DROP INDEX IF EXISTS idx_messages_model")
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            conn.execute("ALTER TABLE messages DROP COLUMN model_slug")
+        else:
+            # DROP COLUMN unsupported: keep the column but free its storage
+            conn.execute("UPDATE messages SET model_slug = NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_model ON messages(model_id)")
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("schema_version", "6"),
+    )
+    conn.commit()
+
+
+def index_cjk_rows(conn: sqlite3.Connection, rows) -> int:
+    """Add (rowid, title, content) rows that contain CJK text to cjk_fts.
+
+    Returns the number of rows indexed. The caller commits.
+    """
+    batch = [
+        (rowid, segment_cjk(title or ""), segment_cjk(content or ""))
+        for rowid, title, content in rows
+        if has_cjk(title) or has_cjk(content)
+    ]
+    conn.executemany(
+        "INSERT INTO cjk_fts(rowid, title, content) VALUES (?, ?, ?)", batch
+    )
+    return len(batch)
+
+
+def _index_cjk_query(conn: sqlite3.Connection, sql: str, params=()) -> int:
+    """Feed the (rowid, title, content) rows of a query to index_cjk_rows."""
+    cursor = conn.execute(sql, params)
+    total = 0
+    while True:
+        rows = cursor.fetchmany(1000)
+        if not rows:
+            return total
+        total += index_cjk_rows(conn, rows)
+
+
+def backfill_cjk_fts(conn: sqlite3.Connection, min_rowid: int = 0) -> int:
+    """Index messages with rowid > min_rowid into cjk_fts."""
+    return _index_cjk_query(
+        conn,
+        "SELECT doc_id, title, content FROM message_docs WHERE doc_id > ?",
+        (min_rowid,),
+    )
+
+
+def _migrate_v6_to_v7(conn: sqlite3.Connection) -> None:
+    """Migrate schema from v6 to v7: add the CJK bigram index and backfill it."""
+    conn.executescript(CJK_FTS_SQL)
+    conn.execute("DELETE FROM cjk_fts")
+    # Text still lives on messages here; v8 -> v9 moves it to bodies
+    _index_cjk_query(
+        conn,
+        """SELECT m.rowid, c.title, m.content
+           FROM messages m
+           JOIN conversations c ON m.conversation_id = c.id""",
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("schema_version", "7"),
+    )
+    conn.commit()
+
+
+def _migrate_v7_to_v8(conn: sqlite3.Connection) -> None:
+    """Migrate schema from v7 to v8: add code_blocks and code_fts.
+
+    Fence languages were not stored before v8, so each message's joined
+    code becomes a single untagged block; a rebuild splits them properly.
+    """
+    conn.executescript(CODE_BLOCKS_SQL)
+    conn.execute(
+        """INSERT INTO code_blocks (message_id, ordinal, fence_lang, text)
+           SELECT id, 0, NULL, code FROM messages
+           WHERE code IS NOT NULL AND code != ''"""
+    )
+    conn.execute("INSERT INTO code_fts(code_fts) VALUES('rebuild')")
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("schema_version", "8"),
+    )
+    conn.commit()
+
+
+def body_hash(content: Optional[str], code: Optional[str]) -> bytes:
+    """Return the 16-byte BLAKE2b digest identifying a message body."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update((content or "").encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((code or "").encode("utf-8"))
+    return digest.digest()
+
+
+def body_lsh(content: Optional[str], code: Optional[str]) -> Optional[bytes]:
+    """Return the MinHash band hashes of a (content, code) body."""
+    return minhash_bands(f"{content or ''}\n{code or ''}")
+
+
+def _migrate_v8_to_v9(conn: sqlite3.Connection) -> None:
+    """Migrate schema from v8 to v9: store message text once per distinct body.
+
+    messages.content/code move into the content-addressed bodies table and
+    messages_fts becomes an external-content index over message_docs.
+    """
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS bodies (
+            id INTEGER PRIMARY KEY,
+            hash BLOB NOT NULL UNIQUE,
+            content TEXT,
+            code TEXT
+        )"""
+    )
+    columns = [
+        row[1]
+        for row in conn.execute("PRAGMA table_info(messages)").fetchall()
+    ]
+    if "body_id" not in columns:
+        conn.execute(
+            "ALTER TABLE messages ADD COLUMN body_id INTEGER REFERENCES bodies(id)"
+        )
+    if "content" in columns:
+        conn.create_function("body_hash", 2, body_hash, deterministic=True)
+        conn.execute(
+            """INSERT OR IGNORE INTO bodies (hash, content, code)
+               SELECT body_hash(content, code), content, code
+               FROM messages ORDER BY rowid"""
+        )
+        conn.execute(
+            """UPDATE messages SET body_id = (
+                   SELECT id FROM bodies
+                   WHERE hash = body_hash(messages.content, messages.code)
+               )"""
+        )
+        # Legacy FTS triggers would still reference the old columns
+        for trigger in ("messages_ai", "messages_ad", "messages_au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            conn.execute("ALTER TABLE messages DROP COLUMN content")
+            conn.execute("ALTER TABLE messages DROP COLUMN code")
+        else:
+            # DROP COLUMN unsupported: keep the columns but free their storage
+            conn.execute("UPDATE messages SET content = NULL, code = NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_body ON messages(body_id)")
+    conn.execute("DROP TABLE IF EXISTS messages_fts")
+    conn.executescript(MESSAGES_FTS_SQL)
+    conn.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild')")
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("schema_version", "9"),
+    )
+    conn.commit()
+
+
+# Characters of the first user message kept in conversation_summary
+SUMMARY_EXCERPT_CHARS = 200
+
+# Keywords per conversation kept in conversation_summary
+SUMMARY_KEYWORDS = 5
+
+_SUMMARY_FILL_SQL = f"""
+INSERT OR REPLACE INTO conversation_summary
+    (conversation_id, title, created_at, updated_at, model, message_count,
+     word_count, code_count, lang, first_prompt, keywords)
+SELECT
+    c.id, c.title, c.created_at, c.updated_at, c.default_model_slug,
+    c.message_count,
+    (SELECT COALESCE(SUM(word_count(b.content)), 0)
+     FROM messages m JOIN bodies b ON b.id = m.body_id
+     WHERE m.conversation_id = c.id AND m.is_canonical = 1),
+    (SELECT COUNT(*)
+     FROM messages m JOIN code_blocks cb ON cb.message_id = m.id
+     WHERE m.conversation_id = c.id AND m.is_canonical = 1),
+    (SELECT m.lang FROM messages m
+     WHERE m.conversation_id = c.id AND m.is_canonical = 1 AND m.lang IS NOT NULL
+     GROUP BY m.lang ORDER BY COUNT(*) DESC LIMIT 1),
+    (SELECT substr(b.content, 1, {SUMMARY_EXCERPT_CHARS})
+     -- Pinned: the planner prefers idx_messages_role, which scans every
+     -- user message in the corpus once per conversation
+     FROM messages m INDEXED BY idx_messages_conversation
+     JOIN bodies b ON b.id = m.body_id
+     WHERE m.conversation_id = c.id AND m.is_canonical = 1
+       AND m.role = 'user' AND b.content != ''
+     ORDER BY m.turn_index LIMIT 1),
+    NULL
+FROM conversations c
+"""
+
+_SUMMARY_KEYWORDS_SQL = f"""
+UPDATE conversation_summary SET keywords = (
+    SELECT GROUP_CONCAT(keyword, ', ') FROM (
+        SELECT keyword FROM keywords k
+        WHERE k.conversation_id = conversation_summary.conversation_id
+        ORDER BY score DESC LIMIT {SUMMARY_KEYWORDS}
+    )
+)
+"""
+
+
+def _word_count(text: Optional[str]) -> int:
+    """Whitespace-separated words in text (SQL function word_count)."""
+    return len(text.split()) if text else 0
+
+
+def fill_conversation_summary(
+    conn: sqlite3.Connection, conversation_id: Optional[str] = None
+) -> int:
+    """(Re)compute conversation_summary rows from the indexed messages.
+
+    Fills one conversation, or replaces every row when conversation_id is
+    None. Keywords are left NULL; fill_summary_keywords adds them once
+    enrichment has run. Needs a connection from init_db (which registers
+    word_count). The caller commits. Returns the rows written.
+    """
+    if conversation_id is not None:
+        return conn.execute(
+            _SUMMARY_FILL_SQL + " WHERE c.id = ?", (conversation_id,)
+        ).rowcount
+    conn.execute("DELETE FROM conversation_summary")
+    return conn.execute(_SUMMARY_FILL_SQL).rowcount
+
+
+def fill_summary_keywords(conn: sqlite3.Connection) -> None:
+    """Copy each conversation's top keywords into conversation_summary.
+
+    The caller commits.
+    """
+    conn.execute(_SUMMARY_KEYWORDS_SQL)
+
+
+def _migrate_v9_to_v10(conn: sqlite3.Connection) -> None:
+    """Migrate schema from v9 to v10: add parent_id and is_canonical to messages.
+
+    Existing rows are all canonical; parent_id is backfilled from turn order.
+    """
+    columns = [
+        row[1]
+        for row in conn.execute("PRAGMA table_info(messages)").fetchall()
+    ]
+    if "parent_id" not in columns:
+        conn.execute("ALTER TABLE messages ADD COLUMN parent_id TEXT")
+        conn.execute(
+            """UPDATE messages SET parent_id = (
+                   SELECT p.id FROM messages p
+                   WHERE p.conversation_id = messages.conversation_id
+                     AND p.turn_index = messages.turn_index - 1
+               )"""
+        )
+    if "is_canonical" not in columns:
+        conn.execute(
+            "ALTER TABLE messages ADD COLUMN is_canonical INTEGER NOT NULL DEFAULT 1"
+        )
+    conn.execute("DROP INDEX IF EXISTS idx_messages_created")
+    conn.execute(
+        "CREATE INDEX idx_messages_created ON messages(created_at, is_canonical)"
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("schema_version", "10"),
+    )
+    conn.commit()
+
+
+def _migrate_v10_to_v11(conn: sqlite3.Connection) -> None:
+    """Migrate schema from v10 to v11: add and fill conversation_summary."""
+    # The fill reads code_blocks and keywords, so make sure every table exists
+    conn.executescript(SCHEMA_SQL)
+    fill_conversation_summary(conn)
+    fill_summary_keywords(conn)
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("schema_version", "11"),
+    )
+    conn.commit()
+
+
+def _migrate_v11_to_v12(conn: sqlite3.Connection) -> None:
+    """Migrate schema from v11 to v12: add and fill bodies.lsh."""
+    columns = {
+        row[1] for row in conn.execute("PRAGMA table_info(bodies)").fetchall()
+    }
+    if "lsh" not in columns:
+        conn.execute("ALTER TABLE bodies ADD COLUMN lsh BLOB")
+    conn.create_function("body_lsh", 2, body_lsh, deterministic=True)
+    conn.execute("UPDATE bodies SET lsh = body_lsh(content, code) WHERE lsh IS NULL")
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("schema_version", "12"),
+    )
+    conn.commit()
+
+
+def ensure_slow_query_table(conn: sqlite3.Connection) -> None:
+    """Create the slow query log on databases opened without init_db."""
+    conn.executescript(SLOW_QUERIES_SQL)
+
+
+def get_index_generation(conn: sqlite3.Connection) -> int:
+    """Return the index generation (0 if the index was never built)."""
+    try:
+        row = conn.execute(
+            "SELECT value FROM meta WHERE key = 'index_generation'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+    except sqlite3.OperationalError:
+        return 0
+
+
+def bump_index_generation(conn: sqlite3.Connection) -> int:
+    """Increment the index generation; the caller commits.
+
+    Readers can compare generations to tell that indexed content changed.
+    """
+    generation = get_index_generation(conn) + 1
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("index_generation", str(generation)),
+    )
+    return generation
+
+
+def get_build_checkpoint(conn: sqlite3.Connection) -> Optional[dict]:
+    """Return the checkpoint of the last build_index run, if any.
+
+    Keys: export_fingerprint, state ('indexing', 'enriching' or 'complete'),
+    offset (export records done), max_rowid, conversations, messages,
+    enriched_langs (TF-IDF language groups done) and branches (whether
+    non-canonical branches are indexed).
+    """
+    try:
+        row = conn.execute(
+            "SELECT value FROM meta WHERE key = 'build_checkpoint'"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return json.loads(row[0]) if row else None
+
+
+def set_build_checkpoint(conn: sqlite3.Connection, checkpoint: dict) -> None:
+    """Store the build checkpoint; the caller commits with the work it covers."""
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        ("build_checkpoint", json.dumps(checkpoint)),
+    )
+
+
+def has_table(conn: sqlite3.Connection, name: str) -> bool:
+    """Return True if a table (or virtual table) exists."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def create_fuzzy_table(conn: sqlite3.Connection) -> None:
+    """Create the trigram fuzzy index table.
+
+    Raises:
+        ValueError: If this SQLite build lacks the trigram tokenizer
+    """
+    try:
+        conn.executescript(FUZZY_SQL)
+    except sqlite3.OperationalError as e:
+        raise ValueError(
+            f"Fuzzy index needs SQLite 3.34+ with the trigram tokenizer "
+            f"(found {sqlite3.sqlite_version}): {e}"
+        ) from e
+
+
 def migrate_if_needed(conn: sqlite3.Connection) -> None:
     """Run any pending schema migrations."""
     version = _get_schema_version(conn)
@@ -172,11 +716,97 @@ def migrate_if_needed(conn: sqlite3.Connection) -> None:
 
     if version < 4:
         _migrate_v3_to_v4(conn)
+        version = 4
+
+    if version < 5:
+        _migrate_v4_to_v5(conn)
+        version = 5
+
+    if version < 6:
+        _migrate_v5_to_v6(conn)
+        version = 6
+
+    if version < 7:
+        _migrate_v6_to_v7(conn)
+        version = 7
+
+    if version < 8:
+        _migrate_v7_to_v8(conn)
+        version = 8
+
+    if version < 9:
+        _migrate_v8_to_v9(conn)
+        version = 9
 
+    if version < 10:
+        _migrate_v9_to_v10(conn)
+        version = 10
+
+    if version < 11:
+        _migrate_v10_to_v11(conn)
+        version = 11
+
+    if version < 12:
+        _migrate_v11_to_v12(conn)
+
+
+def _has_wal_header(db_path: Path) -> bool:
+    """Check the file format bytes of the database header (2 = WAL)."""
+    try:
+        with open(db_path, "rb") as f:
+            header = f.read(20)
+    except OSError:
+        return False
+    return len(header) == 20 and header[18] == 2
+
+
+def _open_snapshot(db_path: Path) -> sqlite3.Connection | None:
+    """Open db_path as an immutable snapshot, or return None if it is not one.
+
+    Only rollback-journal files flagged meta.snapshot=1 by publish_snapshot
+    qualify; a live WAL database is never opened immutable.
+    """
+    if not db_path.is_file() or _has_wal_header(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(
+            f"{db_path.resolve().as_uri()}?mode=ro&immutable=1", uri=True
+        )
+    except sqlite3.Error:
+        return None
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'snapshot'").fetchone()
+    except sqlite3.Error:
+        row = None
+    if row is None or row[0] != "1":
+        conn.close()
+        return None
+    conn.execute(f"PRAGMA mmap_size={SNAPSHOT_MMAP_SIZE}")
+    conn.execute("PRAGMA cache_size=-64000")  # 64MB cache
+    conn.execute("PRAGMA query_only=ON")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def is_snapshot(db_path: Path) -> bool:
+    """Return True if db_path is a published read-only snapshot."""
+    conn = _open_snapshot(Path(db_path))
+    if conn is None:
+        return False
+    conn.close()
+    return True
 
 
 def get_connection(db_path: Path) -> sqlite3.Connection:
-    """Get a SQLite connection with optimal settings for our workload."""
+    """Get a SQLite connection with optimal settings for our workload.
+
+    Published snapshots are opened immutable and read-only with a large
+    mmap, so queries take no locks and create no -wal/-shm files.
+    """
+    snapshot = _open_snapshot(Path(db_path))
+    if snapshot is not None:
+        return snapshot
+
     conn = sqlite3.connect(str(db_path))
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA synchronous=NORMAL")
@@ -193,8 +823,25 @@ def init_db(db_path: Path) -> sqlite3.Connection:
     - v1 -> v2: add keywords table and message_count column
     - v2 -> v3: add lang column to messages
     - v3 -> v4: drop entities table (NER removed)
+    - v4 -> v5: add slow_queries log table
+    - v5 -> v6: move messages.model_slug into models lookup table
+    - v6 -> v7: add cjk_fts bigram index for Chinese/Japanese/Korean
+    - v7 -> v8: add code_blocks table and code_fts index
+    - v8 -> v9: move message text into the deduplicated bodies table
+    - v9 -> v10: add messages.parent_id and messages.is_canonical (branches)
+    - v10 -> v11: add the conversation_summary listing table
+    - v11 -> v12: add bodies.lsh (MinHash bands for near-duplicate folding)
+
+    Raises:
+        ValueError: If db_path is a published (read-only) snapshot
     """
+    if is_snapshot(db_path):
+        raise ValueError(
+            f"{db_path} is a published read-only snapshot. "
+            f"Update the source database and publish again."
+        )
     conn = get_connection(db_path)
+    conn.create_function("word_count", 1, _word_count, deterministic=True)
 
     # Run migrations before schema creation (for existing DBs)
     migrate_if_needed(conn)
@@ -208,16 +855,79 @@ def init_db(db_path: Path) -> sqlite3.Connection:
     return conn
 
 
+def publish_snapshot(db_path: Path, snapshot_path: Path) -> dict:
+    """Write a finalised, read-only copy of the index for query-heavy serving.
+
+    The source FTS index is merged into a single segment and the planner
+    statistics refreshed, then VACUUM INTO writes a compact copy. The copy
+    is switched to journal_mode=DELETE and flagged meta.snapshot=1, which
+    makes get_connection open it with immutable=1: no locking, no WAL or
+    shm files, and page reads served from mmap. The file is written next
+    to snapshot_path and renamed into place, so readers of a previous
+    snapshot are never disturbed.
+
+    Returns:
+        Dict with snapshot_path, size_mb and duration_s
+    """
+    start = time.time()
+    db_path = Path(db_path)
+    snapshot_path = Path(snapshot_path)
+    if snapshot_path.resolve() == db_path.resolve():
+        raise ValueError("Snapshot path must differ from the source database")
+
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = init_db(db_path)
+    try:
+        for table in ("messages_fts", "cjk_fts", "code_fts", "fuzzy_fts"):
+            if has_table(conn, table):
+                conn.execute(f"INSERT INTO {table}({table}) VALUES('optimize')")
+        conn.commit()
+        conn.execute("PRAGMA optimize")
+        conn.execute("VACUUM INTO ?", (str(tmp_path),))
+    finally:
+        conn.close()
+
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("ANALYZE")
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("snapshot", "1"), ("snapshot_published_at", str(time.time()))],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, snapshot_path)
+    return {
+        "snapshot_path": str(snapshot_path),
+        "size_mb": round(snapshot_path.stat().st_size / (1024 * 1024), 2),
+        "duration_s": round(time.time() - start, 2),
+    }
+
+
 def drop_all(conn: sqlite3.Connection) -> None:
     """Drop all tables for a clean rebuild."""
     conn.executescript("""
         DROP TABLE IF EXISTS keywords;
+        DROP TABLE IF EXISTS conversation_summary;
+        DROP TABLE IF EXISTS slow_queries;
         DROP TABLE IF EXISTS entities;  -- legacy, may not exist
         DROP TABLE IF EXISTS messages_fts;
+        DROP TABLE IF EXISTS fuzzy_fts;
+        DROP TABLE IF EXISTS cjk_fts;
+        DROP TABLE IF EXISTS code_fts;
+        DROP TABLE IF EXISTS code_blocks;
         DROP TRIGGER IF EXISTS messages_ai;
         DROP TRIGGER IF EXISTS messages_ad;
         DROP TRIGGER IF EXISTS messages_au;
+        DROP VIEW IF EXISTS message_docs;
         DROP TABLE IF EXISTS messages;
+        DROP TABLE IF EXISTS bodies;
+        DROP TABLE IF EXISTS models;
         DROP TABLE IF EXISTS conversations;
         DROP TABLE IF EXISTS meta;
     """)
@@ -1,17 +1,28 @@
 """Enrichment layer: TF-IDF keyword extraction.
 
-Supports 15 languages with language-specific stopword lists.
+Supports 15 languages with language-specific stopword lists. Keywords are
+fitted by a pluggable engine (see KEYWORD_ENGINES): scikit-learn's
+TfidfVectorizer, or a pure-Python engine with the same weighting that
+needs no third-party packages.
 """
 
+import heapq
+import importlib.util
+import math
+import multiprocessing
 import re
 import sqlite3
 import sys
 import time
-from collections import defaultdict
+from collections import Counter, defaultdict
+from typing import Callable, Iterator, Optional
 
 from .languages import (
+    CJK_LANGUAGES,
     get_combined_stopwords,
+    get_stopwords,
 )
+from .utils import segment_cjk
 
 # Code block pattern for stripping before TF-IDF
 _CODE_BLOCK_PATTERN = re.compile(r"```(?:\w+)?\s*\n.*?```", re.DOTALL)
@@ -19,6 +30,10 @@ _CODE_BLOCK_PATTERN = re.compile(r"```(?:\w+)?\s*\n.*?```", re.DOTALL)
 
 def _strip_code_blocks(text: str) -> str:
     """Remove fenced code blocks from text for cleaner TF-IDF."""
+    # Indexed prose already had its code split out; only an unbalanced
+    # fence pair spanning messages can remain, so skip the regex otherwise.
+    if "```" not in text:
+        return text
     return _CODE_BLOCK_PATTERN.sub("", text)
 
 
@@ -45,38 +60,241 @@ def _get_conversation_languages(conn: sqlite3.Connection, conv_id: str) -> set[s
     return {row["lang"] for row in rows} if rows else {"en"}
 
 
+# (conversation_id, keyword, score) rows produced for one language group
+_KeywordRows = list[tuple[str, str, float]]
+
+# Vectorizer settings shared by both engines
+_MAX_FEATURES = 50000
+_MAX_DF = 0.8
+
+
+def _fit_sklearn(
+    lang: str,
+    conv_ids: list[str],
+    texts: list[str],
+    stop_words: list[str] | str,
+    top_n: int,
+) -> tuple[str, _KeywordRows, Optional[str]]:
+    """Fit TF-IDF for one language group with scikit-learn.
+
+    Module-level so it can run in a worker process. Returns
+    (lang, rows, error); error is set (and rows empty) if the vectorizer
+    could not be fitted.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    # TF-IDF needs at least 2 documents; use min_df=1 for small groups
+    min_df = 1 if len(texts) < 2 else 2
+
+    # Unspaced scripts would otherwise yield whole sentences as single
+    # terms; bigrams are already word-sized, so skip term pairs.
+    ngram_range = (1, 2)
+    if lang in CJK_LANGUAGES:
+        texts = [segment_cjk(t) for t in texts]
+        ngram_range = (1, 1)
+
+    vectorizer = TfidfVectorizer(
+        max_features=_MAX_FEATURES,
+        min_df=min_df,
+        max_df=_MAX_DF,
+        ngram_range=ngram_range,
+        stop_words=stop_words,
+        sublinear_tf=True,
+    )
+
+    try:
+        tfidf_matrix = vectorizer.fit_transform(texts).tocsr()
+    except ValueError as e:
+        return lang, [], str(e)
+
+    feature_names = vectorizer.get_feature_names_out()
+
+    # Rank each row's non-zero entries only, not the dense vocabulary row
+    rows: _KeywordRows = []
+    indptr = tfidf_matrix.indptr
+    indices = tfidf_matrix.indices
+    data = tfidf_matrix.data
+    for local_idx, conv_id in enumerate(conv_ids):
+        lo, hi = indptr[local_idx], indptr[local_idx + 1]
+        scores = data[lo:hi]
+        for pos in scores.argsort()[::-1][:top_n]:
+            score = float(scores[pos])
+            if score <= 0:
+                continue
+            keyword = str(feature_names[indices[lo + pos]])
+            rows.append((conv_id, keyword, round(score, 6)))
+    return lang, rows, None
+
+
+# Same tokens as TfidfVectorizer's default token_pattern
+_TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def _fit_builtin(
+    lang: str,
+    conv_ids: list[str],
+    texts: list[str],
+    stop_words: list[str] | str,
+    top_n: int,
+) -> tuple[str, _KeywordRows, Optional[str]]:
+    """Fit TF-IDF for one language group in pure Python.
+
+    Mirrors the scikit-learn engine's settings (lowercased word tokens,
+    stopwords removed before bigrams, min_df/max_df/max_features pruning,
+    sublinear tf, smoothed idf, L2-normalised rows), so scores match it.
+    Term counts are one Counter per conversation and document frequency a
+    single dict, built in one streaming pass over the texts.
+    """
+    if isinstance(stop_words, str):
+        stop_words = get_stopwords("en")
+    stops = set(stop_words)
+
+    bigrams = True
+    if lang in CJK_LANGUAGES:
+        texts = [segment_cjk(t) for t in texts]
+        bigrams = False
+
+    doc_counts: list[Counter] = []
+    df: dict[str, int] = {}
+    for text in texts:
+        tokens = [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in stops]
+        counts = Counter(tokens)
+        if bigrams:
+            counts.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        doc_counts.append(counts)
+        for term in counts:
+            df[term] = df.get(term, 0) + 1
+
+    if not df:
+        return lang, [], "empty vocabulary; perhaps the documents only contain stop words"
+
+    n_docs = len(texts)
+    min_df = 1 if n_docs < 2 else 2
+    max_doc_count = _MAX_DF * n_docs
+    if max_doc_count < min_df:
+        return lang, [], "max_df corresponds to < documents than min_df"
+
+    vocab = {t for t, d in df.items() if min_df <= d <= max_doc_count}
+    if len(vocab) > _MAX_FEATURES:
+        totals: Counter = Counter()
+        for counts in doc_counts:
+            totals.update({t: c for t, c in counts.items() if t in vocab})
+        vocab = {t for t, _ in totals.most_common(_MAX_FEATURES)}
+    if not vocab:
+        return lang, [], "After pruning, no terms remain"
+
+    idf = {t: math.log((1 + n_docs) / (1 + df[t])) + 1 for t in vocab}
+
+    rows: _KeywordRows = []
+    for conv_id, counts in zip(conv_ids, doc_counts):
+        weights = {
+            t: (1 + math.log(c)) * idf[t] for t, c in counts.items() if t in vocab
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        if not norm:
+            continue
+        for keyword, weight in heapq.nlargest(
+            top_n, weights.items(), key=lambda item: item[1]
+        ):
+            rows.append((conv_id, keyword, round(weight / norm, 6)))
+    return lang, rows, None
+
+
+# Keyword engines by name. Each fits one language group and returns
+# (lang, rows, error); they must be module-level to run in worker processes.
+KEYWORD_ENGINES: dict[str, Callable[..., tuple[str, _KeywordRows, Optional[str]]]] = {
+    "sklearn": _fit_sklearn,
+    "builtin": _fit_builtin,
+}
+
+
+def resolve_keyword_engine(name: str = "auto") -> str:
+    """Return the keyword engine to use for name.
+
+    "auto" picks scikit-learn when it is installed, else the built-in
+    engine. Raises ValueError for an unknown engine, or for "sklearn"
+    when scikit-learn is not installed.
+    """
+    sklearn_installed = importlib.util.find_spec("sklearn") is not None
+    if name == "auto":
+        return "sklearn" if sklearn_installed else "builtin"
+    if name not in KEYWORD_ENGINES:
+        choices = ", ".join(["auto", *KEYWORD_ENGINES])
+        raise ValueError(f"Unknown keyword engine '{name}' (choose from {choices})")
+    if name == "sklearn" and not sklearn_installed:
+        raise ValueError(
+            "scikit-learn is not installed. Install it or use the builtin "
+            "keyword engine."
+        )
+    return name
+
+
+def _fit_groups(
+    fit: Callable[..., tuple], tasks: list[tuple], workers: int
+) -> Iterator[tuple]:
+    """Yield fit results per group, fitting groups in parallel if workers > 1.
+
+    With a pool, results arrive in completion order, so the slowest group
+    bounds the total instead of the sum of all groups.
+    """
+    if workers <= 1 or len(tasks) < 2:
+        for task in tasks:
+            yield fit(*task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)),
+        mp_context=multiprocessing.get_context(),
+    ) as pool:
+        futures = [pool.submit(fit, *task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
 def extract_keywords_tfidf(
     conn: sqlite3.Connection,
     top_n: int = 10,
     progress: bool = True,
+    skip_langs: Optional[set[str]] = None,
+    on_group: Optional[Callable[[str], None]] = None,
+    workers: int = 1,
+    engine: str = "auto",
+    commit: bool = True,
 ) -> int:
     """Extract TF-IDF keywords per conversation with language-aware stopwords.
 
     Groups conversations by dominant language and applies appropriate stopword lists.
     For mixed-language conversations, uses combined stopwords from all detected languages.
+    Groups whose language is in skip_langs are left alone; on_group is called
+    with the language after each group's keywords are inserted (resumable
+    builds use it to checkpoint and commit per group). With workers > 1,
+    language groups are fitted in up to that many worker processes; the
+    parent inserts each group's keywords as it finishes. engine names a
+    KEYWORD_ENGINES entry or "auto" (see resolve_keyword_engine). With
+    commit=False the inserts are left in the caller's transaction.
 
     Returns the number of keyword entries created.
     """
-    try:
-        from sklearn.feature_extraction.text import TfidfVectorizer
-    except ImportError:
+    engine = resolve_keyword_engine(engine)
+    fit = KEYWORD_ENGINES[engine]
+
+    if progress:
         print(
-            "  Warning: scikit-learn not available. Skipping TF-IDF.",
+            f"  Running multilingual TF-IDF keyword extraction ({engine})...",
             file=sys.stderr,
         )
-        return 0
-
-    if progress:
-        print("  Running multilingual TF-IDF keyword extraction...", file=sys.stderr)
 
     start = time.time()
 
     # Fetch all messages grouped by conversation
     rows = conn.execute(
-        """SELECT conversation_id, GROUP_CONCAT(content, ' ') as full_text
-           FROM messages
-           WHERE content IS NOT NULL AND content != ''
-           GROUP BY conversation_id"""
+        """SELECT m.conversation_id, GROUP_CONCAT(b.content, ' ') as full_text
+           FROM messages m
+           JOIN bodies b ON b.id = m.body_id
+           WHERE m.is_canonical = 1 AND b.content IS NOT NULL AND b.content != ''
+           GROUP BY m.conversation_id"""
     ).fetchall()
 
     if not rows:
@@ -106,74 +324,55 @@ def extract_keywords_tfidf(
         lang = conv_languages[conv_id]
         lang_groups[lang].append(idx)
 
-    keyword_count = 0
-
+    # Build each pending group's inputs: texts plus stopwords combined from
+    # every language present in the group
+    tasks = []
     for lang, indices in lang_groups.items():
-        if len(indices) < 2:
-            # TF-IDF needs at least 2 documents; use min_df=1 for small groups
-            min_df = 1
-        else:
-            min_df = 2
-
-        # Build stopword list: combine stopwords from all languages in this group
-        all_langs_in_group = set()
-        all_langs_in_group.add(lang)
+        if skip_langs and lang in skip_langs:
+            continue
+        all_langs_in_group = {lang}
         for idx in indices:
             all_langs_in_group.update(conv_all_langs[valid_conv_ids[idx]])
 
         combined_stops = get_combined_stopwords(all_langs_in_group)
         stop_words_param = sorted(combined_stops) if combined_stops else "english"
 
-        group_texts = [valid_texts[i] for i in indices]
-        group_conv_ids = [valid_conv_ids[i] for i in indices]
-
-        vectorizer = TfidfVectorizer(
-            max_features=50000,
-            min_df=min_df,
-            max_df=0.8,
-            ngram_range=(1, 2),
-            stop_words=stop_words_param,
-            sublinear_tf=True,
-        )
+        tasks.append((
+            lang,
+            [valid_conv_ids[i] for i in indices],
+            [valid_texts[i] for i in indices],
+            stop_words_param,
+            top_n,
+        ))
 
-        try:
-            tfidf_matrix = vectorizer.fit_transform(group_texts)
-        except ValueError as e:
+    keyword_count = 0
+    for lang, keyword_rows, error in _fit_groups(fit, tasks, workers):
+        if error is not None:
             if progress:
                 print(
-                    f"  Warning: TF-IDF failed for '{lang}' group ({e}). Skipping.",
+                    f"  Warning: TF-IDF failed for '{lang}' group ({error}). Skipping.",
                     file=sys.stderr,
                 )
             continue
 
-        feature_names = vectorizer.get_feature_names_out()
-
-        for local_idx in range(len(group_conv_ids)):
-            conv_id = group_conv_ids[local_idx]
-            row_array = tfidf_matrix[local_idx].toarray().flatten()
-
-            top_indices = row_array.argsort()[-top_n:][::-1]
-
-            for feat_idx in top_indices:
-                score = float(row_array[feat_idx])
-                if score <= 0:
-                    continue
-
-                keyword = str(feature_names[feat_idx])
-                conn.execute(
-                    """INSERT INTO keywords (conversation_id, keyword, score)
-                       VALUES (?, ?, ?)""",
-                    (conv_id, keyword, round(score, 6)),
-                )
-                keyword_count += 1
+        conn.executemany(
+            """INSERT INTO keywords (conversation_id, keyword, score)
+               VALUES (?, ?, ?)""",
+            keyword_rows,
+        )
+        keyword_count += len(keyword_rows)
 
         if progress:
             print(
-                f"  TF-IDF: processed {len(group_conv_ids)} '{lang}' conversations...",
+                f"  TF-IDF: processed {len(lang_groups[lang])} "
+                f"'{lang}' conversations...",
                 file=sys.stderr,
             )
+        if on_group is not None:
+            on_group(lang)
 
-    conn.commit()
+    if commit:
+        conn.commit()
 
     duration = time.time() - start
     if progress:
@@ -1,24 +1,127 @@
 """Index parsed conversations into SQLite with FTS5."""
 
+import multiprocessing
+import os
+import queue
+import shutil
 import sqlite3
 import sys
+import tempfile
 import time
+import zlib
 from pathlib import Path
+from typing import IO, Optional
 
-from .db import drop_all, init_db
-from .enrichment import extract_keywords_tfidf
+from .db import (
+    backfill_cjk_fts,
+    body_hash,
+    body_lsh,
+    bump_index_generation,
+    create_fuzzy_table,
+    drop_all,
+    fill_conversation_summary,
+    fill_summary_keywords,
+    get_build_checkpoint,
+    get_index_generation,
+    has_table,
+    index_cjk_rows,
+    init_db,
+    set_build_checkpoint,
+)
+from .enrichment import extract_keywords_tfidf, resolve_keyword_engine
 from .languages import detect_language
 from .models import Conversation
-from .parser import parse_export
+from .parser import (
+    enumerate_export,
+    export_fingerprint,
+    export_size,
+    iter_raw_conversations,
+    parse_conversation,
+    parse_export,
+)
+from .profiling import BuildMetrics, timed_iter
 
+# Raw conversations handed to a shard worker per queue item
+_SHARD_BATCH_SIZE = 50
 
-def index_conversation(conn: sqlite3.Connection, conv: Conversation) -> int:
+# Seconds between worker liveness checks while the parent waits on a queue
+_WORKER_POLL_S = 1.0
+
+_FUZZY_FILL_SQL = """
+    INSERT INTO fuzzy_fts(rowid, title, code)
+    SELECT d.doc_id, d.title, d.code
+    FROM message_docs d
+    JOIN messages m ON m.rowid = d.doc_id
+"""
+
+
+def get_model_id(
+    conn: sqlite3.Connection,
+    slug: Optional[str],
+    cache: Optional[dict[str, int]] = None,
+) -> Optional[int]:
+    """Return the models.id for a slug, inserting it on first sight."""
+    if not slug:
+        return None
+    if cache is not None and slug in cache:
+        return cache[slug]
+    row = conn.execute("SELECT id FROM models WHERE slug = ?", (slug,)).fetchone()
+    if row is not None:
+        model_id = row[0]
+    else:
+        model_id = conn.execute(
+            "INSERT INTO models (slug) VALUES (?)", (slug,)
+        ).lastrowid
+    if cache is not None:
+        cache[slug] = model_id
+    return model_id
+
+
+def get_body_id(
+    conn: sqlite3.Connection, content: Optional[str], code: Optional[str]
+) -> int:
+    """Return the bodies.id for a message's text, inserting it on first sight.
+
+    New bodies get their MinHash bands (bodies.lsh) computed here, so
+    sharded builds sketch in the worker processes.
+    """
+    digest = body_hash(content, code)
+    row = conn.execute("SELECT id FROM bodies WHERE hash = ?", (digest,)).fetchone()
+    if row is not None:
+        return row[0]
+    return conn.execute(
+        "INSERT INTO bodies (hash, content, code, lsh) VALUES (?, ?, ?, ?)",
+        (digest, content, code, body_lsh(content, code)),
+    ).lastrowid
+
+
+def index_conversation(
+    conn: sqlite3.Connection,
+    conv: Conversation,
+    fts: bool = True,
+    metrics: Optional[BuildMetrics] = None,
+) -> int:
     """Insert a single conversation and its messages into the database.
 
     Detects language per message and stores it in the lang column.
+    Message text goes through get_body_id, so repeated bodies are stored
+    once. With fts=False the FTS rows are left for a later bulk insert
+    (used by sharded builds). If metrics is given, language detection,
+    row inserts and FTS inserts are timed separately. A conversation that
+    is already indexed (repeated in the export) is deleted first, so the
+    last copy wins. A message whose id already belongs to another
+    conversation is skipped, so the first copy wins (as in _merge_shard).
 
     Returns the number of messages inserted.
     """
+    exists = conn.execute(
+        "SELECT 1 FROM conversations WHERE id = ?", (conv.id,)
+    ).fetchone()
+    if exists:
+        # INSERT OR REPLACE alone would leave the external-content FTS
+        # entries of the replaced messages pointing at deleted rows
+        delete_conversation(conn, conv.id, fts=fts)
+
     conn.execute(
         """INSERT OR REPLACE INTO conversations
            (id, title, created_at, updated_at, default_model_slug, message_count)
@@ -33,37 +136,70 @@ def index_conversation(conn: sqlite3.Connection, conv: Conversation) -> int:
         ),
     )
 
+    model_ids: dict[str, int] = {}
     msg_count = 0
     for msg in conv.messages:
+        taken = conn.execute(
+            "SELECT 1 FROM messages WHERE id = ?", (msg.id,)
+        ).fetchone()
+        if taken:
+            continue  # replacing the row would orphan its FTS entries
+
         # Detect language from message content
+        t0 = time.perf_counter()
         lang = detect_language(msg.content or "")
+        t1 = time.perf_counter()
 
         try:
             cursor = conn.execute(
-                """INSERT OR REPLACE INTO messages
-                   (id, conversation_id, role, content, code, content_type,
-                    model_slug, created_at, turn_index, lang)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                """INSERT INTO messages
+                   (id, conversation_id, role, body_id, content_type,
+                    model_id, created_at, turn_index, lang, parent_id,
+                    is_canonical)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
                 (
                     msg.id,
                     msg.conversation_id,
                     msg.role,
-                    msg.content,
-                    msg.code,
+                    get_body_id(conn, msg.content, msg.code),
                     msg.content_type,
-                    msg.model_slug,
+                    get_model_id(conn, msg.model_slug, model_ids),
                     msg.created_at,
                     msg.turn_index,
                     lang,
+                    msg.parent_id,
+                    msg.is_canonical,
                 ),
             )
-            # Insert into FTS index with conversation title for boosting
-            rowid = cursor.lastrowid
-            conn.execute(
-                """INSERT INTO messages_fts(rowid, title, content, code)
-                   VALUES (?, ?, ?, ?)""",
-                (rowid, conv.title, msg.content, msg.code),
-            )
+            block_ids = [
+                conn.execute(
+                    """INSERT INTO code_blocks (message_id, ordinal, fence_lang, text)
+                       VALUES (?, ?, ?, ?)""",
+                    (msg.id, ordinal, fence_lang, text),
+                ).lastrowid
+                for ordinal, (fence_lang, text) in enumerate(msg.code_blocks)
+            ]
+            t2 = time.perf_counter()
+            if fts:
+                # Insert into FTS index with conversation title for boosting
+                rowid = cursor.lastrowid
+                conn.execute(
+                    """INSERT INTO messages_fts(rowid, title, content, code)
+                       VALUES (?, ?, ?, ?)""",
+                    (rowid, conv.title, msg.content, msg.code),
+                )
+                index_cjk_rows(conn, [(rowid, conv.title, msg.content)])
+                conn.executemany(
+                    "INSERT INTO code_fts(rowid, text) VALUES (?, ?)",
+                    [
+                        (block_id, text)
+                        for block_id, (_, text) in zip(block_ids, msg.code_blocks)
+                    ],
+                )
+            if metrics is not None:
+                metrics.add_time("detect_language", t1 - t0)
+                metrics.add_time("sqlite_insert", t2 - t1)
+                metrics.add_time("fts_insert", time.perf_counter() - t2)
             msg_count += 1
         except sqlite3.IntegrityError:
             # Duplicate message ID — skip
@@ -72,26 +208,590 @@ def index_conversation(conn: sqlite3.Connection, conv: Conversation) -> int:
     return msg_count
 
 
+def delete_conversation(
+    conn: sqlite3.Connection, conversation_id: str, fts: bool = True
+) -> int:
+    """Remove a conversation with its messages, FTS rows, keywords and summary.
+
+    Bodies left unreferenced are deleted too. fts=False skips the FTS
+    tables, for rows that were indexed with fts=False and so have no FTS
+    entries yet (deleting absent entries from an external-content index
+    corrupts it). Returns the number of messages removed. The caller
+    commits.
+    """
+    if fts:
+        conn.execute(
+            """DELETE FROM messages_fts WHERE rowid IN
+               (SELECT rowid FROM messages WHERE conversation_id = ?)""",
+            (conversation_id,),
+        )
+        conn.execute(
+            """DELETE FROM cjk_fts WHERE rowid IN
+               (SELECT rowid FROM messages WHERE conversation_id = ?)""",
+            (conversation_id,),
+        )
+        # code_fts is external-content: removal needs the indexed text
+        conn.execute(
+            """INSERT INTO code_fts(code_fts, rowid, text)
+               SELECT 'delete', b.id, b.text
+               FROM code_blocks b JOIN messages m ON m.id = b.message_id
+               WHERE m.conversation_id = ?""",
+            (conversation_id,),
+        )
+    conn.execute(
+        """DELETE FROM code_blocks WHERE message_id IN
+           (SELECT id FROM messages WHERE conversation_id = ?)""",
+        (conversation_id,),
+    )
+    if fts and has_table(conn, "fuzzy_fts"):
+        conn.execute(
+            """DELETE FROM fuzzy_fts WHERE rowid IN
+               (SELECT rowid FROM messages WHERE conversation_id = ?)""",
+            (conversation_id,),
+        )
+    body_ids = [
+        row[0]
+        for row in conn.execute(
+            "SELECT DISTINCT body_id FROM messages WHERE conversation_id = ?",
+            (conversation_id,),
+        )
+    ]
+    removed = conn.execute(
+        "DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)
+    ).rowcount
+    conn.executemany(
+        """DELETE FROM bodies WHERE id = ? AND NOT EXISTS
+           (SELECT 1 FROM messages WHERE body_id = ?)""",
+        [(body_id, body_id) for body_id in body_ids],
+    )
+    conn.execute("DELETE FROM keywords WHERE conversation_id = ?", (conversation_id,))
+    conn.execute(
+        "DELETE FROM conversation_summary WHERE conversation_id = ?",
+        (conversation_id,),
+    )
+    conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+    return removed
+
+
+def build_fuzzy_index(conn: sqlite3.Connection) -> int:
+    """(Re)build the trigram fuzzy index from indexed messages.
+
+    Can be run on an existing database; the caller commits.
+    Returns the number of rows indexed.
+    """
+    create_fuzzy_table(conn)
+    conn.execute("DELETE FROM fuzzy_fts")
+    rows = conn.execute(_FUZZY_FILL_SQL).rowcount
+    conn.execute("INSERT INTO fuzzy_fts(fuzzy_fts) VALUES('optimize')")
+    return rows
+
+
+def _commit(conn: sqlite3.Connection, metrics: Optional[BuildMetrics]) -> None:
+    """Commit, recording commit latency when metrics are collected."""
+    start = time.perf_counter()
+    conn.commit()
+    if metrics is not None:
+        metrics.add_time("commit", time.perf_counter() - start)
+        metrics.count("commits")
+
+
+def _shard_worker(
+    shard_path: str, batches, results, branches: bool = False
+) -> None:
+    """Worker process: parse, detect language and store rows in one shard DB.
+
+    Consumes lists of raw conversation dicts from `batches` until a None
+    sentinel arrives, then reports (shard_path, conversations, messages,
+    skipped, error, metrics) on `results`. After a failure the worker keeps
+    draining the queue so the producer never blocks.
+    """
+    metrics = BuildMetrics()
+    conversations = 0
+    messages = 0
+    skipped = 0
+    error = None
+    conn = None
+    try:
+        conn = init_db(Path(shard_path))
+        conn.execute("PRAGMA synchronous=OFF")  # throwaway file
+    except Exception as e:
+        error = repr(e)
+
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        if error is not None:
+            continue
+        try:
+            for conv_data in batch:
+                try:
+                    conv = parse_conversation(conv_data, metrics, branches)
+                except Exception:
+                    conv = None
+                if conv is None:
+                    skipped += 1
+                    continue
+                messages += index_conversation(
+                    conn, conv, fts=False, metrics=metrics
+                )
+                conversations += 1
+            _commit(conn, metrics)
+        except Exception as e:
+            error = repr(e)
+
+    if conn is not None:
+        conn.close()
+    results.put(
+        (shard_path, conversations, messages, skipped, error, metrics.as_dict())
+    )
+
+
+def _check_workers(procs: list) -> None:
+    """Raise RuntimeError if a shard worker process died (segfault, OOM kill)."""
+    for proc in procs:
+        if proc.exitcode not in (None, 0):
+            raise RuntimeError(
+                f"Shard worker {proc.name} exited with code {proc.exitcode}"
+            )
+
+
+def _shard_for(conv_data, workers: int) -> int:
+    """Return the shard for a raw conversation, by its conversation id.
+
+    Every copy of a repeated conversation goes to the same shard, where
+    index_conversation replaces earlier copies as in a serial build.
+    """
+    conv_id = ""
+    if isinstance(conv_data, dict):
+        conv_id = conv_data.get("conversation_id") or conv_data.get("id") or ""
+    return zlib.crc32(str(conv_id).encode("utf-8")) % workers
+
+
+def _put_batch(batches, item, procs: list) -> None:
+    """Put item on the bounded batch queue, failing if a worker dies."""
+    while True:
+        try:
+            batches.put(item, timeout=_WORKER_POLL_S)
+            return
+        except queue.Full:
+            _check_workers(procs)
+
+
+def _merge_shard(conn: sqlite3.Connection, shard_path: Path) -> None:
+    """Copy a shard's conversations and messages into the main database.
+
+    Message rowids are offset past the current maximum so every shard
+    lands in a disjoint rowid range. Shard-local model and body ids are
+    remapped through the slug and the body hash, so a body repeated
+    across shards is still stored once. Conversations are partitioned
+    across shards (_shard_for), so one already in the main database
+    predates this build and is replaced, as index_conversation does; a
+    message id already taken by another conversation keeps its first
+    copy, as there.
+    """
+    conn.commit()  # ATTACH is not allowed inside a transaction
+    conn.execute("ATTACH DATABASE ? AS shard", (str(shard_path),))
+    try:
+        repeated = [
+            row[0]
+            for row in conn.execute(
+                """SELECT s.id FROM shard.conversations s
+                   JOIN main.conversations c ON c.id = s.id"""
+            )
+        ]
+        for conversation_id in repeated:
+            delete_conversation(conn, conversation_id)
+        conn.execute(
+            """INSERT INTO conversations
+               (id, title, created_at, updated_at, default_model_slug, message_count)
+               SELECT id, title, created_at, updated_at, default_model_slug,
+                      message_count
+               FROM shard.conversations"""
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO main.models (slug) SELECT slug FROM shard.models"
+        )
+        conn.execute(
+            """INSERT OR IGNORE INTO main.bodies (hash, content, code, lsh)
+               SELECT hash, content, code, lsh FROM shard.bodies ORDER BY id"""
+        )
+        offset = conn.execute(
+            "SELECT COALESCE(MAX(rowid), 0) FROM messages"
+        ).fetchone()[0]
+        conn.execute(
+            """INSERT OR IGNORE INTO messages
+               (rowid, id, conversation_id, role, body_id, content_type,
+                model_id, created_at, turn_index, lang, parent_id, is_canonical)
+               SELECT s.rowid + ?, s.id, s.conversation_id, s.role, mb.id,
+                      s.content_type, mm.id, s.created_at, s.turn_index, s.lang,
+                      s.parent_id, s.is_canonical
+               FROM shard.messages s
+               JOIN shard.bodies sb ON sb.id = s.body_id
+               JOIN main.bodies mb ON mb.hash = sb.hash
+               LEFT JOIN shard.models sm ON sm.id = s.model_id
+               LEFT JOIN main.models mm ON mm.slug = sm.slug
+               ORDER BY s.rowid""",
+            (offset,),
+        )
+        # Only blocks of messages this shard added (duplicates were ignored)
+        conn.execute(
+            """INSERT INTO code_blocks (message_id, ordinal, fence_lang, text)
+               SELECT message_id, ordinal, fence_lang, text
+               FROM shard.code_blocks
+               WHERE message_id IN (SELECT id FROM main.messages WHERE rowid > ?)
+               ORDER BY id""",
+            (offset,),
+        )
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE shard")
+
+
+def _build_sharded(
+    json_path: Path,
+    db_path: Path,
+    conn: sqlite3.Connection,
+    workers: int,
+    progress: bool,
+    metrics: BuildMetrics,
+    start: int = 0,
+    branches: bool = False,
+) -> tuple[int, int]:
+    """Index an export across worker processes, one SQLite shard each.
+
+    The parent streams raw conversations to the workers, which do the
+    expensive parsing, text cleaning and language detection. Shards are
+    then merged with ATTACH + INSERT ... SELECT and the FTS index is
+    filled from the merged rows in one bulk statement. Worker-side phase
+    times are summed across workers, so they can exceed wall time. The
+    first `start` export records are skipped (resumed builds). branches
+    is passed to parse_conversation in the workers. Queue waits poll the
+    workers, so one that dies (segfault, OOM kill) raises RuntimeError
+    instead of hanging the build.
+
+    Returns (conversation_count, message_count), the latter counted
+    after the merge.
+    """
+    ctx = multiprocessing.get_context()
+    shard_dir = Path(tempfile.mkdtemp(prefix=".shards-", dir=db_path.parent))
+    # One queue per worker: conversations are routed by _shard_for
+    queues = [ctx.Queue(maxsize=2) for _ in range(workers)]
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(
+            target=_shard_worker,
+            args=(str(shard_dir / f"shard-{i}.db"), queues[i], results, branches),
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+
+    try:
+        for proc in procs:
+            proc.start()
+
+        total = 0
+        batches: list[list[dict]] = [[] for _ in range(workers)]
+        records = timed_iter(
+            iter_raw_conversations(json_path), metrics, "json_load"
+        )
+        try:
+            for i, conv_data in enumerate(records):
+                if i < start:
+                    continue
+                shard = _shard_for(conv_data, workers)
+                batches[shard].append(conv_data)
+                total += 1
+                if len(batches[shard]) >= _SHARD_BATCH_SIZE:
+                    _put_batch(queues[shard], batches[shard], procs)
+                    batches[shard] = []
+            for shard, batch in enumerate(batches):
+                if batch:
+                    _put_batch(queues[shard], batch, procs)
+        finally:
+            for shard_queue in queues:
+                _put_batch(shard_queue, None, procs)
+
+        with metrics.phase("shard_wait"):
+            outcomes = []
+            while len(outcomes) < len(procs):
+                try:
+                    outcomes.append(results.get(timeout=_WORKER_POLL_S))
+                except queue.Empty:
+                    _check_workers(procs)
+            for proc in procs:
+                proc.join()
+
+        errors = [o[4] for o in outcomes if o[4] is not None]
+        if errors:
+            raise RuntimeError(f"Shard worker failed: {errors[0]}")
+
+        outcomes.sort(key=lambda o: o[0])  # merge in shard order, not finish order
+        skipped = sum(o[3] for o in outcomes)
+        for outcome in outcomes:
+            metrics.merge(outcome[5])
+        metrics.count("conversations_skipped", skipped)
+        if progress:
+            print(
+                f"  Parsed {total - skipped}/{total} conversations "
+                f"({skipped} skipped) across {workers} workers",
+                file=sys.stderr,
+            )
+
+        first_new_rowid = conn.execute(
+            "SELECT COALESCE(MAX(rowid), 0) FROM messages"
+        ).fetchone()[0]
+        conversations_before = conn.execute(
+            "SELECT COUNT(*) FROM conversations"
+        ).fetchone()[0]
+        messages_before = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        first_new_block = conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM code_blocks"
+        ).fetchone()[0]
+        with metrics.phase("shard_merge"):
+            for shard_path, *_ in outcomes:
+                _merge_shard(conn, Path(shard_path))
+                if progress:
+                    print(f"  Merged {Path(shard_path).name}", file=sys.stderr)
+        # Count net rows, as a serial build does: replaced conversations
+        # and ignored message ids are not counted twice
+        conversations = conn.execute(
+            "SELECT COUNT(*) FROM conversations"
+        ).fetchone()[0] - conversations_before
+        messages = conn.execute(
+            "SELECT COUNT(*) FROM messages"
+        ).fetchone()[0] - messages_before
+
+        with metrics.phase("fts_insert"):
+            conn.execute(
+                """INSERT INTO messages_fts(rowid, title, content, code)
+                   SELECT doc_id, title, content, code
+                   FROM message_docs WHERE doc_id > ?""",
+                (first_new_rowid,),
+            )
+            backfill_cjk_fts(conn, first_new_rowid)
+            conn.execute(
+                """INSERT INTO code_fts(rowid, text)
+                   SELECT id, text FROM code_blocks WHERE id > ?""",
+                (first_new_block,),
+            )
+        with metrics.phase("fts_optimize"):
+            conn.execute(
+                "INSERT INTO messages_fts(messages_fts) VALUES('optimize')"
+            )
+        _commit(conn, metrics)
+        return conversations, messages
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+
+def _refresh_keywords(
+    conn: sqlite3.Connection, progress: bool, engine: str = "auto"
+) -> int:
+    """Recompute TF-IDF keywords for the whole corpus.
+
+    Deleting the old keywords, inserting the new ones and copying them
+    into conversation_summary happen in one transaction, which is left
+    open for the caller to commit (update_index commits it with the
+    generation bump), so readers see either the previous set or the new
+    one.
+    """
+    try:
+        conn.execute("DELETE FROM keywords")
+        count = extract_keywords_tfidf(
+            conn, progress=progress, engine=engine, commit=False
+        )
+        fill_summary_keywords(conn)
+        return count
+    except Exception as e:
+        conn.rollback()
+        if progress:
+            print(f"  Warning: Enrichment error: {e}", file=sys.stderr)
+        return 0
+
+
+def _start_checkpoint(
+    conn: sqlite3.Connection,
+    json_path: Path,
+    resume: bool,
+    branches: bool,
+    keyword_engine: str = "auto",
+) -> dict:
+    """Return the checkpoint a build continues from, storing a fresh one if needed.
+
+    A resumed build must be for the same export (by export_fingerprint)
+    as the interrupted one, and keeps its branches and keyword_engine
+    settings. Rows past the last indexing checkpoint (left by a sharded
+    merge that did not finish) are discarded first.
+    """
+    fingerprint = export_fingerprint(json_path)
+    if not resume:
+        checkpoint = {
+            "export_fingerprint": fingerprint,
+            "state": "indexing",
+            "offset": 0,
+            "max_rowid": conn.execute(
+                "SELECT COALESCE(MAX(rowid), 0) FROM messages"
+            ).fetchone()[0],
+            "conversations": 0,
+            "messages": 0,
+            "enriched_langs": [],
+            "branches": branches,
+            "keyword_engine": keyword_engine,
+        }
+        set_build_checkpoint(conn, checkpoint)
+        conn.commit()
+        return checkpoint
+
+    checkpoint = get_build_checkpoint(conn)
+    if checkpoint is None or checkpoint["state"] == "complete":
+        raise ValueError(
+            "Nothing to resume: the index has no interrupted build. "
+            "Run a normal rebuild instead."
+        )
+    if checkpoint.get("export_fingerprint") != fingerprint:
+        raise ValueError(
+            f"Cannot resume: {json_path} is not the export the interrupted "
+            f"build was reading. Run a full rebuild instead."
+        )
+    if checkpoint["state"] == "indexing":
+        max_rowid = checkpoint["max_rowid"]
+        orphans = conn.execute(
+            """DELETE FROM code_blocks WHERE message_id IN
+               (SELECT id FROM messages WHERE rowid > ?)""",
+            (max_rowid,),
+        ).rowcount
+        if orphans:
+            # Unknown which of them were indexed; re-derive from the table
+            conn.execute("INSERT INTO code_fts(code_fts) VALUES('rebuild')")
+        for table in ("cjk_fts", "fuzzy_fts"):
+            if has_table(conn, table):
+                conn.execute(f"DELETE FROM {table} WHERE rowid > ?", (max_rowid,))
+        orphans = conn.execute(
+            "DELETE FROM messages WHERE rowid > ?", (max_rowid,)
+        ).rowcount
+        if orphans:
+            # messages_fts is external-content too
+            conn.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild')")
+            conn.execute(
+                """DELETE FROM bodies WHERE NOT EXISTS
+                   (SELECT 1 FROM messages WHERE body_id = bodies.id)"""
+            )
+        conn.commit()
+    return checkpoint
+
+
+def _save_checkpoint(
+    conn: sqlite3.Connection, checkpoint: dict, **fields
+) -> None:
+    """Update checkpoint fields and store them; the caller commits."""
+    checkpoint.update(fields)
+    checkpoint["max_rowid"] = conn.execute(
+        "SELECT COALESCE(MAX(rowid), 0) FROM messages"
+    ).fetchone()[0]
+    set_build_checkpoint(conn, checkpoint)
+
+
+def _build_keywords(
+    conn: sqlite3.Connection,
+    checkpoint: dict,
+    progress: bool,
+    workers: int = 1,
+    engine: str = "auto",
+) -> int:
+    """Extract keywords, committing and checkpointing per language group.
+
+    Groups already listed in the checkpoint are kept, so a resumed build
+    only fits the remaining ones. With workers > 1 the language groups
+    are fitted in parallel. The top keywords are then copied into
+    conversation_summary. Returns the number of keywords stored.
+    """
+    done = set(checkpoint["enriched_langs"])
+
+    def _group_done(lang: str) -> None:
+        checkpoint["enriched_langs"].append(lang)
+        set_build_checkpoint(conn, checkpoint)
+        conn.commit()
+
+    try:
+        if not done:
+            conn.execute("DELETE FROM keywords")
+        extract_keywords_tfidf(
+            conn,
+            progress=progress,
+            skip_langs=done,
+            on_group=_group_done,
+            workers=workers,
+            engine=engine,
+        )
+        fill_summary_keywords(conn)
+    except Exception as e:
+        conn.rollback()
+        if progress:
+            print(f"  Warning: Enrichment error: {e}", file=sys.stderr)
+    return conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+
+
 def build_index(
     json_path: Path,
     db_path: Path,
     rebuild: bool = False,
     progress: bool = True,
+    workers: int = 1,
+    metrics_out: Optional[IO[str]] = None,
+    fuzzy: bool = False,
+    resume: bool = False,
+    branches: bool = False,
+    keyword_engine: str = "auto",
 ) -> dict:
-    """Build the full search index from a conversations.json export.
+    """Build the full search index from a ChatGPT export.
+
+    Progress is checkpointed in meta (see get_build_checkpoint) with every
+    commit: the export offset while indexing, then each finished TF-IDF
+    language group. With resume=True an interrupted build of the same
+    export continues from its checkpoint instead of starting over.
 
     Args:
-        json_path: Path to conversations.json
+        json_path: Path to conversations.json or the export .zip
         db_path: Path for the SQLite database
         rebuild: If True, drop and recreate all tables
         progress: If True, print progress to stderr
+        workers: Number of worker processes. Values above 1 build
+            per-worker SQLite shards and merge them, and fit TF-IDF
+            language groups in parallel; 0 uses one per CPU.
+        metrics_out: Optional text stream that receives build events
+            (phases, progress, final summary) as JSON lines
+        fuzzy: If True, also build the trigram index used by fuzzy_search
+        resume: If True, continue an interrupted build (rebuild is ignored);
+            raises ValueError if there is none or the export changed
+        branches: If True, also index regenerated and edited branches off
+            the canonical thread (is_canonical=0); update_index keeps
+            doing so for this database
+        keyword_engine: TF-IDF engine ("auto", "sklearn" or "builtin",
+            see enrichment.KEYWORD_ENGINES); the resolved engine is stored,
+            and resumed builds and update_index keep using it.
+            Raises ValueError if it is unknown or unavailable
 
     Returns:
-        Stats dict with conversation_count, message_count, duration_s
+        Stats dict with conversation_count, message_count, duration_s,
+        plus per-phase timings (phases, max_s), counters, throughput
+        (messages_per_s, mb_per_s) and resumed_from (the checkpoint
+        state a resumed build started from, else None)
     """
     start = time.time()
+    metrics = BuildMetrics(emit=metrics_out)
 
-    if rebuild and db_path.exists():
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    # Fail before dropping anything; the checkpoint stores the resolved
+    # engine so "auto" cannot switch engines between runs
+    keyword_engine = resolve_keyword_engine(keyword_engine)
+
+    if rebuild and not resume and db_path.exists():
         conn = sqlite3.connect(str(db_path))
         drop_all(conn)
         conn.close()
@@ -99,50 +799,124 @@ def build_index(
             print("  Dropped existing tables for rebuild.", file=sys.stderr)
 
     conn = init_db(db_path)
+    try:
+        checkpoint = _start_checkpoint(
+            conn, json_path, resume, branches, keyword_engine
+        )
+    except Exception:
+        conn.close()
+        raise
+    resumed_from = checkpoint["state"] if resume else None
+    branches = checkpoint.get("branches", False)
+    keyword_engine = checkpoint.get("keyword_engine", "auto")
+    if resumed_from and progress:
+        print(
+            f"  Resuming {resumed_from} from checkpoint "
+            f"({checkpoint['conversations']} conversations, "
+            f"{len(checkpoint['enriched_langs'])} keyword groups done)",
+            file=sys.stderr,
+        )
+
+    bytes_parsed = export_size(json_path)
+    metrics.count("bytes_parsed", bytes_parsed)
+    metrics.event("start", export=str(json_path), bytes=bytes_parsed, workers=workers)
 
     if progress:
         print(f"  Parsing {json_path.name}...", file=sys.stderr)
 
-    total_conversations = 0
-    total_messages = 0
+    total_conversations = checkpoint["conversations"]
+    total_messages = checkpoint["messages"]
 
     # Use a transaction for bulk inserts
     try:
-        for conv in parse_export(json_path, progress=progress):
-            msg_count = index_conversation(conn, conv)
-            total_conversations += 1
-            total_messages += msg_count
+        # A build resumed during enrichment skips straight to TF-IDF
+        indexing = checkpoint["state"] == "indexing"
+        if indexing and workers > 1:
+            conversations, messages = _build_sharded(
+                json_path, db_path, conn, workers, progress, metrics,
+                start=checkpoint["offset"], branches=branches,
+            )
+            total_conversations += conversations
+            total_messages += messages
+        elif indexing:
+            records = enumerate_export(
+                json_path, progress=progress, metrics=metrics,
+                start=checkpoint["offset"], branches=branches,
+            )
+            for offset, conv in records:
+                # A repeated conversation replaces its earlier copy, so
+                # count it and its messages once
+                replaced, replaced_messages = conn.execute(
+                    """SELECT EXISTS(SELECT 1 FROM conversations WHERE id = ?1),
+                              (SELECT COUNT(*) FROM messages
+                               WHERE conversation_id = ?1)""",
+                    (conv.id,),
+                ).fetchone()
+                msg_count = index_conversation(conn, conv, metrics=metrics)
+                total_conversations += 0 if replaced else 1
+                total_messages += msg_count - replaced_messages
 
-            # Commit every 100 conversations for progress safety
-            if total_conversations % 100 == 0:
-                conn.commit()
-                if progress:
-                    print(
-                        f"  Indexed {total_conversations} conversations, "
-                        f"{total_messages} messages...",
-                        file=sys.stderr,
+                # Commit every 100 conversations for progress safety
+                if total_conversations % 100 == 0:
+                    _save_checkpoint(
+                        conn,
+                        checkpoint,
+                        offset=offset + 1,
+                        conversations=total_conversations,
+                        messages=total_messages,
+                    )
+                    _commit(conn, metrics)
+                    metrics.event(
+                        "progress",
+                        conversations=total_conversations,
+                        messages=total_messages,
+                        elapsed_s=round(metrics.elapsed, 3),
                     )
+                    if progress:
+                        print(
+                            f"  Indexed {total_conversations} conversations, "
+                            f"{total_messages} messages...",
+                            file=sys.stderr,
+                        )
 
-        conn.commit()
+        if indexing:
+            with metrics.phase("summaries"):
+                fill_conversation_summary(conn)
+        if fuzzy and indexing:
+            with metrics.phase("fuzzy_index"):
+                build_fuzzy_index(conn)
+        _save_checkpoint(
+            conn,
+            checkpoint,
+            state="enriching",
+            conversations=total_conversations,
+            messages=total_messages,
+        )
+        _commit(conn, metrics)
     except Exception:
         conn.rollback()
         raise
     finally:
         conn.close()
+    index_duration = metrics.elapsed
 
     # Phase 2: Enrichment (TF-IDF keywords)
     # Re-open connection for enrichment pass
     conn = init_db(db_path)
     try:
-        keyword_count = extract_keywords_tfidf(conn, progress=progress)
-    except Exception as e:
-        if progress:
-            print(f"  Warning: Enrichment error: {e}", file=sys.stderr)
-        keyword_count = 0
+        with metrics.phase("tfidf"):
+            keyword_count = _build_keywords(
+                conn, checkpoint, progress, workers, keyword_engine
+            )
+        bump_index_generation(conn)
+        _save_checkpoint(conn, checkpoint, state="complete")
+        conn.commit()
     finally:
         conn.close()
 
     duration = time.time() - start
+    metrics.count("conversations", total_conversations)
+    metrics.count("messages", total_messages)
 
     stats = {
         "conversation_count": total_conversations,
@@ -150,7 +924,19 @@ def build_index(
         "keyword_count": keyword_count,
         "duration_s": round(duration, 2),
         "db_path": str(db_path),
+        "resumed_from": resumed_from,
+        "bytes_parsed": bytes_parsed,
+        "messages_per_s": round(total_messages / index_duration, 1)
+        if index_duration > 0
+        else 0.0,
+        "mb_per_s": round(bytes_parsed / (1024 * 1024) / index_duration, 2)
+        if index_duration > 0
+        else 0.0,
+        **metrics.as_dict(),
     }
+    metrics.event(
+        "done", **{k: v for k, v in stats.items() if k != "db_path"}
+    )
 
     if progress:
         print(
@@ -161,3 +947,91 @@ def build_index(
         )
 
     return stats
+
+
+def update_index(
+    json_path: Path,
+    db_path: Path,
+    progress: bool = True,
+) -> dict:
+    """Incrementally index an export into an existing (or new) database.
+
+    Conversations whose update_time is not newer than the indexed copy are
+    skipped; new or changed ones replace their old rows, FTS entries and
+    keywords. Writes are committed in small batches so WAL readers keep
+    searching throughout. The fuzzy index is kept in step if the database
+    has one. If anything changed, keywords are recomputed and the index
+    generation is bumped. Branches are indexed, and keywords fitted with
+    the keyword engine, that the last build_index of this database used.
+
+    Returns:
+        Stats dict with conversation_count (seen in the export), added,
+        updated, unchanged, message_count (inserted), keyword_count,
+        index_generation and duration_s
+    """
+    start = time.time()
+    conn = init_db(db_path)
+    added = updated = unchanged = total_messages = 0
+    keyword_count = 0
+    try:
+        indexed = dict(conn.execute("SELECT id, updated_at FROM conversations"))
+        fuzzy = has_table(conn, "fuzzy_fts")
+        build = get_build_checkpoint(conn) or {}
+        branches = build.get("branches", False)
+        for conv in parse_export(json_path, progress=progress, branches=branches):
+            if conv.id in indexed:
+                previous = indexed[conv.id]
+                if (
+                    previous is not None
+                    and conv.updated_at is not None
+                    and conv.updated_at <= previous
+                ):
+                    unchanged += 1
+                    continue
+                delete_conversation(conn, conv.id)
+                updated += 1
+            else:
+                added += 1
+            total_messages += index_conversation(conn, conv)
+            fill_conversation_summary(conn, conv.id)
+            if fuzzy:
+                conn.execute(
+                    _FUZZY_FILL_SQL + " WHERE m.conversation_id = ?", (conv.id,)
+                )
+            indexed[conv.id] = conv.updated_at
+
+            if (added + updated) % 100 == 0:
+                conn.commit()
+        conn.commit()
+
+        if added or updated:
+            keyword_count = _refresh_keywords(
+                conn, progress, build.get("keyword_engine", "auto")
+            )
+            bump_index_generation(conn)
+            conn.commit()
+        generation = get_index_generation(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    duration = time.time() - start
+    if progress:
+        print(
+            f"  Update: {added} new, {updated} changed, {unchanged} unchanged "
+            f"conversations ({total_messages} messages) in {duration:.1f}s",
+            file=sys.stderr,
+        )
+
+    return {
+        "conversation_count": added + updated + unchanged,
+        "added": added,
+        "updated": updated,
+        "unchanged": unchanged,
+        "message_count": total_messages,
+        "keyword_count": keyword_count,
+        "index_generation": generation,
+        "duration_s": round(duration, 2),
+    }
@@ -12,6 +12,10 @@ TARGET_LANGUAGES = {
     "pt", "ru", "ja", "de", "ko", "tr", "vi", "it",
 }
 
+# Languages written without spaces between words; indexed and keyword-
+# extracted as character bigrams (see utils.segment_cjk)
+CJK_LANGUAGES = {"zh", "ja", "ko"}
+
 # ---------------------------------------------------------------------------
 # Language detection
 # ---------------------------------------------------------------------------
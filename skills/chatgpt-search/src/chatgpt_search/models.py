@@ -1,10 +1,14 @@
-"""Data models for ChatGPT conversations and messages."""
+"""Data models for ChatGPT conversations and messages.
+
+Models use __slots__: parsing creates one Message per exported message,
+so dropping the per-instance __dict__ matters on large exports.
+"""
 
 from dataclasses import dataclass, field
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """A single message extracted from a conversation."""
 
@@ -17,9 +21,13 @@ class Message:
     model_slug: Optional[str]
     created_at: Optional[float]  # Unix timestamp
     turn_index: int  # 0-based position in linearized conversation
+    # Individual code blocks as (fence_lang, code); `code` is their join
+    code_blocks: list[tuple[Optional[str], str]] = field(default_factory=list)
+    parent_id: Optional[str] = None  # previous message on this message's branch
+    is_canonical: bool = True  # on the thread ending at current_node
 
 
-@dataclass
+@dataclass(slots=True)
 class Conversation:
     """A conversation with its metadata and messages."""
 
@@ -32,4 +40,5 @@ class Conversation:
 
     @property
     def message_count(self) -> int:
-        return len(self.messages)
+        """Messages on the canonical thread (branch messages not counted)."""
+        return sum(1 for msg in self.messages if msg.is_canonical)
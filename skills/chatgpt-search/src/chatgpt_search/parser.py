@@ -1,12 +1,30 @@
 """Parse ChatGPT conversations.json export into structured data."""
 
+import hashlib
+import io
 import json
 import sys
+import time
+import zipfile
 from pathlib import Path
-from typing import Iterator
+from typing import IO, Iterator, Optional
 
 from .models import Conversation, Message
-from .utils import clean_text, extract_text_from_parts, separate_code
+from .profiling import BuildMetrics, timed_iter
+from .utils import (
+    clean_and_split_blocks,
+    clean_text,
+    extract_text_from_parts,
+    normalize_code_lang,
+)
+
+# Name of the conversations file inside a ChatGPT export archive
+EXPORT_MEMBER = "conversations.json"
+
+# Read size for the streaming JSON decoder
+_CHUNK_SIZE = 1 << 20
+
+_JSON_WHITESPACE = " \t\n\r"
 
 
 def _walk_canonical_thread(mapping: dict, current_node: str) -> list[str]:
@@ -32,10 +50,39 @@ def _walk_canonical_thread(mapping: dict, current_node: str) -> list[str]:
     return path
 
 
+def _walk_all_branches(mapping: dict) -> Iterator[tuple[str, Optional[str]]]:
+    """Yield (node_id, parent_node_id) for every node in the tree, depth-first.
+
+    Each node is visited exactly once, so a prefix shared by several
+    branches is yielded once rather than once per branch. Roots are
+    nodes whose parent is missing from the mapping.
+    """
+    children: dict[str, list[str]] = {}
+    roots = []
+    for node_id, node in mapping.items():
+        parent = node.get("parent")
+        if parent in mapping:
+            children.setdefault(parent, []).append(node_id)
+        else:
+            roots.append(node_id)
+
+    visited = set()
+    stack = [(node_id, None) for node_id in reversed(roots)]
+    while stack:
+        node_id, parent = stack.pop()
+        if node_id in visited:
+            continue
+        visited.add(node_id)
+        yield node_id, parent
+        for child in reversed(children.get(node_id, [])):
+            stack.append((child, node_id))
+
+
 def _parse_message(
     node: dict,
     conversation_id: str,
     turn_index: int,
+    metrics: Optional[BuildMetrics] = None,
 ) -> Message | None:
     """Parse a single message node into a Message object.
 
@@ -70,15 +117,21 @@ def _parse_message(
         return None
 
     # Clean text
-    cleaned = clean_text(raw_text)
-
+    clean_start = time.perf_counter()
     # For 'code' content type, the entire text is code (not prose with code blocks)
     if content_type == "code":
         prose = ""
-        code = cleaned
+        code = clean_text(raw_text)
+        language = content_obj.get("language")
+        if language == "unknown" or not isinstance(language, str):
+            language = None
+        blocks = [(normalize_code_lang(language), code)] if code else []
     else:
-        # Separate code blocks from prose
-        prose, code = separate_code(cleaned)
+        # Clean and separate code blocks from prose in one pass
+        prose, blocks = clean_and_split_blocks(raw_text)
+        code = "\n\n".join(block for _, block in blocks)
+    if metrics is not None:
+        metrics.add_time("text_clean", time.perf_counter() - clean_start)
 
     # Get model_slug from metadata
     metadata = msg.get("metadata", {})
@@ -97,11 +150,22 @@ def _parse_message(
         model_slug=model_slug,
         created_at=created_at,
         turn_index=turn_index,
+        code_blocks=blocks,
     )
 
 
-def parse_conversation(conv: dict) -> Conversation | None:
-    """Parse a single conversation dict into a Conversation object."""
+def parse_conversation(
+    conv: dict,
+    metrics: Optional[BuildMetrics] = None,
+    branches: bool = False,
+) -> Conversation | None:
+    """Parse a single conversation dict into a Conversation object.
+
+    By default only the canonical thread (ending at current_node) is
+    parsed. With branches=True every node of the mapping is parsed once;
+    messages off the canonical thread get is_canonical=False, and each
+    message's turn_index and parent_id follow its own branch.
+    """
     conv_id = conv.get("conversation_id") or conv.get("id", "")
     title = conv.get("title", "Untitled")
     created_at = conv.get("create_time")
@@ -115,19 +179,34 @@ def parse_conversation(conv: dict) -> Conversation | None:
         return None
 
     # Walk the canonical thread
+    walk_start = time.perf_counter()
     thread_node_ids = _walk_canonical_thread(mapping, current_node)
+    if branches:
+        canonical = set(thread_node_ids)
+        nodes = list(_walk_all_branches(mapping))
+    else:
+        canonical = None
+        nodes = list(zip(thread_node_ids, [None] + thread_node_ids[:-1]))
+    if metrics is not None:
+        metrics.add_time("thread_walk", time.perf_counter() - walk_start)
 
-    # Parse messages along the canonical thread
+    # Parse messages in walk order. Nodes without a parsed message (root,
+    # hidden system prompt, ...) pass their parent's position through.
     messages = []
-    turn_index = 0
-    for node_id in thread_node_ids:
+    position: dict[Optional[str], tuple[int, Optional[str]]] = {None: (0, None)}
+    for node_id, parent in nodes:
+        turn_index, parent_msg_id = position.get(parent, (0, None))
+        position[node_id] = (turn_index, parent_msg_id)
         node = mapping.get(node_id)
         if node is None:
             continue
-        msg = _parse_message(node, conv_id, turn_index)
+        msg = _parse_message(node, conv_id, turn_index, metrics)
         if msg is not None:
+            msg.parent_id = parent_msg_id
+            if canonical is not None:
+                msg.is_canonical = node_id in canonical
             messages.append(msg)
-            turn_index += 1
+            position[node_id] = (turn_index + 1, msg.id)
 
     if not messages:
         return None
@@ -142,29 +221,200 @@ def parse_conversation(conv: dict) -> Conversation | None:
     )
 
 
-def parse_export(path: Path, progress: bool = True) -> Iterator[Conversation]:
-    """Parse a ChatGPT conversations.json export file.
+def _skip_whitespace(buf: str, pos: int) -> int:
+    """Return the index of the first non-whitespace character at or after pos."""
+    while pos < len(buf) and buf[pos] in _JSON_WHITESPACE:
+        pos += 1
+    return pos
 
-    Yields Conversation objects. Skips conversations that fail to parse.
-    """
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    if not isinstance(data, list):
+def _iter_json_array(fp: IO[str], chunk_size: int = _CHUNK_SIZE) -> Iterator:
+    """Incrementally decode a top-level JSON array from a text stream.
+
+    Yields one element at a time, so only the element being decoded (plus
+    one read chunk) is held in memory instead of the whole export.
+
+    Raises:
+        json.JSONDecodeError: If the stream is not valid JSON.
+        ValueError: If the top-level value is not an array.
+    """
+    decoder = json.JSONDecoder()
+    buf = fp.read(chunk_size)
+    eof = not buf
+    pos = _skip_whitespace(buf, 0)
+
+    if pos >= len(buf) or buf[pos] != "[":
+        # Not an array: decode the whole document for a precise error.
+        data = json.loads(buf + fp.read())
         raise ValueError(
             f"Expected a JSON array at top level, got {type(data).__name__}"
         )
+    pos += 1
+    expect_value = True
+    first = True
+
+    while True:
+        pos = _skip_whitespace(buf, pos)
+
+        if pos < len(buf):
+            char = buf[pos]
+            if char == "]" and first:
+                return
+            if not expect_value:
+                if char == "]":
+                    return
+                if char != ",":
+                    raise json.JSONDecodeError(
+                        "Expecting ',' delimiter", buf, pos
+                    )
+                pos += 1
+                expect_value = True
+                continue
+
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                value, end = None, -1
+
+            # A value ending exactly at the buffer edge may be truncated
+            # (e.g. a number split across chunks), so only accept it when
+            # more input follows or the stream is exhausted.
+            if end != -1 and (end < len(buf) or eof):
+                yield value
+                pos = end
+                expect_value = False
+                first = False
+                if pos > chunk_size:
+                    buf = buf[pos:]
+                    pos = 0
+                continue
+
+        if eof:
+            raise json.JSONDecodeError("Unterminated JSON array", buf, len(buf))
+
+        # Grow reads geometrically so a single huge conversation is
+        # re-decoded O(log n) times rather than once per chunk.
+        more = fp.read(max(chunk_size, len(buf) - pos))
+        if not more:
+            eof = True
+        buf = buf[pos:] + more
+        pos = 0
+
+
+def _find_export_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """Locate conversations.json inside an export archive."""
+    candidates = [
+        info
+        for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.rsplit("/", 1)[-1] == EXPORT_MEMBER
+    ]
+    if not candidates:
+        raise ValueError(f"No {EXPORT_MEMBER} found in archive")
+    # Prefer the shallowest match (the export root)
+    return min(candidates, key=lambda info: info.filename.count("/"))
+
+
+def iter_raw_conversations(path: Path) -> Iterator[dict]:
+    """Stream raw conversation dicts from an export.
+
+    Accepts either a conversations.json file or the export .zip as
+    downloaded from ChatGPT. Archives are read in place, so
+    conversations.json is never extracted to disk.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            member = _find_export_member(archive)
+            with archive.open(member) as raw:
+                with io.TextIOWrapper(raw, encoding="utf-8") as f:
+                    yield from _iter_json_array(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from _iter_json_array(f)
+
+
+def export_size(path: Path) -> int:
+    """Uncompressed size in bytes of the conversations JSON in an export."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return _find_export_member(archive).file_size
+    return Path(path).stat().st_size
+
+
+# Bytes hashed from each end of the export by export_fingerprint
+_FINGERPRINT_EDGE = 4 << 20
+
+
+def export_fingerprint(path: Path) -> str:
+    """Identify the export file, to tie a build checkpoint to its input.
 
-    total = len(data)
+    Hashes the size, mtime and the first and last 4MB with SHA-256
+    instead of the whole file, so a build does not read a multi-GB
+    export twice.
+    """
+    st = path.stat()
+    digest = hashlib.sha256(f"{st.st_size}:{st.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_EDGE))
+        if st.st_size > _FINGERPRINT_EDGE:
+            f.seek(max(_FINGERPRINT_EDGE, st.st_size - _FINGERPRINT_EDGE))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def parse_export(
+    path: Path,
+    progress: bool = True,
+    metrics: Optional[BuildMetrics] = None,
+    branches: bool = False,
+) -> Iterator[Conversation]:
+    """Parse a ChatGPT export (conversations.json or export .zip).
+
+    Yields Conversation objects. Skips conversations that fail to parse.
+    The export is decoded incrementally, one conversation at a time.
+    If metrics is given, JSON decoding, thread walking and text cleaning
+    time are recorded in it. branches is passed to parse_conversation.
+    """
+    records = enumerate_export(
+        path, progress=progress, metrics=metrics, branches=branches
+    )
+    for _, conv in records:
+        yield conv
+
+
+def enumerate_export(
+    path: Path,
+    progress: bool = True,
+    metrics: Optional[BuildMetrics] = None,
+    start: int = 0,
+    branches: bool = False,
+) -> Iterator[tuple[int, Conversation]]:
+    """Like parse_export, but yield (record_index, conversation) pairs.
+
+    record_index is the position of the conversation in the export's
+    JSON array, counting records that failed to parse, so it can be used
+    as a resume offset. The first `start` records are decoded but not
+    parsed.
+    """
+    total = 0
     parsed = 0
     skipped = 0
 
-    for i, conv_data in enumerate(data):
+    records: Iterator[dict] = iter_raw_conversations(path)
+    if metrics is not None:
+        records = timed_iter(records, metrics, "json_load")
+
+    for i, conv_data in enumerate(records):
+        if i < start:
+            continue
+        total += 1
         try:
-            conv = parse_conversation(conv_data)
+            conv = parse_conversation(conv_data, metrics, branches)
             if conv is not None:
                 parsed += 1
-                yield conv
+                yield i, conv
             else:
                 skipped += 1
         except Exception as e:
@@ -175,6 +425,9 @@ def parse_export(path: Path, progress: bool = True) -> Iterator[Conversation]:
                     file=sys.stderr,
                 )
 
+    if metrics is not None:
+        metrics.count("conversations_skipped", skipped)
+
     if progress:
         print(
             f"  Parsed {parsed}/{total} conversations ({skipped} skipped)",
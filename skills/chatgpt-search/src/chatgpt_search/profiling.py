@@ -0,0 +1,120 @@
+"""Build instrumentation: per-phase timers, counters and cProfile support."""
+
+import json
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BuildMetrics:
+    """Accumulates wall time per phase and named counters for an index build.
+
+    Coarse phases use the `phase()` context manager; hot per-message paths
+    call `add_time()` with their own perf_counter deltas to keep overhead
+    low. If `emit` is given, events are written to it as JSON lines.
+    """
+
+    def __init__(self, emit: Optional[IO[str]] = None):
+        self.phases: dict[str, float] = defaultdict(float)
+        self.counters: dict[str, int] = defaultdict(int)
+        self.maxima: dict[str, float] = {}
+        self._emit = emit
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block and add it to the named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] += elapsed
+            self.event("phase", name=name, seconds=round(elapsed, 6))
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Add seconds to a phase and track its slowest single sample."""
+        self.phases[name] += seconds
+        if seconds > self.maxima.get(name, 0.0):
+            self.maxima[name] = seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def merge(self, other: dict) -> None:
+        """Fold in another metrics dict (e.g. from a shard worker)."""
+        for name, seconds in other.get("phases", {}).items():
+            self.phases[name] += seconds
+        for name, n in other.get("counters", {}).items():
+            self.counters[name] += n
+        for name, seconds in other.get("max_s", {}).items():
+            if seconds > self.maxima.get(name, 0.0):
+                self.maxima[name] = seconds
+
+    def event(self, event: str, **fields: Any) -> None:
+        """Write one JSON-lines event if an emit stream is configured."""
+        if self._emit is None:
+            return
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        self._emit.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._emit.flush()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def as_dict(self) -> dict:
+        """Rounded snapshot suitable for the build stats dict."""
+        return {
+            "phases": {k: round(v, 4) for k, v in sorted(self.phases.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "max_s": {k: round(v, 4) for k, v in sorted(self.maxima.items())},
+        }
+
+
+def timed_iter(
+    iterable: Iterable[T], metrics: BuildMetrics, name: str
+) -> Iterator[T]:
+    """Yield from iterable, charging the time spent producing items to name."""
+    it = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            metrics.add_time(name, time.perf_counter() - start)
+            return
+        metrics.add_time(name, time.perf_counter() - start)
+        yield item
+
+
+def profile_call(
+    func: Callable[..., Any],
+    output: Path,
+    *args: Any,
+    top: int = 25,
+    **kwargs: Any,
+) -> Any:
+    """Run func under cProfile, dump stats to output and print the top entries.
+
+    The dump can be explored later with `python -m pstats <output>` or
+    visualised with tools such as snakeviz.
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(output))
+        print(f"\n  Profile written to {output}", file=sys.stderr)
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats("cumulative").print_stats(top)
@@ -1,15 +1,37 @@
 """Search the FTS5 index and return results."""
 
+import json
+import math
 import sqlite3
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field, replace
+from datetime import date, timedelta
 from pathlib import Path
-from typing import Optional
-
-from .db import get_connection
-from .utils import format_timestamp, truncate
-
-
-@dataclass
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from .db import (
+    ensure_slow_query_table,
+    get_connection,
+    get_index_generation,
+    has_table,
+)
+from .utils import (
+    CJK_RUN_PATTERN,
+    MINHASH_BAND_BYTES,
+    cjk_bigrams,
+    format_timestamp,
+    has_cjk,
+    normalize_code_lang,
+    shingle_hashes,
+    shingle_jaccard,
+    truncate,
+)
+
+# Progress-handler granularity used to approximate VM steps while tracing
+_TRACE_STEP = 100
+
+
+@dataclass(slots=True)
 class SearchResult:
     """A single search result."""
 
@@ -22,6 +44,29 @@ class SearchResult:
     model_slug: Optional[str]
     created_at: Optional[float]
     turn_index: int
+    rank: float  # BM25 score after RankProfile factors (lower = more relevant)
+    duplicates: int = 0  # other hits with an identical body, collapsed into this one
+    similar: int = 0  # near-duplicate hits (shared MinHash band) folded into this one
+    is_canonical: bool = True  # False for a regenerated/edited branch message
+
+    @property
+    def date_str(self) -> str:
+        return format_timestamp(self.created_at)
+
+
+@dataclass(slots=True)
+class CodeResult:
+    """A single code block hit."""
+
+    conversation_id: str
+    conversation_title: str
+    message_id: str
+    role: str
+    ordinal: int  # position of the block within its message
+    fence_lang: Optional[str]
+    code_snippet: str
+    model_slug: Optional[str]
+    created_at: Optional[float]
     rank: float  # BM25 score (lower = more relevant)
 
     @property
@@ -29,21 +74,68 @@ class SearchResult:
         return format_timestamp(self.created_at)
 
 
-@dataclass
+class MessageRow(NamedTuple):
+    """One message of a conversation view (tuple-backed, no per-row dict)."""
+
+    role: str
+    content: Optional[str]
+    code: Optional[str]
+    model_slug: Optional[str]
+    created_at: Optional[float]
+    turn_index: int
+
+
+_MESSAGE_ROWS_SQL = """
+    SELECT m.role, b.content, b.code, md.slug AS model_slug,
+           m.created_at, m.turn_index
+    FROM messages m
+    JOIN bodies b ON b.id = m.body_id
+    LEFT JOIN models md ON m.model_id = md.id
+    WHERE m.conversation_id = ? AND m.is_canonical = 1
+    ORDER BY m.turn_index
+"""
+
+
+@dataclass(slots=True)
 class ConversationView:
-    """Full conversation for browsing."""
+    """Full conversation for browsing.
+
+    messages is a list of MessageRow, or a one-shot iterator when the
+    view was fetched with lazy=True.
+    """
 
     id: str
     title: str
     created_at: Optional[float]
-    messages: list[dict]
+    messages: Iterable[MessageRow]
 
     @property
     def date_str(self) -> str:
         return format_timestamp(self.created_at)
 
 
-@dataclass
+@dataclass(slots=True)
+class ConversationSummary:
+    """One conversation in a listing (a conversation_summary row)."""
+
+    id: str
+    title: str
+    created_at: Optional[float]
+    updated_at: Optional[float]
+    model: Optional[str]
+    message_count: int
+    word_count: int
+    code_count: int
+    lang: Optional[str]  # dominant language
+    first_prompt: str  # excerpt of the first user message
+    keywords: list[str] = field(default_factory=list)
+
+    @property
+    def date_str(self) -> str:
+        return format_timestamp(self.created_at)
+
+
+@dataclass(slots=True)
 class KeywordResult:
     """A keyword for a conversation."""
 
@@ -64,50 +156,129 @@ class CorpusStats:
     top_content_types: dict[str, int]
     db_size_mb: float
     language_distribution: dict[str, int]  # lang code -> message count
+    index_generation: int = 0  # bumped by every build or incremental update
+    body_count: int = 0  # distinct message bodies (see db.body_hash)
 
 
-def _build_search_query(
+@dataclass
+class SearchFacets:
+    """Hit counts over the full match set of a search, per facet value.
+
+    Filled in by search(..., facets=SearchFacets()). Each dict maps a
+    facet value to its hit count, largest first; messages without a
+    model, language or timestamp are counted under None.
+    """
+
+    total: int = 0
+    role: dict = field(default_factory=dict)
+    model: dict = field(default_factory=dict)
+    lang: dict = field(default_factory=dict)
+    month: dict = field(default_factory=dict)  # 'YYYY-MM' -> hits
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """Outcome of one query in a search_many batch."""
+
+    query: str
+    results: list[SearchResult] = field(default_factory=list)
+    error: Optional[str] = None  # set instead of results for invalid queries
+
+
+@dataclass(slots=True)
+class TimelineBucket:
+    """Hit count for one time bucket of a timeline."""
+
+    bucket: str  # '2025-03-14', '2025-W11', '2025-03' or '2025'
+    count: int
+
+
+@dataclass
+class QueryTrace:
+    """Timing and plan details for one search() call."""
+
+    query: str = ""
+    fts_query: str = ""
+    filters: dict = field(default_factory=dict)
+    result_count: int = 0
+    sql_ms: float = 0.0  # SQLite execution + row fetch
+    post_ms: float = 0.0  # Python result construction
+    total_ms: float = 0.0
+    vm_steps: int = 0  # approximate SQLite VM instructions executed
+    query_plan: list[str] = field(default_factory=list)
+    logged: bool = False  # written to the slow query log
+
+    @property
+    def filter_keys(self) -> str:
+        return "+".join(sorted(self.filters)) or "none"
+
+
+@dataclass
+class SlowQuery:
+    """An entry from the slow query log."""
+
+    logged_at: float
+    query: str
+    fts_query: str
+    filters: dict
+    filter_keys: str
+    result_count: int
+    sql_ms: float
+    post_ms: float
+    total_ms: float
+    vm_steps: int
+    query_plan: str
+
+    @property
+    def date_str(self) -> str:
+        return format_timestamp(self.logged_at)
+
+
+def _resolve_model_ids(
+    conn: sqlite3.Connection, model: Optional[str]
+) -> Optional[list[int]]:
+    """Expand a partial model name to matching models.id values.
+
+    The LIKE runs against the small models lookup table, so the main
+    query can filter messages with an indexed IN (...). Returns None when
+    no model filter is requested.
+    """
+    if not model:
+        return None
+    rows = conn.execute(
+        "SELECT id FROM models WHERE slug LIKE ?", (f"%{model}%",)
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _build_filters(
     role: Optional[str] = None,
-    model: Optional[str] = None,
+    model_ids: Optional[list[int]] = None,
     since: Optional[float] = None,
     until: Optional[float] = None,
     lang: Optional[str] = None,
-    limit: int = 20,
+    include_branches: bool = False,
 ) -> tuple[str, list]:
-    """Build the search SQL with optional filters.
+    """Build the WHERE clause tail shared by search, facet and timeline SQL.
 
-    Returns (sql, params) where the first param slot is for the FTS query.
-    """
-    # BM25 weights: title=10.0, content=1.0, code=0.5
-    sql = """
-        SELECT
-            m.conversation_id,
-            c.title as conversation_title,
-            m.id as message_id,
-            m.role,
-            m.content,
-            m.code,
-            m.model_slug,
-            m.created_at,
-            m.turn_index,
-            bm25(messages_fts, 10.0, 1.0, 0.5) as rank
-        FROM messages_fts
-        JOIN messages m ON messages_fts.rowid = m.rowid
-        JOIN conversations c ON m.conversation_id = c.id
-        WHERE messages_fts MATCH ?
+    Columns are referenced through the messages alias `m`. Messages off
+    the canonical thread are excluded unless include_branches is set.
+    Returns (sql, params) where sql is empty or starts with " AND ".
     """
-    params: list = []  # FTS query will be inserted at position 0
-
     filters = []
-    filter_params = []
+    filter_params: list = []
+
+    if not include_branches:
+        filters.append("m.is_canonical = 1")
 
     if role:
         filters.append("m.role = ?")
         filter_params.append(role)
 
-    if model:
-        filters.append("m.model_slug LIKE ?")
-        filter_params.append(f"%{model}%")
+    if model_ids is not None:
+        placeholders = ", ".join("?" * len(model_ids))
+        filters.append(f"m.model_id IN ({placeholders})")
+        filter_params.extend(model_ids)
 
     if since is not None:
         filters.append("m.created_at >= ?")
@@ -126,15 +297,270 @@ def _build_search_query(
         )
         filter_params.append(lang)
 
-    if filters:
-        sql += " AND " + " AND ".join(filters)
+    if not filters:
+        return "", filter_params
+    return " AND " + " AND ".join(filters), filter_params
+
+
+@dataclass(slots=True)
+class RankProfile:
+    """How search hits are ordered, evaluated inside the SQL ORDER BY.
+
+    The score is bm25() with these column weights (cjk_fts has no code
+    column), divided by 1 + age_days / half_life_days (hyperbolic recency
+    decay: a message half_life_days old counts half) and multiplied by its
+    role's entry in role_weights. bm25() is negative, lower is better, so
+    a factor above 1 promotes a hit. Undated messages are not decayed.
+    """
+
+    title: float = 10.0
+    content: float = 1.0
+    code: float = 0.5
+    half_life_days: Optional[float] = None  # None: no recency decay
+    role_weights: dict[str, float] = field(default_factory=dict)
+
 
-    sql += " ORDER BY rank LIMIT ?"
-    filter_params.append(limit)
+# Named profiles for --rank
+RANK_PROFILES = {
+    "default": RankProfile(),
+    "recent": RankProfile(half_life_days=90.0),
+    "user": RankProfile(role_weights={"user": 1.5}),
+    "recent-user": RankProfile(half_life_days=90.0, role_weights={"user": 1.5}),
+}
 
-    # Combine: FTS query param + filter params
-    params = filter_params
+_ROLES = ("user", "assistant", "system", "tool")
 
+_DAY_S = 86400
+
+
+def parse_rank_profile(spec: str) -> RankProfile:
+    """Parse a --rank value into a RankProfile.
+
+    spec is a RANK_PROFILES name, key=value overrides, or a name followed
+    by overrides, comma-separated: "recent", "recent,user=2",
+    "title=5,half_life=30". Keys are the column weights (title, content,
+    code), half_life in days (0 turns decay off) and role names.
+
+    Raises:
+        ValueError: On an unknown profile or key, or a value that is not
+            a non-negative number
+    """
+    parts = [part.strip() for part in spec.split(",") if part.strip()]
+    name = parts.pop(0) if parts and "=" not in parts[0] else "default"
+    if name not in RANK_PROFILES:
+        raise ValueError(
+            f"Unknown rank profile '{name}'. Use one of: {', '.join(RANK_PROFILES)}"
+        )
+    base = RANK_PROFILES[name]
+    profile = replace(base, role_weights=dict(base.role_weights))
+
+    for part in parts:
+        key, _, value = (item.strip() for item in part.partition("="))
+        try:
+            number = float(value)
+        except ValueError:
+            number = -1.0
+        if not math.isfinite(number) or number < 0:
+            raise ValueError(
+                f"Rank setting '{part}' needs a non-negative number (key=value)"
+            )
+        if key in ("title", "content", "code"):
+            setattr(profile, key, number)
+        elif key == "half_life":
+            profile.half_life_days = number or None
+        elif key in _ROLES:
+            profile.role_weights[key] = number
+        else:
+            raise ValueError(
+                f"Unknown rank setting '{key}'. Use title, content, code, "
+                f"half_life or a role ({', '.join(_ROLES)})"
+            )
+    return profile
+
+
+def _rank_sql(table: str, profile: Optional[RankProfile] = None) -> str:
+    """Return the ranking expression for an FTS table under profile.
+
+    Columns are referenced through the messages alias `m`. Numbers are
+    inlined so the statement text only changes with the profile (and, for
+    recency, once a day), keeping it in sqlite3's statement cache.
+    """
+    if profile is None:
+        profile = RANK_PROFILES["default"]
+    weights = [profile.title, profile.content]
+    if table == "messages_fts":
+        weights.append(profile.code)
+    sql = f"bm25({table}, {', '.join(repr(float(w)) for w in weights)})"
+
+    if profile.half_life_days:
+        # End of the current UTC day, so ages are never negative
+        now = (int(time.time()) // _DAY_S + 1) * _DAY_S
+        half_life = float(profile.half_life_days * _DAY_S)
+        sql += (
+            f" / (1.0 + MAX({now} - COALESCE(m.created_at, {now}), 0)"
+            f" / {half_life!r})"
+        )
+
+    # Only known role names are inlined as SQL literals
+    boosts = [
+        (role, profile.role_weights[role]) for role in _ROLES
+        if profile.role_weights.get(role, 1.0) != 1.0
+    ]
+    if boosts:
+        cases = " ".join(
+            f"WHEN '{role}' THEN {float(weight)!r}" for role, weight in boosts
+        )
+        sql += f" * (CASE m.role {cases} ELSE 1.0 END)"
+    return sql
+
+
+def _build_search_query(
+    role: Optional[str] = None,
+    model_ids: Optional[list[int]] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    lang: Optional[str] = None,
+    limit: int = 20,
+    table: str = "messages_fts",
+    collapse: bool = True,
+    include_branches: bool = False,
+    rank_profile: Optional[RankProfile] = None,
+) -> tuple[str, list]:
+    """Build the search SQL with optional filters.
+
+    model_ids comes from _resolve_model_ids; an empty list matches nothing.
+    table is the FTS table to match against (see _fts_target); hits are
+    ordered by rank_profile (see _rank_sql). With
+    collapse, hits sharing a body are grouped and the best-ranked one is
+    returned (SQLite takes bare columns from the MIN() row) with the
+    group size in `copies`.
+
+    Returns (sql, params) where the first param slot is for the FTS query.
+    """
+    where, params = _build_filters(
+        role, model_ids, since, until, lang, include_branches
+    )
+    rank = _rank_sql(table, rank_profile)
+    columns = """
+            m.conversation_id,
+            c.title as conversation_title,
+            m.id as message_id,
+            m.role,
+            b.content,
+            b.code,
+            md.slug as model_slug,
+            m.created_at,
+            m.turn_index,
+            m.is_canonical,
+            b.lsh"""
+    joins = """
+        JOIN bodies b ON b.id = m.body_id
+        JOIN conversations c ON m.conversation_id = c.id
+        LEFT JOIN models md ON m.model_id = md.id"""
+    if not collapse:
+        sql = f"""
+            SELECT {columns}, {rank} as rank, 1 as copies
+            FROM {table}
+            JOIN messages m ON {table}.rowid = m.rowid {joins}
+            WHERE {table} MATCH ?{where}
+            ORDER BY rank LIMIT ?
+        """
+        params.append(limit)
+        return sql, params
+
+    # bm25() cannot run inside an aggregate; LIMIT -1 keeps the ranked
+    # subquery from being flattened into the GROUP BY
+    sql = f"""
+        SELECT {columns}, h.rank, h.copies
+        FROM (
+            SELECT rowid, MIN(rank) AS rank, COUNT(*) AS copies
+            FROM (
+                SELECT m.rowid AS rowid, m.body_id, {rank} AS rank
+                FROM {table}
+                JOIN messages m ON {table}.rowid = m.rowid
+                WHERE {table} MATCH ?{where}
+                LIMIT -1
+            )
+            GROUP BY body_id
+            ORDER BY rank LIMIT ?
+        ) h
+        JOIN messages m ON m.rowid = h.rowid {joins}
+        ORDER BY h.rank
+    """
+    params.append(limit)
+    return sql, params
+
+
+# Pre-3.35 SQLite has no MATERIALIZED hint (and inlines CTEs used twice)
+_MATERIALIZED = "MATERIALIZED" if sqlite3.sqlite_version_info >= (3, 35, 0) else ""
+
+
+def _build_facet_query(
+    role: Optional[str] = None,
+    model_ids: Optional[list[int]] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    lang: Optional[str] = None,
+    limit: int = 20,
+    table: str = "messages_fts",
+    collapse: bool = True,
+    include_branches: bool = False,
+    rank_profile: Optional[RankProfile] = None,
+) -> tuple[str, list]:
+    """Build one statement returning the top hits plus facet counts.
+
+    The FTS match is evaluated once into a materialized CTE; the top
+    `limit` hits and each facet's GROUP BY are then read from it and
+    combined with UNION ALL. Every row carries a `facet` column: 'hit'
+    rows have the search result columns, other rows have value/n.
+    collapse groups the hits by body as in _build_search_query; facet
+    counts always cover every matching message.
+
+    Returns (sql, params) where the first param slot is for the FTS query.
+    """
+    where, params = _build_filters(
+        role, model_ids, since, until, lang, include_branches
+    )
+    empty = ", ".join(["NULL"] * 13)
+    top = (
+        "SELECT rowid, MIN(rank) AS rank, COUNT(*) AS copies"
+        " FROM (SELECT * FROM hits LIMIT -1) GROUP BY body_id"
+        if collapse
+        else "SELECT rowid, rank, 1 AS copies FROM hits"
+    )
+    sql = f"""
+        WITH hits AS {_MATERIALIZED} (
+            SELECT m.rowid AS rowid, m.body_id, m.role, m.model_id, m.lang,
+                   m.created_at, {_rank_sql(table, rank_profile)} AS rank
+            FROM {table}
+            JOIN messages m ON {table}.rowid = m.rowid
+            WHERE {table} MATCH ?{where}
+        )
+        SELECT 'hit' AS facet, NULL AS value, NULL AS n,
+               m.conversation_id, c.title AS conversation_title,
+               m.id AS message_id, m.role, b.content, b.code,
+               md.slug AS model_slug, m.created_at, m.turn_index,
+               m.is_canonical, b.lsh, h.rank, h.copies
+        FROM ({top} ORDER BY rank LIMIT ?) h
+        JOIN messages m ON m.rowid = h.rowid
+        JOIN bodies b ON b.id = m.body_id
+        JOIN conversations c ON m.conversation_id = c.id
+        LEFT JOIN models md ON m.model_id = md.id
+        UNION ALL
+        SELECT 'total', NULL, COUNT(*), {empty} FROM hits
+        UNION ALL
+        SELECT 'role', role, COUNT(*), {empty} FROM hits GROUP BY role
+        UNION ALL
+        SELECT 'model', md.slug, COUNT(*), {empty}
+        FROM hits LEFT JOIN models md ON hits.model_id = md.id
+        GROUP BY hits.model_id
+        UNION ALL
+        SELECT 'lang', lang, COUNT(*), {empty} FROM hits GROUP BY lang
+        UNION ALL
+        SELECT 'month', strftime('%Y-%m', created_at, 'unixepoch'), COUNT(*), {empty}
+        FROM hits GROUP BY 2
+    """
+    params.append(limit)
     return sql, params
 
 
@@ -170,6 +596,202 @@ def _sanitize_fts_query(query: str) -> str:
     return " ".join(terms)
 
 
+def _build_cjk_query(query: str) -> str:
+    """Translate a query containing CJK text into a cjk_fts MATCH expression.
+
+    Each CJK run becomes a phrase of its overlapping bigrams, matching
+    the segmentation in utils.segment_cjk; a single character becomes a
+    prefix query. Other words are quoted. All parts are ANDed.
+    """
+    import re
+    cleaned = re.sub(r'[+\-^:.*()"]', " ", query)
+    parts = []
+    for word in cleaned.split():
+        pos = 0
+        for match in CJK_RUN_PATTERN.finditer(word):
+            if match.start() > pos:
+                parts.append(f'"{word[pos:match.start()]}"')
+            run = match.group()
+            if len(run) == 1:
+                parts.append(f"{run}*")
+            else:
+                parts.append('"' + " ".join(cjk_bigrams(run)) + '"')
+            pos = match.end()
+        if pos < len(word):
+            parts.append(f'"{word[pos:]}"')
+    return " ".join(parts)
+
+
+def _fts_target(query: str) -> tuple[str, str]:
+    """Return (fts_table, match_expression) for a user query.
+
+    Queries containing Chinese, Japanese or Korean text are routed to
+    the cjk_fts bigram index; everything else uses messages_fts.
+    """
+    if has_cjk(query):
+        return "cjk_fts", _build_cjk_query(query)
+    return "messages_fts", _sanitize_fts_query(query)
+
+
+def _explain(conn: sqlite3.Connection, sql: str, params: list) -> list[str]:
+    """Return EXPLAIN QUERY PLAN detail lines for a statement."""
+    try:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error:
+        return []
+    return [row[3] for row in rows]
+
+
+def _log_slow_query(conn: sqlite3.Connection, trace: QueryTrace) -> None:
+    """Append a trace to the slow query log. Never fails the search."""
+    if conn.execute("PRAGMA query_only").fetchone()[0]:
+        return  # published snapshots are read-only
+    try:
+        ensure_slow_query_table(conn)
+        conn.execute(
+            """INSERT INTO slow_queries
+               (logged_at, query, fts_query, filters, filter_keys, result_count,
+                sql_ms, post_ms, total_ms, vm_steps, query_plan)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                time.time(),
+                trace.query,
+                trace.fts_query,
+                json.dumps(trace.filters, ensure_ascii=False),
+                trace.filter_keys,
+                trace.result_count,
+                trace.sql_ms,
+                trace.post_ms,
+                trace.total_ms,
+                trace.vm_steps,
+                "\n".join(trace.query_plan),
+            ),
+        )
+        conn.commit()
+        trace.logged = True
+    except sqlite3.Error:
+        # Read-only or locked databases just skip logging
+        pass
+
+
+def _collect_facets(rows: list, facets: SearchFacets) -> list:
+    """Fill facets from facet query rows and return the hit rows by rank."""
+    counts: dict[str, dict] = {"role": {}, "model": {}, "lang": {}, "month": {}}
+    hits = []
+    for row in rows:
+        facet = row["facet"]
+        if facet == "hit":
+            hits.append(row)
+        elif facet == "total":
+            facets.total = row["n"]
+        else:
+            counts[facet][row["value"]] = row["n"]
+    for name, values in counts.items():
+        ordered = sorted(values.items(), key=lambda kv: -kv[1])
+        setattr(facets, name, dict(ordered))
+    hits.sort(key=lambda row: row["rank"])
+    return hits
+
+
+def _row_to_result(row: sqlite3.Row) -> SearchResult:
+    return SearchResult(
+        conversation_id=row["conversation_id"],
+        conversation_title=row["conversation_title"],
+        message_id=row["message_id"],
+        role=row["role"],
+        content_snippet=truncate(row["content"] or "", 300),
+        code_snippet=truncate(row["code"] or "", 200),
+        model_slug=row["model_slug"],
+        created_at=row["created_at"],
+        turn_index=row["turn_index"],
+        rank=row["rank"],
+        duplicates=row["copies"] - 1,
+        is_canonical=bool(row["is_canonical"]),
+    )
+
+
+# With collapse, fetch this many times `limit` hits for _fold_similar;
+# _fold_with_refetch grows the fetch by the same factor if too many fold
+_SIMILAR_OVERFETCH = 3
+
+
+# Shingle Jaccard similarity a band match must reach to be folded
+_SIMILAR_MIN_JACCARD = 0.8
+
+
+def _row_shingles(row: sqlite3.Row) -> set[int]:
+    return shingle_hashes(f"{row['content'] or ''}\n{row['code'] or ''}")
+
+
+def _fold_similar(rows: list, limit: int) -> list[SearchResult]:
+    """Fold near-duplicate hits into the best-ranked one, keeping `limit`.
+
+    rows are ranked hits carrying bodies.lsh. Each kept result registers
+    its LSH bands; a later hit sharing any band (at the same position)
+    is a candidate, and is counted in that result's `similar` instead of
+    being returned if their shingle Jaccard similarity is at least
+    _SIMILAR_MIN_JACCARD. Only candidates are compared, never every
+    pair. Hits past `limit` are still folded so the counts cover the
+    whole fetch.
+    """
+    results: list[SearchResult] = []
+    kept: list = []  # rows of results, for their shingles
+    shingles: dict[int, set[int]] = {}  # computed on first comparison
+    buckets: dict[bytes, list[int]] = {}  # band key -> indexes into results
+
+    def _shingles_of(i: int) -> set[int]:
+        if i not in shingles:
+            shingles[i] = _row_shingles(kept[i])
+        return shingles[i]
+
+    for row in rows:
+        lsh = row["lsh"] or b""
+        # Prefix each band with its position so equal bytes in different
+        # bands never match
+        keys = [
+            bytes([i]) + lsh[i : i + MINHASH_BAND_BYTES]
+            for i in range(0, len(lsh), MINHASH_BAND_BYTES)
+        ]
+        candidates = sorted({i for k in keys for i in buckets.get(k, ())})
+        hashes = _row_shingles(row) if candidates else None
+        match = next(
+            (
+                results[i]
+                for i in candidates
+                if shingle_jaccard(hashes, _shingles_of(i)) >= _SIMILAR_MIN_JACCARD
+            ),
+            None,
+        )
+        if match is not None:
+            match.similar += row["copies"]
+        elif len(results) < limit:
+            results.append(_row_to_result(row))
+            kept.append(row)
+            if hashes is not None:
+                shingles[len(results) - 1] = hashes
+            for key in keys:
+                buckets.setdefault(key, []).append(len(results) - 1)
+    return results
+
+
+def _fold_with_refetch(
+    rows: list, limit: int, fetch: int, refetch: Callable[[int], list]
+) -> list[SearchResult]:
+    """Fold near-duplicates in rows, fetching more hits if too many fold.
+
+    rows are the top `fetch` hits and refetch(n) returns the top n. While
+    folding keeps fewer than `limit` results and the fetch was full (more
+    hits may exist), the fetch grows by _SIMILAR_OVERFETCH and is folded
+    again.
+    """
+    results = _fold_similar(rows, limit)
+    while len(results) < limit and len(rows) == fetch:
+        fetch *= _SIMILAR_OVERFETCH
+        rows = refetch(fetch)
+        results = _fold_similar(rows, limit)
+    return results
+
+
 def search(
     db_path: Path,
     query: str,
@@ -179,16 +801,62 @@ def search(
     until: Optional[float] = None,
     lang: Optional[str] = None,
     limit: int = 20,
+    trace: Optional[QueryTrace] = None,
+    slow_ms: Optional[float] = None,
+    facets: Optional[SearchFacets] = None,
+    collapse: bool = True,
+    include_branches: bool = False,
+    rank_profile: Optional[RankProfile] = None,
 ) -> list[SearchResult]:
-    """Search the index and return ranked results."""
+    """Search the index and return ranked results.
+
+    Pass a QueryTrace to have it filled with the sanitized query, filters,
+    SQL and Python timings, approximate VM steps and the query plan. With
+    slow_ms set, queries taking at least that long are appended to the
+    slow_queries table. Pass a SearchFacets to also get per-role, model,
+    language and month hit counts over all matches (not just the top
+    `limit`), computed in the same SQL statement. Queries containing
+    CJK text are matched against the bigram index (see _fts_target).
+    With collapse (the default), messages with an identical body count
+    as one hit; SearchResult.duplicates says how many were folded in.
+    Near-duplicates (bodies sharing a MinHash band) are folded too and
+    counted in SearchResult.similar; hits are over-fetched (see
+    _fold_with_refetch) so `limit` results remain when enough exist.
+    include_branches also searches regenerated and edited branches (only
+    present if the index was built with branches=True). rank_profile
+    changes the ordering (see RankProfile) and is applied in SQL, before
+    near-duplicate folding.
+    """
+    want_plan = trace is not None
+    tracing = want_plan or slow_ms is not None
+    if tracing and trace is None:
+        trace = QueryTrace()
+
+    start = time.perf_counter()
     conn = get_connection(db_path)
     try:
-        fts_query = _sanitize_fts_query(query)
-        sql, params = _build_search_query(role, model, since, until, lang, limit)
+        table, fts_query = _fts_target(query)
+        model_ids = _resolve_model_ids(conn, model)
+        build = _build_facet_query if facets is not None else _build_search_query
+        fetch = limit * _SIMILAR_OVERFETCH if collapse else limit
+        sql, params = build(
+            role, model_ids, since, until, lang, fetch, table, collapse,
+            include_branches, rank_profile,
+        )
 
         # Insert FTS query as first parameter
         all_params = [fts_query] + params
 
+        ticks = 0
+        if tracing:
+            def _tick() -> int:
+                nonlocal ticks
+                ticks += 1
+                return 0
+
+            conn.set_progress_handler(_tick, _TRACE_STEP)
+
+        sql_start = time.perf_counter()
         try:
             rows = conn.execute(sql, all_params).fetchall()
         except sqlite3.OperationalError as e:
@@ -196,31 +864,531 @@ def search(
                 f"Invalid search query: {query!r}. "
                 f"Check FTS5 syntax (for example, unmatched quotes). Error: {e}"
             ) from e
+        finally:
+            if tracing:
+                conn.set_progress_handler(None, 0)
+        sql_end = time.perf_counter()
+
+        if facets is not None:
+            rows = _collect_facets(rows, facets)
+
+        def _refetch(n: int) -> list:
+            all_params[-1] = n  # the LIMIT slot is the last parameter
+            hits = conn.execute(sql, all_params).fetchall()
+            return _collect_facets(hits, facets) if facets is not None else hits
+
+        if collapse:
+            results = _fold_with_refetch(rows, limit, fetch, _refetch)
+        else:
+            results = [_row_to_result(row) for row in rows]
+
+        if tracing:
+            end = time.perf_counter()
+            filters = {
+                "role": role,
+                "model": model,
+                "since": since,
+                "until": until,
+                "lang": lang,
+            }
+            trace.query = query
+            trace.fts_query = fts_query
+            trace.filters = {k: v for k, v in filters.items() if v is not None}
+            trace.result_count = len(results)
+            trace.sql_ms = round((sql_end - sql_start) * 1000, 3)
+            trace.post_ms = round((end - sql_end) * 1000, 3)
+            trace.total_ms = round((end - start) * 1000, 3)
+            trace.vm_steps = ticks * _TRACE_STEP
+            is_slow = slow_ms is not None and trace.total_ms >= slow_ms
+            if is_slow or want_plan:
+                trace.query_plan = _explain(conn, sql, all_params)
+            if is_slow:
+                _log_slow_query(conn, trace)
 
-        results = []
-        for row in rows:
-            results.append(
-                SearchResult(
-                    conversation_id=row["conversation_id"],
-                    conversation_title=row["conversation_title"],
-                    message_id=row["message_id"],
-                    role=row["role"],
-                    content_snippet=truncate(row["content"] or "", 300),
-                    code_snippet=truncate(row["code"] or "", 200),
-                    model_slug=row["model_slug"],
-                    created_at=row["created_at"],
-                    turn_index=row["turn_index"],
-                    rank=row["rank"],
+        return results
+    finally:
+        conn.close()
+
+
+def search_many(
+    db_path: Path,
+    queries: Iterable[str],
+    role: Optional[str] = None,
+    model: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    lang: Optional[str] = None,
+    limit: int = 20,
+    collapse: bool = True,
+    include_branches: bool = False,
+    rank_profile: Optional[RankProfile] = None,
+) -> Iterator[BatchResult]:
+    """Run many searches with the same filters over one connection.
+
+    Yields one BatchResult per query, in order, as soon as it is ready,
+    so queries may come from a stream. The model filter is resolved and
+    the SQL built once per FTS table; every query then re-executes the
+    same statement text, which sqlite3 keeps prepared in its statement
+    cache. An invalid query yields a BatchResult with error set and the
+    batch continues. collapse works as in search(): identical bodies are
+    collapsed and near-duplicates folded unless it is False.
+    """
+    conn = get_connection(db_path)
+    try:
+        model_ids = _resolve_model_ids(conn, model)
+        fetch = limit * _SIMILAR_OVERFETCH if collapse else limit
+        statements: dict[str, tuple[str, list]] = {}
+        for query in queries:
+            table, fts_query = _fts_target(query)
+            if table not in statements:
+                statements[table] = _build_search_query(
+                    role, model_ids, since, until, lang, fetch, table, collapse,
+                    include_branches=include_branches,
+                    rank_profile=rank_profile,
+                )
+            sql, params = statements[table]
+            try:
+                rows = conn.execute(sql, [fts_query] + params).fetchall()
+            except sqlite3.OperationalError as e:
+                yield BatchResult(
+                    query=query, error=f"Invalid search query: {query!r}. Error: {e}"
+                )
+                continue
+            if collapse:
+                results = _fold_with_refetch(
+                    rows, limit, fetch,
+                    lambda n: conn.execute(
+                        sql, [fts_query] + params[:-1] + [n]
+                    ).fetchall(),
                 )
+            else:
+                results = [_row_to_result(row) for row in rows]
+            yield BatchResult(query=query, results=results)
+    finally:
+        conn.close()
+
+
+# Longest code block returned whole in a CodeResult
+CODE_SNIPPET_CHARS = 800
+
+
+def search_code(
+    db_path: Path,
+    query: str,
+    code_lang: Optional[str] = None,
+    role: Optional[str] = None,
+    model: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    lang: Optional[str] = None,
+    limit: int = 20,
+    include_branches: bool = False,
+) -> list[CodeResult]:
+    """Search individual fenced code blocks.
+
+    Matches against code_fts, so each hit is one block rather than a
+    message's prose and all of its code. code_lang filters by fence
+    language tag (aliases such as 'py' resolve to 'python'); the other
+    filters apply to the message the block belongs to.
+    """
+    conn = get_connection(db_path)
+    try:
+        fts_query = _sanitize_fts_query(query)
+        model_ids = _resolve_model_ids(conn, model)
+        where, params = _build_filters(
+            role, model_ids, since, until, lang, include_branches
+        )
+        if code_lang:
+            where += " AND b.fence_lang = ?"
+            params.append(normalize_code_lang(code_lang))
+        sql = f"""
+            SELECT m.conversation_id, c.title AS conversation_title,
+                   m.id AS message_id, m.role, b.ordinal, b.fence_lang, b.text,
+                   md.slug AS model_slug, m.created_at,
+                   bm25(code_fts) AS rank
+            FROM code_fts
+            JOIN code_blocks b ON b.id = code_fts.rowid
+            JOIN messages m ON m.id = b.message_id
+            JOIN conversations c ON m.conversation_id = c.id
+            LEFT JOIN models md ON m.model_id = md.id
+            WHERE code_fts MATCH ?{where}
+            ORDER BY rank LIMIT ?
+        """
+        try:
+            rows = conn.execute(sql, [fts_query] + params + [limit]).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(
+                f"Invalid search query: {query!r}. "
+                f"Check FTS5 syntax (for example, unmatched quotes). Error: {e}"
+            ) from e
+    finally:
+        conn.close()
+
+    return [
+        CodeResult(
+            conversation_id=row["conversation_id"],
+            conversation_title=row["conversation_title"],
+            message_id=row["message_id"],
+            role=row["role"],
+            ordinal=row["ordinal"],
+            fence_lang=row["fence_lang"],
+            code_snippet=truncate(row["text"], CODE_SNIPPET_CHARS),
+            model_slug=row["model_slug"],
+            created_at=row["created_at"],
+            rank=row["rank"],
+        )
+        for row in rows
+    ]
+
+
+TIMELINE_BUCKETS = ("day", "week", "month", "year")
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _bucket_label(day: int, bucket: str) -> str:
+    """Label for the bucket containing a UTC day number (days since epoch)."""
+    d = _EPOCH + timedelta(days=day)
+    if bucket == "day":
+        return d.isoformat()
+    if bucket == "week":
+        year, week, _ = d.isocalendar()
+        return f"{year}-W{week:02d}"
+    if bucket == "month":
+        return f"{d.year}-{d.month:02d}"
+    return str(d.year)
+
+
+def get_timeline(
+    db_path: Path,
+    query: str,
+    bucket: str = "month",
+    role: Optional[str] = None,
+    model: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    lang: Optional[str] = None,
+    include_branches: bool = False,
+) -> list[TimelineBucket]:
+    """Count search hits per time bucket (UTC), oldest first.
+
+    SQL only returns one (day, count) row per active day, so no result
+    rows or snippets are built however many messages match; days are
+    rolled up to the requested bucket in Python. Without role, model or
+    language filters the scan stays inside the covering
+    idx_messages_created index and never reads message rows. Buckets
+    between the first and last hit are included with a count of 0;
+    messages without a timestamp are not counted.
+    """
+    if bucket not in TIMELINE_BUCKETS:
+        raise ValueError(
+            f"Unknown timeline bucket {bucket!r}. "
+            f"Choose from: {', '.join(TIMELINE_BUCKETS)}"
+        )
+
+    conn = get_connection(db_path)
+    try:
+        table, fts_query = _fts_target(query)
+        model_ids = _resolve_model_ids(conn, model)
+        where, params = _build_filters(
+            role, model_ids, since, until, lang, include_branches
+        )
+        covered = not (role or model_ids is not None or lang)
+        hint = "INDEXED BY idx_messages_created" if covered else ""
+        sql = f"""
+            SELECT CAST(m.created_at / 86400 AS INTEGER) AS day, COUNT(*)
+            FROM messages m {hint}
+            WHERE m.created_at IS NOT NULL
+              AND m.rowid IN (
+                  SELECT rowid FROM {table} WHERE {table} MATCH ?
+              ){where}
+            GROUP BY day
+        """
+        try:
+            day_counts = dict(conn.execute(sql, [fts_query] + params).fetchall())
+        except sqlite3.OperationalError as e:
+            raise ValueError(
+                f"Invalid search query: {query!r}. "
+                f"Check FTS5 syntax (for example, unmatched quotes). Error: {e}"
+            ) from e
+    finally:
+        conn.close()
+
+    if not day_counts:
+        return []
+
+    counts: dict[str, int] = {}
+    for day in range(min(day_counts), max(day_counts) + 1):
+        label = _bucket_label(day, bucket)
+        counts[label] = counts.get(label, 0) + day_counts.get(day, 0)
+    return [TimelineBucket(bucket=label, count=n) for label, n in counts.items()]
+
+
+# Fuzzy candidates fetched per requested result, before trigram rescoring
+_FUZZY_OVERFETCH = 10
+
+# Minimum share of a term's trigrams a match must contain
+FUZZY_MIN_SCORE = 0.5
+
+
+def _trigrams(term: str) -> list[str]:
+    """Distinct lowercase trigrams of a term, in order."""
+    term = term.lower()
+    return list(dict.fromkeys(term[i:i + 3] for i in range(len(term) - 2)))
+
+
+def _build_fuzzy_fts_query(terms: list[str]) -> str:
+    """OR together each term's trigrams; terms are ANDed.
+
+    Ranking by bm25 over this query puts documents sharing the most
+    (and rarest) trigrams first; near-misses like 'get_conection' still
+    share most trigrams with 'get_connection'.
+    """
+    groups = []
+    for term in terms:
+        grams = " OR ".join(
+            '"' + gram.replace('"', '""') + '"' for gram in _trigrams(term)
+        )
+        groups.append(f"({grams})")
+    return " AND ".join(groups)
+
+
+def _trigram_score(term_grams: list[list[str]], text: str) -> float:
+    """Mean share of each term's trigrams that occur in text."""
+    text = text.lower()
+    shares = [sum(g in text for g in grams) / len(grams) for grams in term_grams]
+    return sum(shares) / len(shares)
+
+
+def fuzzy_search(
+    db_path: Path,
+    query: str,
+    role: Optional[str] = None,
+    model: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    lang: Optional[str] = None,
+    limit: int = 20,
+    min_score: float = FUZZY_MIN_SCORE,
+    include_branches: bool = False,
+    slow_ms: Optional[float] = None,
+) -> list[SearchResult]:
+    """Typo-tolerant substring search over titles and code.
+
+    Uses the trigram index built with build_index(fuzzy=True). Query terms
+    keep their punctuation (identifiers like get_user_id stay whole) and
+    must be at least 3 characters. Candidates are fetched from the
+    trigram index by bm25, then re-ranked by the share of each term's
+    trigrams present in the title and code; matches below min_score are
+    dropped. SearchResult.rank holds the negated share, so lower is
+    better as in search(). With slow_ms set, queries taking at least that
+    long are logged to slow_queries like search() ones, with a "fuzzy"
+    filter key so they group apart in the summary.
+
+    Raises:
+        ValueError: If the fuzzy index is missing or no term is usable
+    """
+    terms = [t for t in query.split() if len(t) >= 3]
+    if not terms:
+        raise ValueError(
+            f"Fuzzy search needs at least one term of 3+ characters: {query!r}"
+        )
+    term_grams = [_trigrams(t) for t in terms]
+
+    start = time.perf_counter()
+    conn = get_connection(db_path)
+    try:
+        if not has_table(conn, "fuzzy_fts"):
+            raise ValueError(
+                "Fuzzy index not built. Rebuild with: "
+                "chatgpt-search --rebuild --fuzzy-index --export /path/to/export"
             )
+        model_ids = _resolve_model_ids(conn, model)
+        where, params = _build_filters(
+            role, model_ids, since, until, lang, include_branches
+        )
+        sql = f"""
+            SELECT
+                m.conversation_id,
+                c.title as conversation_title,
+                m.id as message_id,
+                m.role,
+                b.content,
+                b.code,
+                md.slug as model_slug,
+                m.created_at,
+                m.turn_index,
+                m.is_canonical,
+                bm25(fuzzy_fts, 2.0, 1.0) as rank
+            FROM fuzzy_fts
+            JOIN messages m ON fuzzy_fts.rowid = m.rowid
+            JOIN bodies b ON b.id = m.body_id
+            JOIN conversations c ON m.conversation_id = c.id
+            LEFT JOIN models md ON m.model_id = md.id
+            WHERE fuzzy_fts MATCH ?{where}
+            ORDER BY rank LIMIT ?
+        """
+        fts_query = _build_fuzzy_fts_query(terms)
+        all_params = [fts_query] + params + [limit * _FUZZY_OVERFETCH]
+
+        ticks = 0
+        if slow_ms is not None:
+            def _tick() -> int:
+                nonlocal ticks
+                ticks += 1
+                return 0
+
+            conn.set_progress_handler(_tick, _TRACE_STEP)
+
+        sql_start = time.perf_counter()
+        try:
+            rows = conn.execute(sql, all_params).fetchall()
+        finally:
+            if slow_ms is not None:
+                conn.set_progress_handler(None, 0)
+        sql_end = time.perf_counter()
+
+        scored = []
+        for row in rows:
+            text = f"{row['conversation_title'] or ''}\n{row['code'] or ''}"
+            score = _trigram_score(term_grams, text)
+            if score >= min_score:
+                scored.append((score, row))
+        # Stable sort keeps bm25 order among equal scores
+        scored.sort(key=lambda item: -item[0])
+
+        results = [
+            SearchResult(
+                conversation_id=row["conversation_id"],
+                conversation_title=row["conversation_title"],
+                message_id=row["message_id"],
+                role=row["role"],
+                content_snippet=truncate(row["content"] or "", 300),
+                code_snippet=truncate(row["code"] or "", 200),
+                model_slug=row["model_slug"],
+                created_at=row["created_at"],
+                turn_index=row["turn_index"],
+                rank=-round(score, 4),
+                is_canonical=bool(row["is_canonical"]),
+            )
+            for score, row in scored[:limit]
+        ]
+
+        if slow_ms is not None:
+            end = time.perf_counter()
+            total_ms = round((end - start) * 1000, 3)
+            if total_ms >= slow_ms:
+                filters = {
+                    "fuzzy": True,
+                    "role": role,
+                    "model": model,
+                    "since": since,
+                    "until": until,
+                    "lang": lang,
+                }
+                trace = QueryTrace(
+                    query=query,
+                    fts_query=fts_query,
+                    filters={k: v for k, v in filters.items() if v is not None},
+                    result_count=len(results),
+                    sql_ms=round((sql_end - sql_start) * 1000, 3),
+                    post_ms=round((end - sql_end) * 1000, 3),
+                    total_ms=total_ms,
+                    vm_steps=ticks * _TRACE_STEP,
+                    query_plan=_explain(conn, sql, all_params),
+                )
+                _log_slow_query(conn, trace)
 
         return results
     finally:
         conn.close()
 
 
-def get_conversation(db_path: Path, conversation_id: str) -> Optional[ConversationView]:
-    """Get a full conversation by ID (or partial ID prefix)."""
+def get_slow_queries(db_path: Path, limit: int = 50) -> list[SlowQuery]:
+    """Get the slowest logged queries, slowest first."""
+    conn = get_connection(db_path)
+    try:
+        try:
+            rows = conn.execute(
+                """SELECT * FROM slow_queries
+                   ORDER BY total_ms DESC
+                   LIMIT ?""",
+                (limit,),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return []  # log table not created yet
+
+        return [
+            SlowQuery(
+                logged_at=row["logged_at"],
+                query=row["query"],
+                fts_query=row["fts_query"],
+                filters=json.loads(row["filters"] or "{}"),
+                filter_keys=row["filter_keys"],
+                result_count=row["result_count"],
+                sql_ms=row["sql_ms"],
+                post_ms=row["post_ms"],
+                total_ms=row["total_ms"],
+                vm_steps=row["vm_steps"],
+                query_plan=row["query_plan"] or "",
+            )
+            for row in rows
+        ]
+    finally:
+        conn.close()
+
+
+def get_slow_query_summary(db_path: Path) -> list[dict]:
+    """Aggregate the slow query log by filter combination."""
+    conn = get_connection(db_path)
+    try:
+        try:
+            rows = conn.execute(
+                """SELECT filter_keys,
+                          COUNT(*) AS n,
+                          AVG(total_ms) AS avg_ms,
+                          MAX(total_ms) AS max_ms,
+                          AVG(vm_steps) AS avg_steps
+                   FROM slow_queries
+                   GROUP BY filter_keys
+                   ORDER BY avg_ms DESC"""
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return []
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def iter_conversation_messages(
+    db_path: Path, conversation_id: str
+) -> Iterator[MessageRow]:
+    """Stream a conversation's messages in turn order.
+
+    Rows are read from the cursor one at a time and never buffered, so
+    memory stays flat for very long conversations. The connection is
+    opened on first iteration and closed when the iterator is exhausted
+    or closed.
+    """
+    conn = get_connection(db_path)
+    try:
+        conn.row_factory = None
+        cursor = conn.execute(_MESSAGE_ROWS_SQL, (conversation_id,))
+        yield from map(MessageRow._make, cursor)
+    finally:
+        conn.close()
+
+
+def get_conversation(
+    db_path: Path,
+    conversation_id: str,
+    lazy: bool = False,
+) -> Optional[ConversationView]:
+    """Get a full conversation by ID (or partial ID prefix).
+
+    With lazy=True, messages is an iterator that streams rows from the
+    database instead of a materialised list.
+    """
     conn = get_connection(db_path)
     try:
         # Try exact match first, then prefix match
@@ -240,30 +1408,127 @@ def get_conversation(db_path: Path, conversation_id: str) -> Optional[Conversati
             return None
 
         conv_id = row["id"]
-        messages = conn.execute(
-            """SELECT role, content, code, model_slug, created_at, turn_index
-               FROM messages
-               WHERE conversation_id = ?
-               ORDER BY turn_index""",
-            (conv_id,),
-        ).fetchall()
+        if lazy:
+            messages: Iterable[MessageRow] = iter_conversation_messages(
+                db_path, conv_id
+            )
+        else:
+            conn.row_factory = None
+            messages = list(
+                map(MessageRow._make, conn.execute(_MESSAGE_ROWS_SQL, (conv_id,)))
+            )
 
         return ConversationView(
             id=conv_id,
             title=row["title"],
             created_at=row["created_at"],
-            messages=[dict(m) for m in messages],
+            messages=messages,
         )
     finally:
         conn.close()
 
 
+# --list sort keys -> (ORDER BY expression, descending by default)
+LIST_SORTS = {
+    "date": ("created_at", True),
+    "updated": ("updated_at", True),
+    "messages": ("message_count", True),
+    "words": ("word_count", True),
+    "code": ("code_count", True),
+    "title": ("title COLLATE NOCASE", False),
+}
+
+
+def list_conversations(
+    db_path: Path,
+    sort: str = "date",
+    reverse: bool = False,
+    limit: int = 20,
+    offset: int = 0,
+    model: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    lang: Optional[str] = None,
+) -> list[ConversationSummary]:
+    """List conversations without a search term, one page at a time.
+
+    Reads only the conversation_summary table. Sorting follows LIST_SORTS
+    (newest/largest first, titles A-Z); reverse flips it. Filters: model
+    (partial slug match), since/until (conversation creation time) and
+    lang (dominant language).
+
+    Raises:
+        ValueError: If sort is unknown or the index predates listings
+    """
+    if sort not in LIST_SORTS:
+        raise ValueError(
+            f"Unknown sort '{sort}'. Use one of: {', '.join(LIST_SORTS)}"
+        )
+    column, descending = LIST_SORTS[sort]
+    if reverse:
+        descending = not descending
+    direction = "DESC" if descending else "ASC"
+
+    filters = []
+    params: list = []
+    if model:
+        filters.append("model LIKE ?")
+        params.append(f"%{model}%")
+    if since is not None:
+        filters.append("created_at >= ?")
+        params.append(since)
+    if until is not None:
+        filters.append("created_at <= ?")
+        params.append(until)
+    if lang:
+        filters.append("lang = ?")
+        params.append(lang)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+    conn = get_connection(db_path)
+    try:
+        if not has_table(conn, "conversation_summary"):
+            raise ValueError(
+                "Conversation listing not built. Rebuild with: "
+                "chatgpt-search --rebuild --export /path/to/export"
+            )
+        rows = conn.execute(
+            f"""SELECT conversation_id, title, created_at, updated_at, model,
+                       message_count, word_count, code_count, lang,
+                       first_prompt, keywords
+                FROM conversation_summary
+                {where}
+                ORDER BY {column} {direction}, conversation_id
+                LIMIT ? OFFSET ?""",
+            params + [limit, offset],
+        ).fetchall()
+        return [
+            ConversationSummary(
+                id=row["conversation_id"],
+                title=row["title"] or "",
+                created_at=row["created_at"],
+                updated_at=row["updated_at"],
+                model=row["model"],
+                message_count=row["message_count"],
+                word_count=row["word_count"],
+                code_count=row["code_count"],
+                lang=row["lang"],
+                first_prompt=row["first_prompt"] or "",
+                keywords=row["keywords"].split(", ") if row["keywords"] else [],
+            )
+            for row in rows
+        ]
+    finally:
+        conn.close()
+
+
 def get_stats(db_path: Path) -> CorpusStats:
     """Get corpus-level statistics."""
     conn = get_connection(db_path)
     try:
         conv_count = conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
         msg_count = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        body_count = conn.execute("SELECT COUNT(*) FROM bodies").fetchone()[0]
 
         # Keyword count (safe for older DBs without keywords table)
         try:
@@ -285,9 +1550,10 @@ def get_stats(db_path: Path) -> CorpusStats:
         role_distribution = {row["role"]: row["cnt"] for row in role_rows}
 
         model_rows = conn.execute(
-            """SELECT model_slug, COUNT(*) as cnt FROM messages
-               WHERE model_slug IS NOT NULL
-               GROUP BY model_slug ORDER BY cnt DESC"""
+            """SELECT md.slug AS model_slug, COUNT(*) as cnt
+               FROM messages m
+               JOIN models md ON m.model_id = md.id
+               GROUP BY m.model_id ORDER BY cnt DESC"""
         ).fetchall()
         model_distribution = {row["model_slug"]: row["cnt"] for row in model_rows}
 
@@ -320,6 +1586,8 @@ def get_stats(db_path: Path) -> CorpusStats:
             top_content_types=top_content_types,
             db_size_mb=round(db_size, 2),
             language_distribution=language_distribution,
+            index_generation=get_index_generation(conn),
+            body_count=body_count,
         )
     finally:
         conn.close()
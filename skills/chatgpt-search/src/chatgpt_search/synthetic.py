@@ -0,0 +1,290 @@
+"""Deterministic synthetic ChatGPT exports for benchmarks and tests.
+
+Generates conversations in the same shape as a real conversations.json
+(mapping tree, current_node, content parts, model metadata) with
+configurable size, branching, message length, code ratio and language mix.
+The same config and seed always produce byte-identical output.
+"""
+
+import io
+import json
+import random
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Iterator
+
+# Small per-language vocabularies -- enough for langdetect to tag messages
+# and for TF-IDF to find distinctive terms.
+VOCABULARY: dict[str, list[str]] = {
+    "en": [
+        "model", "training", "data", "pipeline", "deploy", "kubernetes",
+        "database", "index", "query", "latency", "cache", "python",
+        "function", "error", "server", "request", "response", "token",
+        "embedding", "vector", "search", "pricing", "strategy", "market",
+        "customer", "design", "review", "schema", "migration", "test",
+        "the", "and", "with", "for", "this", "that", "how", "can", "should",
+        "would", "because", "when", "which", "about", "into", "over",
+    ],
+    "ru": [
+        "модель", "обучение", "данные", "сервер", "запрос", "ответ",
+        "ошибка", "функция", "база", "индекс", "поиск", "кэш", "стратегия",
+        "рынок", "клиент", "дизайн", "проверка", "схема", "миграция", "тест",
+        "и", "в", "на", "что", "как", "это", "для", "с", "по", "не",
+        "можно", "нужно", "потому", "когда", "который",
+    ],
+    "de": [
+        "Modell", "Training", "Daten", "Server", "Anfrage", "Antwort",
+        "Fehler", "Funktion", "Datenbank", "Index", "Suche", "Strategie",
+        "Markt", "Kunde", "Entwurf", "Prüfung", "Schema", "Migration",
+        "und", "der", "die", "das", "mit", "für", "nicht", "ist", "wie",
+        "kann", "sollte", "weil", "wenn", "welche", "über",
+    ],
+    "es": [
+        "modelo", "entrenamiento", "datos", "servidor", "consulta",
+        "respuesta", "error", "función", "base", "índice", "búsqueda",
+        "estrategia", "mercado", "cliente", "diseño", "revisión", "esquema",
+        "y", "el", "la", "de", "que", "en", "para", "con", "por", "como",
+        "puede", "debería", "porque", "cuando", "cual", "sobre",
+    ],
+    "fr": [
+        "modèle", "entraînement", "données", "serveur", "requête",
+        "réponse", "erreur", "fonction", "base", "index", "recherche",
+        "stratégie", "marché", "client", "conception", "schéma",
+        "et", "le", "la", "les", "de", "des", "que", "pour", "avec", "dans",
+        "peut", "devrait", "parce", "quand", "quel", "sur",
+    ],
+    "zh": [
+        "模型", "训练", "数据", "服务器", "查询", "响应", "错误", "函数",
+        "数据库", "索引", "搜索", "缓存", "策略", "市场", "客户", "设计",
+        "的", "是", "在", "和", "了", "我们", "可以", "应该", "因为", "如何",
+    ],
+    "ja": [
+        "モデル", "学習", "データ", "サーバー", "クエリ", "応答", "エラー",
+        "関数", "データベース", "検索", "キャッシュ", "戦略", "市場", "設計",
+        "の", "は", "を", "に", "が", "で", "と", "です", "ます", "どうやって",
+    ],
+}
+
+# Languages written without spaces between words
+_UNSPACED = {"zh", "ja"}
+
+CODE_LANGUAGES = ["python", "javascript", "bash", "sql", "rust"]
+
+_CODE_SNIPPETS = {
+    "python": "def {name}(items):\n    return sorted(items, key=lambda x: x['{field}'])\n",
+    "javascript": "function {name}(items) {{\n  return items.map(x => x.{field});\n}}\n",
+    "bash": "for f in *.{field}; do\n  echo \"{name} $f\"\ndone\n",
+    "sql": "SELECT {field}, COUNT(*) FROM {name}\nGROUP BY {field};\n",
+    "rust": "fn {name}(items: &[u32]) -> u32 {{\n    items.iter().map(|{field}| {field} * 2).sum()\n}}\n",
+}
+
+_IDENTIFIERS = [
+    "get_connection", "build_index", "parse_export", "load_config",
+    "fetch_rows", "render_page", "sort_items", "compute_score",
+]
+
+MODELS = ["gpt-4o", "gpt-4o-mini", "gpt-5", "o3", "o4-mini"]
+
+# ChatGPT web-search citation markup (PUA-delimited)
+_CITATION = "\ue200cite\ue202turn{n}search{m}\ue201"
+
+
+@dataclass
+class SyntheticConfig:
+    """Shape of a generated export."""
+
+    conversations: int = 1000
+    min_turns: int = 2  # user+assistant exchanges per conversation
+    max_turns: int = 10
+    branching: float = 0.1  # chance an assistant turn has regenerated siblings
+    max_branches: int = 3
+    min_words: int = 10
+    max_words: int = 150
+    code_ratio: float = 0.2  # chance an assistant message contains code
+    citation_ratio: float = 0.05  # chance an assistant message has citations
+    languages: dict[str, float] = field(default_factory=lambda: {"en": 1.0})
+    start_time: float = 1672531200.0  # 2023-01-01 UTC
+    span_days: int = 1095
+    seed: int = 0
+
+
+def parse_language_mix(spec: str) -> dict[str, float]:
+    """Parse a language mix like 'en=0.7,ru=0.2,de=0.1'."""
+    mix: dict[str, float] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        lang, _, weight = item.partition("=")
+        lang = lang.strip()
+        if lang not in VOCABULARY:
+            raise ValueError(
+                f"Unsupported synthetic language {lang!r}. "
+                f"Choose from: {', '.join(sorted(VOCABULARY))}"
+            )
+        mix[lang] = float(weight) if weight else 1.0
+    if not mix:
+        raise ValueError("Language mix is empty")
+    return mix
+
+
+class _Generator:
+    """Stateful generator; all randomness flows from one seeded RNG."""
+
+    def __init__(self, config: SyntheticConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.langs = list(config.languages)
+        self.lang_weights = [config.languages[lang] for lang in self.langs]
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _sentence(self, lang: str, words: int) -> str:
+        vocab = VOCABULARY[lang]
+        picked = [self.rng.choice(vocab) for _ in range(words)]
+        if lang in _UNSPACED:
+            return "".join(picked) + "。"
+        return " ".join(picked).capitalize() + "."
+
+    def _prose(self, lang: str) -> str:
+        cfg = self.config
+        remaining = self.rng.randint(cfg.min_words, cfg.max_words)
+        sentences = []
+        while remaining > 0:
+            n = min(remaining, self.rng.randint(6, 18))
+            sentences.append(self._sentence(lang, n))
+            remaining -= n
+        # Group sentences into paragraphs
+        paragraphs = []
+        for i in range(0, len(sentences), 4):
+            paragraphs.append(" ".join(sentences[i:i + 4]))
+        return "\n\n".join(paragraphs)
+
+    def _code_block(self) -> str:
+        code_lang = self.rng.choice(CODE_LANGUAGES)
+        body = _CODE_SNIPPETS[code_lang].format(
+            name=self.rng.choice(_IDENTIFIERS),
+            field=self.rng.choice(["id", "name", "score", "created_at"]),
+        )
+        return f"```{code_lang}\n{body}```"
+
+    def _assistant_text(self, lang: str) -> str:
+        text = self._prose(lang)
+        if self.rng.random() < self.config.citation_ratio:
+            text += " " + _CITATION.format(
+                n=self.rng.randint(0, 3), m=self.rng.randint(0, 9)
+            )
+        if self.rng.random() < self.config.code_ratio:
+            text += "\n\n" + self._code_block() + "\n\n" + self._prose(lang)
+        return text
+
+    def _node(
+        self,
+        mapping: dict,
+        parent: str | None,
+        role: str | None,
+        text: str,
+        created_at: float | None,
+        model: str | None,
+    ) -> str:
+        node_id = self._uuid()
+        message = None
+        if role is not None:
+            metadata = {"model_slug": model} if model else {}
+            message = {
+                "id": node_id,
+                "author": {"role": role, "name": None, "metadata": {}},
+                "create_time": created_at,
+                "update_time": None,
+                "content": {"content_type": "text", "parts": [text]},
+                "status": "finished_successfully",
+                "metadata": metadata,
+                "recipient": "all",
+            }
+        mapping[node_id] = {
+            "id": node_id,
+            "message": message,
+            "parent": parent,
+            "children": [],
+        }
+        if parent is not None:
+            mapping[parent]["children"].append(node_id)
+        return node_id
+
+    def conversation(self) -> dict:
+        cfg = self.config
+        rng = self.rng
+        lang = rng.choices(self.langs, weights=self.lang_weights)[0]
+        model = rng.choice(MODELS)
+        created = cfg.start_time + rng.random() * cfg.span_days * 86400
+        ts = created
+
+        mapping: dict[str, dict] = {}
+        node = self._node(mapping, None, None, "", None, None)
+        node = self._node(mapping, node, "system", "", None, None)
+
+        for _ in range(rng.randint(cfg.min_turns, cfg.max_turns)):
+            ts += rng.randint(5, 600)
+            node = self._node(mapping, node, "user", self._prose(lang), ts, None)
+            parent = node
+
+            # Regenerated answers: dead-end siblings off the canonical path
+            if rng.random() < cfg.branching:
+                for _ in range(rng.randint(1, cfg.max_branches)):
+                    self._node(
+                        mapping, parent, "assistant",
+                        self._assistant_text(lang), ts + 1, model,
+                    )
+
+            ts += rng.randint(1, 60)
+            node = self._node(
+                mapping, parent, "assistant", self._assistant_text(lang), ts, model
+            )
+
+        title_words = rng.randint(2, 6)
+        return {
+            "title": self._sentence(lang, title_words).rstrip(".。"),
+            "create_time": created,
+            "update_time": ts,
+            "mapping": mapping,
+            "current_node": node,
+            "conversation_id": self._uuid(),
+            "default_model_slug": model,
+        }
+
+
+def generate_export(config: SyntheticConfig) -> Iterator[dict]:
+    """Yield synthetic conversation dicts, deterministically for a seed."""
+    gen = _Generator(config)
+    for _ in range(config.conversations):
+        yield gen.conversation()
+
+
+def _write_array(f: IO[str], config: SyntheticConfig) -> None:
+    f.write("[")
+    for i, conv in enumerate(generate_export(config)):
+        if i:
+            f.write(",\n")
+        json.dump(conv, f, ensure_ascii=False)
+    f.write("]")
+
+
+def write_export(path: Path, config: SyntheticConfig) -> Path:
+    """Write a synthetic export to disk, streaming one conversation at a time.
+
+    A path ending in .zip produces an archive with conversations.json
+    inside, like the real ChatGPT export.
+    """
+    path = Path(path)
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            with archive.open("conversations.json", "w") as raw:
+                with io.TextIOWrapper(raw, encoding="utf-8") as f:
+                    _write_array(f, config)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            _write_array(f, config)
+    return path
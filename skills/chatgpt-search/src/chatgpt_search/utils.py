@@ -1,6 +1,10 @@
 """Text processing utilities."""
 
+import hashlib
 import re
+import struct
+import zlib
+from typing import Optional
 
 # Unicode Private Use Area ranges used by ChatGPT for citation markers
 _PUA_PATTERN = re.compile(r"[\ue000-\uf8ff]")
@@ -8,11 +12,40 @@ _PUA_PATTERN = re.compile(r"[\ue000-\uf8ff]")
 # ChatGPT citation markup: citeturn0search1, citeturn2view0, etc.
 _CITETURN_PATTERN = re.compile(r"citeturn\d+\w+\d*")
 
-# Code block extraction pattern (fenced code blocks)
+# Code block extraction pattern (fenced code blocks); group 1 is the
+# fence language tag (python, c++, objective-c, ...), group 2 the code
 _CODE_BLOCK_PATTERN = re.compile(
-    r"```(?:\w+)?\s*\n(.*?)```", re.DOTALL
+    r"```([\w+#.-]*)\s*\n(.*?)```", re.DOTALL
 )
 
+# Common short fence tags, mapped to the name most blocks use
+_FENCE_ALIASES = {
+    "py": "python",
+    "python3": "python",
+    "js": "javascript",
+    "ts": "typescript",
+    "sh": "bash",
+    "rs": "rust",
+    "yml": "yaml",
+    "golang": "go",
+}
+
+_NEWLINE_RUN_PATTERN = re.compile(r"\n{3,}")
+
+# Han, kana and Hangul: scripts written without spaces between words
+_CJK_RANGES = (
+    "\u1100-\u11ff"  # Hangul Jamo
+    "\u3040-\u30ff"  # Hiragana, Katakana
+    "\u3130-\u318f"  # Hangul Compatibility Jamo
+    "\u31f0-\u31ff"  # Katakana Phonetic Extensions
+    "\u3400-\u4dbf"  # CJK Extension A
+    "\u4e00-\u9fff"  # CJK Unified Ideographs
+    "\uac00-\ud7af"  # Hangul Syllables
+    "\uf900-\ufaff"  # CJK Compatibility Ideographs
+)
+_CJK_PATTERN = re.compile(f"[{_CJK_RANGES}]")
+CJK_RUN_PATTERN = re.compile(f"[{_CJK_RANGES}]+")
+
 
 def strip_pua(text: str) -> str:
     """Remove Unicode Private Use Area characters (citation markers)."""
@@ -25,7 +58,7 @@ def separate_code(text: str) -> tuple[str, str]:
     Returns:
         (prose, code) — prose with code blocks removed, and code blocks joined.
     """
-    code_blocks = _CODE_BLOCK_PATTERN.findall(text)
+    code_blocks = [m.group(2) for m in _CODE_BLOCK_PATTERN.finditer(text)]
     prose = _CODE_BLOCK_PATTERN.sub("", text).strip()
     code = "\n\n".join(block.strip() for block in code_blocks if block.strip())
     return prose, code
@@ -53,13 +86,192 @@ def strip_citeturn(text: str) -> str:
     return _CITETURN_PATTERN.sub("", text)
 
 
+def _collapse_newlines(text: str) -> str:
+    """Collapse 3+ newlines to a paragraph break, skipping the regex if none."""
+    if "\n\n\n" in text:
+        return _NEWLINE_RUN_PATTERN.sub("\n\n", text)
+    return text
+
+
+def _strip_markup(text: str) -> str:
+    """Remove PUA markers, then the citation markup they delimited.
+
+    Each regex only runs when a cheap C-level check says it can match:
+    ASCII text has no PUA characters, and citations contain "cite".
+    """
+    if not text.isascii():
+        text = _PUA_PATTERN.sub("", text)
+    if "cite" in text:
+        text = _CITETURN_PATTERN.sub("", text)
+    return text
+
+
 def clean_text(text: str) -> str:
     """Full text cleaning pipeline."""
-    text = strip_pua(text)
-    text = strip_citeturn(text)
+    text = _strip_markup(text)
     # Normalize whitespace (collapse multiple newlines but preserve paragraph breaks)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text.strip()
+    return _collapse_newlines(text).strip()
+
+
+def normalize_code_lang(tag: Optional[str]) -> Optional[str]:
+    """Lower-case a fence language tag and resolve common aliases ('py')."""
+    if not tag:
+        return None
+    tag = tag.lower()
+    return _FENCE_ALIASES.get(tag, tag)
+
+
+def clean_and_split_blocks(
+    text: str,
+) -> tuple[str, list[tuple[Optional[str], str]]]:
+    """Clean text and split out its fenced code blocks in a single walk.
+
+    Same cleaning as clean_text, except that newline runs left behind
+    where code blocks were removed are collapsed too. Most messages have
+    no markers, no code and no long newline runs, so every step is gated
+    on a substring check and the regexes only run for messages that need
+    them; code blocks are split with one finditer instead of findall
+    plus sub.
+
+    Returns:
+        (prose, blocks) — cleaned prose and a (fence_lang, code) pair per
+        non-empty block, fence_lang normalized or None if untagged.
+    """
+    text = _strip_markup(text)
+    if "```" not in text:
+        return _collapse_newlines(text).strip(), []
+
+    prose_parts = []
+    blocks = []
+    pos = 0
+    for m in _CODE_BLOCK_PATTERN.finditer(text):
+        prose_parts.append(text[pos:m.start()])
+        pos = m.end()
+        block = _collapse_newlines(m.group(2)).strip()
+        if block:
+            blocks.append((normalize_code_lang(m.group(1)), block))
+    prose_parts.append(text[pos:])
+    prose = _collapse_newlines("".join(prose_parts)).strip()
+    return prose, blocks
+
+
+def clean_and_split(text: str) -> tuple[str, str]:
+    """Like clean_and_split_blocks, with the code blocks joined.
+
+    Same result as separate_code(clean_text(text)), except for the
+    collapsed newline runs where code was removed.
+
+    Returns:
+        (prose, code) — cleaned prose and cleaned code blocks joined.
+    """
+    prose, blocks = clean_and_split_blocks(text)
+    return prose, "\n\n".join(code for _, code in blocks)
+
+
+def has_cjk(text: str | None) -> bool:
+    """Return True if text contains Chinese, Japanese or Korean characters."""
+    return bool(text) and not text.isascii() and _CJK_PATTERN.search(text) is not None
+
+
+def cjk_bigrams(run: str) -> list[str]:
+    """Overlapping bigrams of a CJK run ('東京都' -> ['東京', '京都'])."""
+    return [run[i:i + 2] for i in range(len(run) - 1)] or [run]
+
+
+def _segment_run(match: re.Match) -> str:
+    run = match.group()
+    grams = cjk_bigrams(run)
+    if len(run) > 1:
+        grams.append(run[-1])  # so every character starts some token
+    return " " + " ".join(grams) + " "
+
+
+def segment_cjk(text: str) -> str:
+    """Split each CJK run into space-separated overlapping bigrams.
+
+    unicode61 treats a whole run of CJK characters as one token, so a
+    query only matches the full run. After segmentation '東京都庁' is
+    indexed as '東京 京都 都庁 庁': any 2+ character substring of a run
+    is a phrase of adjacent bigrams, and any single character is a
+    prefix of some token. Other text is left unchanged.
+    """
+    if not has_cjk(text):
+        return text
+    return CJK_RUN_PATTERN.sub(_segment_run, text)
+
+
+# MinHash sketch: overlapping character shingles, one-permutation hashed
+# into MINHASH_BINS bins and grouped into LSH bands of MINHASH_ROWS bins.
+# 8 bands x 8 rows: a pair shares a band with probability 1 - (1 - s^8)^8
+# for shingle Jaccard similarity s, about 0.99 at s = 0.9, 0.77 at 0.8,
+# 0.38 at 0.7 and 0.03 at 0.5. That holds once every bin is filled
+# (a few hundred shingles); on shorter texts densified bins repeat each
+# other, bands are correlated and unrelated texts match far more often,
+# so band matches are only candidates (see shingle_jaccard).
+MINHASH_BINS = 64
+MINHASH_ROWS = 8
+MINHASH_BAND_BYTES = 8
+_MINHASH_SHINGLE = 5
+_MINHASH_MAX_CHARS = 4000  # longer texts are sketched from their start
+_MINHASH_EMPTY = 1 << 26  # above any 26-bit bin value
+
+
+def shingle_hashes(text: str) -> set[int]:
+    """Return the CRC-32 hashes of text's shingles, as used by minhash_bands."""
+    data = " ".join(text.lower().split())[:_MINHASH_MAX_CHARS].encode("utf-8")
+    return set(
+        map(
+            zlib.crc32,
+            [
+                data[i : i + _MINHASH_SHINGLE]
+                for i in range(len(data) - _MINHASH_SHINGLE + 1)
+            ],
+        )
+    )
+
+
+def shingle_jaccard(a: set[int], b: set[int]) -> float:
+    """Return the Jaccard similarity of two shingle_hashes sets."""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def minhash_bands(text: str) -> Optional[bytes]:
+    """Return the LSH band hashes of text's MinHash signature.
+
+    Shingles are 5-byte windows of the lowercased, whitespace-collapsed
+    UTF-8 text. Each is hashed once with CRC-32: the low 6 bits pick
+    a bin and the bin keeps its smallest remaining value (one-permutation
+    hashing). Empty bins borrow from the next filled bin, offset by the
+    distance (rotation densification), so short texts still fill every
+    band. Each band is then hashed to 8 bytes; two texts are near-
+    duplicate candidates when any band (at the same position) matches.
+    Returns 64 bytes, or None for text too short to shingle.
+    """
+    hashes = shingle_hashes(text)
+    if not hashes:
+        return None
+    # Within a bin, ordering by the full hash is ordering by the value, so
+    # walking hashes from largest to smallest leaves each bin's minimum.
+    mins = {h & (MINHASH_BINS - 1): h >> 6 for h in sorted(hashes, reverse=True)}
+
+    signature = [mins.get(i, _MINHASH_EMPTY) for i in range(MINHASH_BINS)]
+    if len(mins) < MINHASH_BINS:
+        for i in range(MINHASH_BINS):
+            distance = 1
+            while i not in mins and signature[i] == _MINHASH_EMPTY:
+                j = (i + distance) % MINHASH_BINS
+                if j in mins:
+                    signature[i] = mins[j] + distance * _MINHASH_EMPTY
+                distance += 1
+
+    bands = []
+    for start in range(0, MINHASH_BINS, MINHASH_ROWS):
+        row = struct.pack(f"<{MINHASH_ROWS}Q", *signature[start : start + MINHASH_ROWS])
+        bands.append(hashlib.blake2b(row, digest_size=MINHASH_BAND_BYTES).digest())
+    return b"".join(bands)
 
 
 def format_timestamp(ts: float | None) -> str:
@@ -0,0 +1,106 @@
+"""Watch a directory for new exports and index them incrementally.
+
+Polls with Path.rglob (no inotify dependency, works on network shares).
+A file is indexed once its size and mtime have been stable for one poll
+interval, so half-copied exports are never read. Failures are logged: an
+export that fails on the database side (locked live DB) is retried on the
+next poll, one that is itself unreadable (removed mid-poll, bad JSON) is
+skipped until its size or mtime changes.
+"""
+
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from .indexer import update_index
+from .parser import EXPORT_MEMBER
+
+# File signature used to detect new or changed exports
+_Signature = tuple[int, int]  # (mtime_ns, size)
+
+
+def find_exports(directory: Path) -> dict[Path, _Signature]:
+    """Return conversations.json files and .zip exports under directory."""
+    found = {}
+    for path in directory.rglob("*"):
+        if path.name != EXPORT_MEMBER and path.suffix.lower() != ".zip":
+            continue
+        try:
+            st = path.stat()
+        except OSError:
+            continue  # removed between listing and stat
+        if path.is_file():
+            found[path] = (st.st_mtime_ns, st.st_size)
+    return found
+
+
+def watch(
+    directory: Path,
+    db_path: Path,
+    interval: float = 5.0,
+    once: bool = False,
+    progress: bool = True,
+    on_indexed: Optional[Callable[[Path, dict], None]] = None,
+) -> None:
+    """Index new or changed exports in directory until interrupted.
+
+    Each export goes through update_index, so only new or updated
+    conversations are written. With once=True, everything currently in
+    the directory is indexed (without the stability wait) and the
+    function returns.
+
+    Args:
+        directory: Folder to watch (searched recursively)
+        db_path: Live database to update
+        interval: Seconds between polls
+        once: Index the current contents and return
+        progress: If True, print activity to stderr
+        on_indexed: Called with (export_path, stats) after each export
+    """
+    if not directory.is_dir():
+        raise ValueError(f"Watch directory not found: {directory}")
+
+    indexed: dict[Path, _Signature] = {}
+    pending: dict[Path, _Signature] = {}
+    failed: dict[Path, _Signature] = {}  # unreadable until the file changes
+
+    if progress:
+        print(f"  Watching {directory} (every {interval:g}s)...", file=sys.stderr)
+
+    while True:
+        current = find_exports(directory)
+        # Oldest first, so newer exports win for conversations in both
+        for path in sorted(current, key=lambda p: current[p][0]):
+            signature = current[path]
+            if signature in (indexed.get(path), failed.get(path)):
+                continue
+            if not once and pending.get(path) != signature:
+                pending[path] = signature  # wait one poll for the copy to finish
+                continue
+            pending.pop(path, None)
+
+            if progress:
+                print(f"  Indexing {path}...", file=sys.stderr)
+            try:
+                stats = update_index(path, db_path, progress=progress)
+            except sqlite3.Error as e:
+                # Not marked indexed, so the next poll tries again
+                print(f"  Warning: Skipping {path}: {e}", file=sys.stderr)
+                continue
+            except (OSError, ValueError) as e:
+                failed[path] = signature
+                print(
+                    f"  Warning: Skipping {path} until it changes: {e}",
+                    file=sys.stderr,
+                )
+                continue
+            failed.pop(path, None)
+            indexed[path] = signature
+            if on_indexed is not None:
+                on_indexed(path, stats)
+
+        if once:
+            return
+        time.sleep(interval)
@@ -0,0 +1,33 @@
+"""Tests for the CLI entry point."""
+
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+
+def test_cli_import_skips_build_modules():
+    """Test that importing the CLI does not load indexing dependencies."""
+    code = (
+        "import sys, chatgpt_search.cli\n"
+        "heavy = ('chatgpt_search.indexer', 'chatgpt_search.enrichment',\n"
+        "         'chatgpt_search.languages', 'sklearn', 'langdetect')\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == ""
+
+
+def test_cli_timeline_rejects_ignored_flags():
+    """Test that --timeline refuses flags its query would silently ignore."""
+    db_path = Path(tempfile.gettempdir()) / "chatgpt-search-missing.db"
+    for flag in (["--fuzzy"], ["--facets"], ["--rank", "recent"], ["--offset", "5"]):
+        out = subprocess.run(
+            [sys.executable, "-m", "chatgpt_search.cli", "sorting", "--timeline",
+             "--db", str(db_path), *flag],
+            capture_output=True, text=True,
+        )
+        assert out.returncode == 1
+        assert "--timeline cannot be combined" in out.stderr
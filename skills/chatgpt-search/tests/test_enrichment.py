@@ -4,11 +4,16 @@ import sqlite3
 import tempfile
 from pathlib import Path
 
+import pytest
+
+from chatgpt_search.db import get_build_checkpoint, get_connection
+from chatgpt_search.enrichment import extract_keywords_tfidf, resolve_keyword_engine
 from chatgpt_search.indexer import build_index
 from chatgpt_search.searcher import (
     get_conversation_keywords,
     get_top_keywords,
 )
+from chatgpt_search.synthetic import SyntheticConfig, write_export
 
 FIXTURES = Path(__file__).parent / "fixtures"
 SAMPLE_FILE = FIXTURES / "sample_conversations.json"
@@ -170,3 +175,87 @@ def test_build_index_returns_keyword_stats():
         assert "entity_count" not in stats
     finally:
         db_path.unlink(missing_ok=True)
+
+
+def test_parallel_language_groups_match_serial():
+    """Test that fitting language groups in worker processes gives the same keywords."""
+    with tempfile.TemporaryDirectory() as tmp:
+        export = write_export(
+            Path(tmp) / "mixed.json",
+            SyntheticConfig(
+                conversations=60, languages={"en": 1, "ru": 1, "de": 1}, seed=11
+            ),
+        )
+        db_path = Path(tmp) / "index.db"
+        build_index(export, db_path, rebuild=True, progress=False)
+
+        conn = get_connection(db_path)
+        query = "SELECT conversation_id, keyword, score FROM keywords"
+        serial = sorted(tuple(r) for r in conn.execute(query))
+
+        done = []
+        conn.execute("DELETE FROM keywords")
+        count = extract_keywords_tfidf(
+            conn, progress=False, workers=3, on_group=done.append
+        )
+        parallel = sorted(tuple(r) for r in conn.execute(query))
+        conn.close()
+
+        assert sorted(done) == ["de", "en", "ru"]
+        assert count == len(serial)
+        assert parallel == serial
+
+
+def test_builtin_engine_matches_sklearn():
+    """Test that the pure-Python engine reproduces scikit-learn's keyword scores."""
+    pytest.importorskip("sklearn")
+    with tempfile.TemporaryDirectory() as tmp:
+        export = write_export(
+            Path(tmp) / "mixed.json",
+            SyntheticConfig(
+                conversations=60, languages={"en": 2, "ja": 1}, seed=5
+            ),
+        )
+        db_path = Path(tmp) / "index.db"
+        build_index(
+            export, db_path, rebuild=True, progress=False, keyword_engine="sklearn"
+        )
+
+        conn = get_connection(db_path)
+        query = "SELECT conversation_id, score FROM keywords"
+        reference = sorted(tuple(r) for r in conn.execute(query))
+
+        conn.execute("DELETE FROM keywords")
+        count = extract_keywords_tfidf(conn, progress=False, engine="builtin")
+        builtin = sorted(tuple(r) for r in conn.execute(query))
+        conn.close()
+
+        # Ties may pick different keywords, but per-conversation scores agree
+        assert count == len(reference) > 0
+        assert [r[0] for r in builtin] == [r[0] for r in reference]
+        for (_, ours), (_, theirs) in zip(builtin, reference):
+            assert abs(ours - theirs) < 1e-5
+
+
+def test_keyword_engine_is_validated():
+    """Test that an unknown keyword engine is rejected before building."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "index.db"
+        with pytest.raises(ValueError, match="spacy"):
+            build_index(
+                SAMPLE_FILE, db_path, rebuild=True, progress=False,
+                keyword_engine="spacy",
+            )
+        assert not db_path.exists()
+
+
+def test_checkpoint_stores_resolved_keyword_engine():
+    """Test that "auto" is stored as the engine it resolved to."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "index.db"
+        build_index(SAMPLE_FILE, db_path, rebuild=True, progress=False)
+
+        conn = get_connection(db_path)
+        checkpoint = get_build_checkpoint(conn)
+        conn.close()
+        assert checkpoint["keyword_engine"] == resolve_keyword_engine("auto")
@@ -1,10 +1,14 @@
 """Tests for the indexer."""
 
+import json
+import os
 import sqlite3
 import tempfile
 from pathlib import Path
 
-from chatgpt_search.indexer import build_index
+import pytest
+
+from chatgpt_search.indexer import build_index, update_index
 
 FIXTURES = Path(__file__).parent / "fixtures"
 SAMPLE_FILE = FIXTURES / "sample_conversations.json"
@@ -96,3 +100,514 @@ def test_fts_index_searchable():
         conn.close()
     finally:
         db_path.unlink(missing_ok=True)
+
+
+def test_build_index_sharded_matches_serial(monkeypatch):
+    """Test that a multi-worker sharded build matches a serial build."""
+    import chatgpt_search.indexer as indexer
+
+    monkeypatch.setattr(indexer, "_SHARD_BATCH_SIZE", 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serial_db = Path(tmp) / "serial.db"
+        sharded_db = Path(tmp) / "sharded.db"
+
+        serial = build_index(SAMPLE_FILE, serial_db, rebuild=True, progress=False)
+        sharded = build_index(
+            SAMPLE_FILE, sharded_db, rebuild=True, progress=False, workers=2
+        )
+
+        assert sharded["conversation_count"] == serial["conversation_count"]
+        assert sharded["message_count"] == serial["message_count"]
+
+        conn = sqlite3.connect(str(sharded_db))
+        msg_ids = {r[0] for r in conn.execute("SELECT id FROM messages")}
+        fts_rows = conn.execute("SELECT COUNT(*) FROM messages_fts").fetchone()[0]
+        hits = conn.execute(
+            "SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH 'the'"
+        ).fetchone()[0]
+        orphans = conn.execute(
+            """SELECT COUNT(*) FROM messages_fts f
+               LEFT JOIN messages m ON m.rowid = f.rowid
+               WHERE m.rowid IS NULL"""
+        ).fetchone()[0]
+        conn.close()
+
+        conn = sqlite3.connect(str(serial_db))
+        serial_ids = {r[0] for r in conn.execute("SELECT id FROM messages")}
+        conn.close()
+
+        assert msg_ids == serial_ids
+        assert fts_rows == sharded["message_count"]
+        assert hits > 0
+        assert orphans == 0
+        # Shard files are cleaned up after the merge
+        assert not list(Path(tmp).glob(".shards-*"))
+
+
+def _crashing_shard_worker(*args) -> None:
+    os._exit(3)  # as if the worker were OOM-killed, without reporting
+
+
+def test_build_index_sharded_fails_when_worker_dies(monkeypatch):
+    """Test that a dead shard worker fails the build instead of hanging it."""
+    import chatgpt_search.indexer as indexer
+
+    monkeypatch.setattr(indexer, "_shard_worker", _crashing_shard_worker)
+    monkeypatch.setattr(indexer, "_WORKER_POLL_S", 0.1)
+    with tempfile.TemporaryDirectory() as tmp:
+        with pytest.raises(RuntimeError, match="exited with code 3"):
+            build_index(
+                SAMPLE_FILE, Path(tmp) / "index.db", rebuild=True,
+                progress=False, workers=2,
+            )
+
+
+def test_build_index_sharded_matches_serial_on_repeated_conversations(monkeypatch):
+    """Test that repeated conversations resolve the same way sharded and serial."""
+    import chatgpt_search.indexer as indexer
+
+    monkeypatch.setattr(indexer, "_SHARD_BATCH_SIZE", 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        data = json.loads(SAMPLE_FILE.read_text(encoding="utf-8"))
+        renamed = json.loads(json.dumps(data))
+        renamed[1]["title"] = "Renamed Zanzibar Thread"  # last copy wins
+        export = Path(tmp) / "conversations.json"
+        export.write_text(json.dumps(data + renamed), encoding="utf-8")
+
+        outputs = []
+        for workers in (1, 2):
+            db_path = Path(tmp) / f"index-{workers}.db"
+            stats = build_index(
+                export, db_path, rebuild=True, progress=False, workers=workers
+            )
+            conn = sqlite3.connect(str(db_path))
+            conn.execute(
+                "INSERT INTO messages_fts(messages_fts, rank) VALUES('integrity-check', 1)"
+            )
+            outputs.append(
+                (
+                    stats["conversation_count"],
+                    stats["message_count"],
+                    conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0],
+                    conn.execute("SELECT COUNT(*) FROM code_blocks").fetchone()[0],
+                    sorted(conn.execute("SELECT id, title FROM conversations")),
+                    conn.execute(
+                        "SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH 'renamed'"
+                    ).fetchone()[0],
+                )
+            )
+            conn.close()
+
+        serial, sharded = outputs
+        assert sharded == serial
+        assert serial[0] == len(data)
+        assert serial[1] == serial[2]
+        assert serial[5] > 0
+
+
+def test_build_index_reports_phase_metrics():
+    """Test that per-phase timings and counters are returned and emitted."""
+    import io
+    import json
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "index.db"
+        out = io.StringIO()
+        stats = build_index(
+            SAMPLE_FILE, db_path, rebuild=True, progress=False, metrics_out=out
+        )
+
+        for phase in (
+            "json_load",
+            "thread_walk",
+            "text_clean",
+            "detect_language",
+            "sqlite_insert",
+            "fts_insert",
+            "commit",
+            "tfidf",
+        ):
+            assert phase in stats["phases"], phase
+            assert stats["phases"][phase] >= 0
+
+        assert stats["bytes_parsed"] == SAMPLE_FILE.stat().st_size
+        assert stats["counters"]["messages"] == stats["message_count"]
+        assert stats["counters"]["commits"] >= 1
+        assert stats["messages_per_s"] > 0
+
+        events = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert events[0]["event"] == "start"
+        assert events[-1]["event"] == "done"
+        assert events[-1]["message_count"] == stats["message_count"]
+
+
+def test_migrate_model_slug_to_models_table():
+    """Test that a v5 database with messages.model_slug migrates to model_id."""
+    from chatgpt_search.db import init_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "old.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            INSERT INTO meta VALUES ('schema_version', '5');
+            CREATE TABLE conversations (
+                id TEXT PRIMARY KEY, title TEXT, created_at REAL,
+                updated_at REAL, default_model_slug TEXT,
+                message_count INTEGER DEFAULT 0
+            );
+            CREATE TABLE messages (
+                id TEXT PRIMARY KEY, conversation_id TEXT NOT NULL,
+                role TEXT NOT NULL, content TEXT, code TEXT,
+                content_type TEXT, model_slug TEXT, created_at REAL,
+                turn_index INTEGER, lang TEXT
+            );
+            CREATE INDEX idx_messages_model ON messages(model_slug);
+            INSERT INTO conversations VALUES ('c1', 'T', 0, 0, 'gpt-4o', 3);
+            INSERT INTO messages VALUES
+                ('m1', 'c1', 'user', 'hi', '', 'text', NULL, 0, 0, 'en'),
+                ('m2', 'c1', 'assistant', 'yo', '', 'text', 'gpt-4o', 0, 1, 'en'),
+                ('m3', 'c1', 'assistant', 'ok', '', 'text', 'gpt-4o', 0, 2, 'en');
+            """
+        )
+        conn.close()
+
+        conn = init_db(db_path)
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(messages)")}
+        rows = conn.execute(
+            """SELECT m.id, md.slug FROM messages m
+               LEFT JOIN models md ON m.model_id = md.id ORDER BY m.id"""
+        ).fetchall()
+        model_count = conn.execute("SELECT COUNT(*) FROM models").fetchone()[0]
+        conn.close()
+
+        assert "model_id" in columns
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            assert "model_slug" not in columns
+        assert [tuple(r) for r in rows] == [
+            ("m1", None),
+            ("m2", "gpt-4o"),
+            ("m3", "gpt-4o"),
+        ]
+        assert model_count == 1
+
+
+def test_migrate_message_text_to_bodies():
+    """Test that a v8 database moves message text into deduplicated bodies."""
+    from chatgpt_search.db import init_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "old.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            INSERT INTO meta VALUES ('schema_version', '8');
+            CREATE TABLE conversations (
+                id TEXT PRIMARY KEY, title TEXT, created_at REAL,
+                updated_at REAL, default_model_slug TEXT,
+                message_count INTEGER DEFAULT 0
+            );
+            CREATE TABLE models (id INTEGER PRIMARY KEY, slug TEXT NOT NULL UNIQUE);
+            CREATE TABLE messages (
+                id TEXT PRIMARY KEY, conversation_id TEXT NOT NULL,
+                role TEXT NOT NULL, content TEXT, code TEXT,
+                content_type TEXT, model_id INTEGER, created_at REAL,
+                turn_index INTEGER, lang TEXT
+            );
+            CREATE VIRTUAL TABLE messages_fts USING fts5(title, content, code);
+            INSERT INTO conversations VALUES ('c1', 'Logs', 0, 0, NULL, 2);
+            INSERT INTO conversations VALUES ('c2', 'More logs', 0, 0, NULL, 2);
+            INSERT INTO messages VALUES
+                ('m1', 'c1', 'user', 'segfault in worker', '', 'text', NULL, 0, 0, 'en'),
+                ('m2', 'c1', 'assistant', 'check the core', 'gdb -c', 'text', NULL, 0, 1, 'en'),
+                ('m3', 'c2', 'user', 'segfault in worker', '', 'text', NULL, 0, 0, 'en'),
+                ('m4', 'c2', 'assistant', 'check the core', '', 'text', NULL, 0, 1, 'en');
+            INSERT INTO messages_fts(rowid, title, content, code)
+                SELECT m.rowid, c.title, m.content, m.code
+                FROM messages m JOIN conversations c ON c.id = m.conversation_id;
+            """
+        )
+        conn.close()
+
+        conn = init_db(db_path)
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(messages)")}
+        body_count = conn.execute("SELECT COUNT(*) FROM bodies").fetchone()[0]
+        rows = conn.execute(
+            """SELECT m.id, b.content, b.code FROM messages m
+               JOIN bodies b ON b.id = m.body_id ORDER BY m.id"""
+        ).fetchall()
+        hits = conn.execute(
+            "SELECT rowid FROM messages_fts WHERE messages_fts MATCH 'segfault'"
+        ).fetchall()
+        parents = dict(conn.execute("SELECT id, parent_id FROM messages"))
+        summaries = conn.execute(
+            """SELECT conversation_id, word_count, lang, first_prompt
+               FROM conversation_summary ORDER BY conversation_id"""
+        ).fetchall()
+        sketches = [r[0] for r in conn.execute("SELECT lsh FROM bodies ORDER BY id")]
+        conn.execute(
+            "INSERT INTO messages_fts(messages_fts, rank) VALUES('integrity-check', 1)"
+        )
+        conn.close()
+
+        assert "body_id" in columns
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            assert "content" not in columns
+        assert body_count == 3
+        assert [tuple(r) for r in rows] == [
+            ("m1", "segfault in worker", ""),
+            ("m2", "check the core", "gdb -c"),
+            ("m3", "segfault in worker", ""),
+            ("m4", "check the core", ""),
+        ]
+        assert len(hits) == 2
+        # v9 -> v10 backfills parent pointers from turn order
+        assert parents == {"m1": None, "m2": "m1", "m3": None, "m4": "m3"}
+        # v10 -> v11 fills the listing table
+        assert [tuple(r) for r in summaries] == [
+            ("c1", 6, "en", "segfault in worker"),
+            ("c2", 6, "en", "segfault in worker"),
+        ]
+        # v11 -> v12 sketches every body
+        assert [len(lsh) for lsh in sketches] == [64, 64, 64]
+
+
+def test_update_index_replaces_only_changed_conversations():
+    """Test that an incremental update rewrites changed conversations only."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "index.db"
+        build_index(SAMPLE_FILE, db_path, rebuild=True, progress=False, fuzzy=True)
+
+        data = json.loads(SAMPLE_FILE.read_text(encoding="utf-8"))
+        data[1]["title"] = "Renamed Zanzibar Thread"  # has code blocks
+        data[1]["update_time"] += 60
+        export = Path(tmp) / "conversations.json"
+        export.write_text(json.dumps(data), encoding="utf-8")
+
+        stats = update_index(export, db_path, progress=False)
+        assert stats["added"] == 0
+        assert stats["updated"] == 1
+        assert stats["unchanged"] == len(data) - 1
+        assert stats["index_generation"] == 2
+
+        conn = sqlite3.connect(str(db_path))
+        fts_rows = conn.execute("SELECT COUNT(*) FROM messages_fts").fetchone()[0]
+        fuzzy_rows = conn.execute("SELECT COUNT(*) FROM fuzzy_fts").fetchone()[0]
+        msg_rows = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        hits = conn.execute(
+            "SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH 'zanzibar'"
+        ).fetchone()[0]
+        # Raise if replaced rows were not removed from the external-content indexes
+        conn.execute("INSERT INTO code_fts(code_fts, rank) VALUES('integrity-check', 1)")
+        conn.execute(
+            "INSERT INTO messages_fts(messages_fts, rank) VALUES('integrity-check', 1)"
+        )
+        summary_title = conn.execute(
+            "SELECT title FROM conversation_summary WHERE conversation_id = ?",
+            (data[1]["id"],),
+        ).fetchone()[0]
+        summary_rows = conn.execute(
+            "SELECT COUNT(*) FROM conversation_summary"
+        ).fetchone()[0]
+        conn.close()
+        assert fts_rows == msg_rows
+        assert fuzzy_rows == msg_rows
+        assert hits > 0
+        assert summary_title == "Renamed Zanzibar Thread"
+        assert summary_rows == len(data)
+
+        # Re-running the same export is a no-op
+        again = update_index(export, db_path, progress=False)
+        assert again["unchanged"] == len(data)
+        assert again["index_generation"] == 2
+
+
+def test_build_index_repeated_conversation_replaces_earlier_copy():
+    """Test that a conversation repeated in one export leaves no stale FTS rows."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data = json.loads(SAMPLE_FILE.read_text(encoding="utf-8"))
+        repeat = json.loads(json.dumps(data[1]))  # has code blocks
+        repeat["title"] = "Renamed Zanzibar Thread"
+        export = Path(tmp) / "conversations.json"
+        export.write_text(json.dumps(data + [repeat]), encoding="utf-8")
+        db_path = Path(tmp) / "index.db"
+        build_index(export, db_path, rebuild=True, progress=False)
+        single_path = Path(tmp) / "single.db"
+        build_index(SAMPLE_FILE, single_path, rebuild=True, progress=False)
+
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("INSERT INTO code_fts(code_fts, rank) VALUES('integrity-check', 1)")
+        conn.execute(
+            "INSERT INTO messages_fts(messages_fts, rank) VALUES('integrity-check', 1)"
+        )
+        counts = [
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("messages", "messages_fts", "code_blocks", "code_fts")
+        ]
+        title = conn.execute(
+            "SELECT title FROM conversations WHERE id = ?", (repeat["id"],)
+        ).fetchone()[0]
+        conn.close()
+        conn = sqlite3.connect(str(single_path))
+        single_counts = [
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("messages", "messages_fts", "code_blocks", "code_fts")
+        ]
+        conn.close()
+        assert counts == single_counts
+        assert title == "Renamed Zanzibar Thread"
+
+
+def test_build_index_repeated_message_id_keeps_first_copy():
+    """Test that a message id reused by another conversation leaves no stale FTS rows."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data = json.loads(SAMPLE_FILE.read_text(encoding="utf-8"))
+        # Same message ids (with code blocks) under a new conversation id
+        other = json.loads(json.dumps(data[1]))
+        other["id"] = other["conversation_id"] = "f0000000-0000-0000-0000-0000000000ff"
+        other["title"] = "Borrowed Zanzibar Thread"
+        export = Path(tmp) / "conversations.json"
+        export.write_text(json.dumps(data + [other]), encoding="utf-8")
+        db_path = Path(tmp) / "index.db"
+        build_index(export, db_path, rebuild=True, progress=False, fuzzy=True)
+
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("INSERT INTO code_fts(code_fts, rank) VALUES('integrity-check', 1)")
+        conn.execute(
+            "INSERT INTO messages_fts(messages_fts, rank) VALUES('integrity-check', 1)"
+        )
+        counts = [
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("messages", "messages_fts", "fuzzy_fts", "code_blocks")
+        ]
+        owners = {
+            r[0] for r in conn.execute(
+                "SELECT DISTINCT conversation_id FROM messages WHERE id IN "
+                "(SELECT id FROM messages WHERE conversation_id = ?)",
+                (data[1]["id"],),
+            )
+        }
+        conn.close()
+        single_path = Path(tmp) / "single.db"
+        build_index(SAMPLE_FILE, single_path, rebuild=True, progress=False, fuzzy=True)
+        conn = sqlite3.connect(str(single_path))
+        single_counts = [
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("messages", "messages_fts", "fuzzy_fts", "code_blocks")
+        ]
+        conn.close()
+        assert counts == single_counts
+        assert owners == {data[1]["id"]}
+
+
+def test_refresh_keywords_leaves_one_open_transaction():
+    """Test that the keyword refresh commits nothing itself."""
+    from chatgpt_search.db import get_connection
+    from chatgpt_search.indexer import _refresh_keywords
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "index.db"
+        build_index(SAMPLE_FILE, db_path, rebuild=True, progress=False)
+        snapshot_sql = "SELECT conversation_id, keywords FROM conversation_summary"
+        reader = sqlite3.connect(str(db_path))
+        before = sorted(reader.execute(snapshot_sql))
+
+        conn = get_connection(db_path)
+        conn.execute("UPDATE conversation_summary SET keywords = 'stale'")
+        count = _refresh_keywords(conn, progress=False)
+        assert conn.in_transaction
+        # Readers still see the committed state until the caller commits
+        assert sorted(reader.execute(snapshot_sql)) == before
+        conn.commit()
+        after = sorted(reader.execute(snapshot_sql))
+        reader.close()
+        conn.close()
+        assert count > 0
+        assert after == before
+
+
+def test_build_index_resumes_after_interruption(monkeypatch):
+    """Test that --resume continues a killed build from its checkpoints."""
+    import pytest
+
+    import chatgpt_search.indexer as indexer
+    from chatgpt_search.synthetic import SyntheticConfig, write_export
+
+    with tempfile.TemporaryDirectory() as tmp:
+        export = write_export(
+            Path(tmp) / "export.json",
+            SyntheticConfig(
+                conversations=130,
+                max_turns=2,
+                max_words=40,
+                languages={"en": 1, "ru": 1},
+                seed=7,
+            ),
+        )
+        full_db = Path(tmp) / "full.db"
+        db_path = Path(tmp) / "resumed.db"
+        full = build_index(export, full_db, rebuild=True, progress=False)
+
+        # Killed while indexing: only the first 100 conversations were committed
+        real_index = indexer.index_conversation
+        calls = []
+
+        def _dies_at_110(conn, conv, **kwargs):
+            calls.append(conv.id)
+            if len(calls) > 110:
+                raise KeyboardInterrupt
+            return real_index(conn, conv, **kwargs)
+
+        monkeypatch.setattr(indexer, "index_conversation", _dies_at_110)
+        with pytest.raises(KeyboardInterrupt):
+            build_index(export, db_path, rebuild=True, progress=False)
+        monkeypatch.setattr(indexer, "index_conversation", real_index)
+
+        conn = sqlite3.connect(str(db_path))
+        checkpoint = json.loads(conn.execute(
+            "SELECT value FROM meta WHERE key = 'build_checkpoint'"
+        ).fetchone()[0])
+        conn.close()
+        assert checkpoint["state"] == "indexing"
+        assert checkpoint["conversations"] == 100
+
+        # Killed again after the first TF-IDF language group
+        real_extract = indexer.extract_keywords_tfidf
+
+        def _dies_after_first_group(conn, **kwargs):
+            on_group = kwargs["on_group"]
+
+            def _group_then_die(lang):
+                on_group(lang)
+                raise KeyboardInterrupt
+
+            return real_extract(conn, **{**kwargs, "on_group": _group_then_die})
+
+        monkeypatch.setattr(indexer, "extract_keywords_tfidf", _dies_after_first_group)
+        with pytest.raises(KeyboardInterrupt):
+            build_index(export, db_path, resume=True, progress=False)
+        monkeypatch.setattr(indexer, "extract_keywords_tfidf", real_extract)
+
+        stats = build_index(export, db_path, resume=True, progress=False)
+        assert stats["resumed_from"] == "enriching"
+        assert stats["conversation_count"] == full["conversation_count"]
+        assert stats["message_count"] == full["message_count"]
+        assert stats["keyword_count"] == full["keyword_count"]
+
+        def _snapshot(path):
+            conn = sqlite3.connect(str(path))
+            rows = (
+                sorted(conn.execute("SELECT id FROM messages")),
+                conn.execute("SELECT COUNT(*) FROM messages_fts").fetchone()[0],
+                sorted(conn.execute("SELECT conversation_id, keyword FROM keywords")),
+            )
+            conn.close()
+            return rows
+
+        assert _snapshot(db_path) == _snapshot(full_db)
+
+        with pytest.raises(ValueError, match="Nothing to resume"):
+            build_index(export, db_path, resume=True, progress=False)
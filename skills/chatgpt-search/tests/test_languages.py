@@ -14,6 +14,7 @@ from chatgpt_search.languages import (
     get_stopwords,
     language_feature_matrix,
 )
+from chatgpt_search.db import SCHEMA_VERSION, init_db
 from chatgpt_search.indexer import build_index
 from chatgpt_search.searcher import get_stats, search
 
@@ -222,8 +223,8 @@ def test_search_with_lang_filter():
         db_path.unlink(missing_ok=True)
 
 
-def test_schema_version_is_4():
-    """Test that schema version is 4 after build."""
+def test_schema_version_is_current():
+    """Test that a fresh build is stamped with the current schema version."""
     db_path = _build_test_db()
     try:
         conn = sqlite3.connect(str(db_path))
@@ -232,6 +233,58 @@ def test_schema_version_is_4():
             "SELECT value FROM meta WHERE key = 'schema_version'"
         ).fetchone()
         conn.close()
-        assert row["value"] == "4"
+        assert SCHEMA_VERSION == 12
+        assert row["value"] == "12"
     finally:
         db_path.unlink(missing_ok=True)
+
+
+def test_v4_database_migrates_to_current_version_keeping_languages():
+    """Test that a v4 database migrates to v12 and keeps per-message languages."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "old.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            INSERT INTO meta VALUES ('schema_version', '4');
+            CREATE TABLE conversations (
+                id TEXT PRIMARY KEY, title TEXT, created_at REAL,
+                updated_at REAL, default_model_slug TEXT,
+                message_count INTEGER DEFAULT 0
+            );
+            CREATE TABLE messages (
+                id TEXT PRIMARY KEY, conversation_id TEXT NOT NULL,
+                role TEXT NOT NULL, content TEXT, code TEXT,
+                content_type TEXT, model_slug TEXT, created_at REAL,
+                turn_index INTEGER, lang TEXT
+            );
+            CREATE TABLE keywords (
+                conversation_id TEXT, keyword TEXT, score REAL
+            );
+            CREATE VIRTUAL TABLE messages_fts USING fts5(title, content, code);
+            INSERT INTO conversations VALUES ('c1', 'Reise', 0, 0, NULL, 2);
+            INSERT INTO messages VALUES
+                ('m1', 'c1', 'user', 'Wie komme ich zum Bahnhof?', '', 'text',
+                 NULL, 0, 0, 'de'),
+                ('m2', 'c1', 'assistant', 'Take the second left.', '', 'text',
+                 'gpt-4o', 0, 1, 'en');
+            INSERT INTO messages_fts(rowid, title, content, code)
+                SELECT m.rowid, c.title, m.content, m.code
+                FROM messages m JOIN conversations c ON c.id = m.conversation_id;
+            """
+        )
+        conn.close()
+
+        conn = init_db(db_path)
+        version = conn.execute(
+            "SELECT value FROM meta WHERE key = 'schema_version'"
+        ).fetchone()[0]
+        langs = dict(conn.execute("SELECT id, lang FROM messages"))
+        summary_lang = conn.execute(
+            "SELECT lang FROM conversation_summary WHERE conversation_id = 'c1'"
+        ).fetchone()[0]
+        conn.close()
+        assert version == "12"
+        assert langs == {"m1": "de", "m2": "en"}
+        assert summary_lang in ("de", "en")
@@ -1,9 +1,20 @@
 """Tests for the conversations.json parser."""
 
+import io
 import json
+import os
+import tempfile
+import zipfile
 from pathlib import Path
 
-from chatgpt_search.parser import parse_conversation, parse_export
+import pytest
+
+from chatgpt_search.parser import (
+    _iter_json_array,
+    export_fingerprint,
+    parse_conversation,
+    parse_export,
+)
 
 FIXTURES = Path(__file__).parent / "fixtures"
 SAMPLE_FILE = FIXTURES / "sample_conversations.json"
@@ -63,6 +74,28 @@ def test_parse_conversation_handles_branching():
     pass
 
 
+def test_parse_conversation_indexes_branches_once():
+    """Test that branches=True adds off-thread nodes once, with parent pointers."""
+    data = _load_sample()
+    canonical = parse_conversation(data[3])
+    conv = parse_conversation(data[3], branches=True)
+
+    by_id = {m.id: m for m in conv.messages}
+    assert len(by_id) == len(conv.messages)
+    assert conv.message_count == canonical.message_count
+    for msg in canonical.messages:
+        branch_msg = by_id[msg.id]
+        assert branch_msg.is_canonical
+        assert branch_msg.turn_index == msg.turn_index
+        assert branch_msg.parent_id == msg.parent_id
+
+    extra = [m for m in conv.messages if not m.is_canonical]
+    assert [m.id[-3:] for m in extra] == ["006", "007"]
+    assert extra[0].parent_id == canonical.messages[0].id
+    assert extra[1].parent_id == extra[0].id
+    assert [m.turn_index for m in extra] == [1, 2]
+
+
 def test_parse_export_yields_conversations():
     """Test that parse_export yields valid conversations."""
     convs = list(parse_export(SAMPLE_FILE, progress=False))
@@ -103,3 +136,77 @@ def test_parse_conversation_missing_current_node():
     conv_data = {"mapping": {}, "current_node": None, "title": "Test"}
     conv = parse_conversation(conv_data)
     assert conv is None
+
+
+def test_parse_export_reads_zip_archive(tmp_path):
+    """Test that an export .zip is parsed without extracting it."""
+    archive = tmp_path / "export.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(SAMPLE_FILE, "chatgpt-export/conversations.json")
+        zf.writestr("chatgpt-export/file-abc.png", b"\x89PNG")
+
+    from_zip = list(parse_export(archive, progress=False))
+    from_json = list(parse_export(SAMPLE_FILE, progress=False))
+    assert [c.id for c in from_zip] == [c.id for c in from_json]
+    assert sum(c.message_count for c in from_zip) == sum(
+        c.message_count for c in from_json
+    )
+
+
+def test_parse_export_zip_without_conversations(tmp_path):
+    """Test that an archive missing conversations.json raises ValueError."""
+    archive = tmp_path / "export.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("chat.html", "<html></html>")
+
+    with pytest.raises(ValueError):
+        list(parse_export(archive, progress=False))
+
+
+def test_iter_json_array_small_chunks():
+    """Test that streaming decoding is independent of chunk boundaries."""
+    text = SAMPLE_FILE.read_text(encoding="utf-8")
+    expected = json.loads(text)
+    for chunk_size in (1, 7, 64, 4096):
+        items = list(_iter_json_array(io.StringIO(text), chunk_size=chunk_size))
+        assert items == expected
+
+    assert list(_iter_json_array(io.StringIO(" [ ] "))) == []
+    assert list(_iter_json_array(io.StringIO("[1, 23, 456]"), chunk_size=2)) == [
+        1,
+        23,
+        456,
+    ]
+
+
+def test_iter_json_array_rejects_invalid_input():
+    """Test that non-array and malformed input raise errors."""
+    with pytest.raises(ValueError, match="Expected a JSON array"):
+        list(_iter_json_array(io.StringIO('{"a": 1}')))
+
+    with pytest.raises(json.JSONDecodeError):
+        list(_iter_json_array(io.StringIO('[{"a": 1}, {"b": '), chunk_size=4))
+
+    with pytest.raises(json.JSONDecodeError):
+        list(_iter_json_array(io.StringIO('[{"a": 1} {"b": 2}]')))
+
+
+def test_export_fingerprint_tracks_edges_size_and_mtime(monkeypatch):
+    """Test that the fingerprint changes with the export's ends, size or mtime."""
+    import chatgpt_search.parser as parser
+
+    monkeypatch.setattr(parser, "_FINGERPRINT_EDGE", 16)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "conversations.json"
+        path.write_bytes(b"[" + b"0," * 50 + b"1]")
+        os.utime(path, ns=(1, 1))
+        original = export_fingerprint(path)
+        assert export_fingerprint(path) == original
+
+        path.write_bytes(b"[" + b"0," * 50 + b"2]")  # same size, new tail
+        os.utime(path, ns=(1, 1))
+        assert export_fingerprint(path) != original
+
+        path.write_bytes(b"[" + b"0," * 50 + b"1]")
+        os.utime(path, ns=(2, 2))
+        assert export_fingerprint(path) != original
@@ -1,10 +1,31 @@
 """Tests for the search functionality."""
 
+import json
+import shutil
 import tempfile
 from pathlib import Path
 
+import pytest
+
+from chatgpt_search.db import get_connection, init_db, is_snapshot, publish_snapshot
 from chatgpt_search.indexer import build_index
-from chatgpt_search.searcher import get_conversation, get_stats, search
+from chatgpt_search.searcher import (
+    QueryTrace,
+    RankProfile,
+    SearchFacets,
+    fuzzy_search,
+    get_conversation,
+    get_slow_queries,
+    get_slow_query_summary,
+    get_stats,
+    get_timeline,
+    list_conversations,
+    parse_rank_profile,
+    search,
+    search_code,
+    search_many,
+)
+from chatgpt_search.synthetic import SyntheticConfig, write_export
 
 FIXTURES = Path(__file__).parent / "fixtures"
 SAMPLE_FILE = FIXTURES / "sample_conversations.json"
@@ -134,3 +155,524 @@ def test_search_prefix_query():
         # May or may not have results, but should not error
     finally:
         db_path.unlink(missing_ok=True)
+
+
+def test_search_trace_records_timings_and_plan():
+    """Test that a passed QueryTrace is filled in."""
+    db_path = _build_test_db()
+    try:
+        trace = QueryTrace()
+        results = search(db_path, "python sort", role="user", trace=trace)
+        assert trace.fts_query == "python sort"
+        assert trace.filters == {"role": "user"}
+        assert trace.filter_keys == "role"
+        assert trace.result_count == len(results)
+        assert trace.total_ms >= trace.sql_ms >= 0
+        assert trace.query_plan
+        assert not trace.logged
+        assert get_slow_queries(db_path) == []
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_slow_query_log():
+    """Test that queries over the threshold are logged and reported."""
+    db_path = _build_test_db()
+    try:
+        search(db_path, "the", lang="en", slow_ms=0)
+        search(db_path, "the", slow_ms=10_000)  # fast: not logged
+
+        entries = get_slow_queries(db_path)
+        assert len(entries) == 1
+        assert entries[0].query == "the"
+        assert entries[0].filters == {"lang": "en"}
+        assert entries[0].query_plan
+
+        summary = get_slow_query_summary(db_path)
+        assert summary[0]["filter_keys"] == "lang"
+        assert summary[0]["n"] == 1
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_search_model_filter_partial_match():
+    """Test that --model partial names expand through the models table."""
+    db_path = _build_test_db()
+    try:
+        all_results = search(db_path, "the", limit=100)
+        slugs = {r.model_slug for r in all_results if r.model_slug}
+        assert slugs, "sample data should carry model slugs"
+
+        slug = sorted(slugs)[0]
+        partial = slug[1:-1] if len(slug) > 2 else slug
+        results = search(db_path, "the", model=partial, limit=100)
+        assert results
+        assert all(partial in r.model_slug for r in results)
+
+        assert search(db_path, "the", model="no-such-model") == []
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_conversation_rows_are_compact():
+    """Test that result and message rows carry no per-instance __dict__."""
+    db_path = _build_test_db()
+    try:
+        results = search(db_path, "the", limit=1)
+        assert results
+        assert not hasattr(results[0], "__dict__")
+
+        conv = get_conversation(db_path, results[0].conversation_id)
+        assert not hasattr(conv, "__dict__")
+        assert all(not hasattr(m, "__dict__") for m in conv.messages)
+        assert conv.messages[0].role in ("user", "assistant")
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_get_conversation_lazy_matches_eager():
+    """Test that streamed messages equal the materialised list."""
+    db_path = _build_test_db()
+    try:
+        conv_id = search(db_path, "the", limit=1)[0].conversation_id
+        eager = get_conversation(db_path, conv_id)
+        lazy = get_conversation(db_path, conv_id, lazy=True)
+        assert not isinstance(lazy.messages, list)
+        assert list(lazy.messages) == eager.messages
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_published_snapshot_is_immutable_and_searchable():
+    """Test that snapshots answer queries without WAL files or writes."""
+    db_path = _build_test_db()
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = Path(tmp) / "snapshot.db"
+        try:
+            info = publish_snapshot(db_path, snapshot)
+            assert info["size_mb"] > 0
+            assert is_snapshot(snapshot)
+            assert not is_snapshot(db_path)
+
+            expected = [r.message_id for r in search(db_path, "the", limit=5)]
+            got = [r.message_id for r in search(snapshot, "the", limit=5, slow_ms=0)]
+            assert got == expected
+
+            conn = get_connection(snapshot)
+            assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+            assert conn.execute("SELECT COUNT(*) FROM slow_queries").fetchone()[0] == 0
+            conn.close()
+
+            assert not Path(f"{snapshot}-wal").exists()
+            assert not Path(f"{snapshot}-shm").exists()
+            with pytest.raises(ValueError, match="snapshot"):
+                init_db(snapshot)
+        finally:
+            db_path.unlink(missing_ok=True)
+
+
+def test_search_facets_count_full_match_set():
+    """Test that facets cover all matches while results stay top-N."""
+    db_path = _build_test_db()
+    try:
+        plain = search(db_path, "the", limit=2)
+        facets = SearchFacets()
+        results = search(db_path, "the", limit=2, facets=facets)
+
+        assert [r.message_id for r in results] == [r.message_id for r in plain]
+        assert facets.total == len(search(db_path, "the", limit=1000))
+        assert facets.total > len(results)
+        for counts in (facets.role, facets.model, facets.lang, facets.month):
+            assert sum(counts.values()) == facets.total
+        assert list(facets.role.values()) == sorted(facets.role.values(), reverse=True)
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_timeline_counts_hits_per_bucket():
+    """Test that timeline buckets add up to the dated hit count."""
+    db_path = _build_test_db()
+    try:
+        hits = search(db_path, "the", limit=1000)
+        dated = [r for r in hits if r.created_at is not None]
+        months = get_timeline(db_path, "the", bucket="month")
+        assert sum(b.count for b in months) == len(dated)
+        assert [b.bucket for b in months] == sorted(b.bucket for b in months)
+
+        years = get_timeline(db_path, "the", bucket="year")
+        assert sum(b.count for b in years) == len(dated)
+
+        user_days = get_timeline(db_path, "the", bucket="day", role="user")
+        assert sum(b.count for b in user_days) == len(
+            [r for r in dated if r.role == "user"]
+        )
+
+        with pytest.raises(ValueError):
+            get_timeline(db_path, "the", bucket="fortnight")
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_fuzzy_search_tolerates_typos_in_code():
+    """Test that the trigram index finds near-miss identifiers."""
+    f = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    db_path = Path(f.name)
+    f.close()
+    try:
+        build_index(SAMPLE_FILE, db_path, rebuild=True, progress=False, fuzzy=True)
+
+        assert search(db_path, "pg_isredy", limit=5) == []
+        results = fuzzy_search(db_path, "pg_isredy", limit=5)
+        assert results
+        assert "pg_isready" in results[0].code_snippet
+        assert results[0].rank <= -0.5
+
+        with pytest.raises(ValueError):
+            fuzzy_search(db_path, "pg")
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_fuzzy_search_logs_slow_queries():
+    """Test that slow fuzzy searches reach the slow query log."""
+    f = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    db_path = Path(f.name)
+    f.close()
+    try:
+        build_index(SAMPLE_FILE, db_path, rebuild=True, progress=False, fuzzy=True)
+
+        fuzzy_search(db_path, "pg_isredy", role="assistant", slow_ms=0)
+        fuzzy_search(db_path, "pg_isredy", slow_ms=10_000)  # fast: not logged
+
+        entries = get_slow_queries(db_path)
+        assert len(entries) == 1
+        assert entries[0].query == "pg_isredy"
+        assert entries[0].filters == {"fuzzy": True, "role": "assistant"}
+        assert entries[0].query_plan
+        assert get_slow_query_summary(db_path)[0]["filter_keys"] == "fuzzy+role"
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_fuzzy_search_requires_fuzzy_index():
+    """Test that fuzzy search explains how to build its index."""
+    db_path = _build_test_db()
+    try:
+        with pytest.raises(ValueError, match="fuzzy-index"):
+            fuzzy_search(db_path, "postgres")
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_search_matches_cjk_substrings():
+    """Test that words inside unspaced CJK sentences are searchable."""
+    tmp = Path(tempfile.mkdtemp())
+    export = write_export(
+        tmp / "zh.json",
+        SyntheticConfig(conversations=20, languages={"zh": 1.0}, seed=3),
+    )
+    db_path = tmp / "zh.db"
+    try:
+        build_index(export, db_path, rebuild=True, progress=False)
+
+        # unicode61 alone indexes each sentence as a single token
+        conn = get_connection(db_path)
+        plain = conn.execute(
+            "SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH '数据'"
+        ).fetchone()[0]
+        conn.close()
+        assert plain == 0
+
+        results = search(db_path, "数据", limit=50)
+        assert results
+        assert all("数据" in r.content_snippet + r.conversation_title for r in results)
+        assert search(db_path, "据", limit=5)
+        assert get_timeline(db_path, "数据")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_search_many_matches_individual_searches():
+    """Test that a batch yields per-query results in order, isolating bad queries."""
+    db_path = _build_test_db()
+    try:
+        queries = ["postgres", '"unterminated', "kubernetes", "数据"]
+        batch = list(search_many(db_path, iter(queries), role="user", limit=3))
+        assert [b.query for b in batch] == queries
+        assert batch[1].error and not batch[1].results
+        for item in (batch[0], batch[2], batch[3]):
+            assert item.error is None
+            assert item.results == search(db_path, item.query, role="user", limit=3)
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_search_code_returns_individual_blocks():
+    """Test that code search hits single blocks and filters by fence language."""
+    db_path = _build_test_db()
+    try:
+        results = search_code(db_path, "pg_isready", limit=5)
+        assert results
+        assert all(r.fence_lang == "yaml" for r in results)
+        assert all("pg_isready" in r.code_snippet for r in results)
+        assert all("```" not in r.code_snippet for r in results)
+
+        assert search_code(db_path, "pg_isready", code_lang="yml")
+        assert search_code(db_path, "pg_isready", code_lang="python") == []
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_search_collapses_identical_bodies():
+    """Test that messages with the same body are stored once and hit once."""
+    tmp = Path(tempfile.mkdtemp())
+    data = json.loads(SAMPLE_FILE.read_text(encoding="utf-8"))
+    copy = json.loads(json.dumps(data[0]).replace("a0000000-", "e0000000-"))
+    copy["title"] = "Sorting again"
+    export = tmp / "conversations.json"
+    export.write_text(json.dumps(data + [copy]), encoding="utf-8")
+    db_path = tmp / "index.db"
+    try:
+        build_index(export, db_path, rebuild=True, progress=False)
+
+        stats = get_stats(db_path)
+        copied = len(get_conversation(db_path, copy["conversation_id"]).messages)
+        assert stats.body_count <= stats.message_count - copied
+
+        collapsed = search(db_path, "dictionaries")
+        expanded = search(db_path, "dictionaries", collapse=False)
+        assert len(expanded) == len(collapsed) + sum(r.duplicates for r in collapsed)
+        assert collapsed[0].duplicates == 1
+        assert collapsed[0].rank == expanded[0].rank
+        assert all(r.duplicates == 0 for r in expanded)
+
+        facets = SearchFacets()
+        assert search(db_path, "dictionaries", facets=facets) == collapsed
+        assert facets.total == len(expanded)
+        batch = list(search_many(db_path, ["dictionaries"], collapse=False))
+        assert batch[0].results == expanded
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_search_folds_near_duplicate_bodies():
+    """Test that near-duplicate bodies are folded into the best-ranked hit."""
+    tmp = Path(tempfile.mkdtemp())
+    data = json.loads(SAMPLE_FILE.read_text(encoding="utf-8"))
+    # Same conversation with small edits: distinct bodies, near-identical text
+    text = json.dumps(data[0]).replace("a0000000-", "e0000000-")
+    copy = json.loads(text.replace("in Python?", "in Python??"))
+    copy["title"] = "Sorting again"
+    export = tmp / "conversations.json"
+    export.write_text(json.dumps(data + [copy]), encoding="utf-8")
+    db_path = tmp / "index.db"
+    try:
+        build_index(export, db_path, rebuild=True, progress=False)
+
+        folded = search(db_path, "dictionaries")
+        expanded = search(db_path, "dictionaries", collapse=False)
+        assert len(expanded) == len(folded) + sum(r.similar for r in folded)
+        assert folded[0].similar == 1
+        assert folded[0].duplicates == 0
+        assert folded[0].rank == expanded[0].rank
+        assert all(r.similar == 0 for r in expanded)
+
+        facets = SearchFacets()
+        assert search(db_path, "dictionaries", facets=facets) == folded
+        assert facets.total == len(expanded)
+        batch = list(search_many(db_path, ["dictionaries"]))
+        assert batch[0].results == folded
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_search_keeps_distinct_short_prompts_apart():
+    """Test that short prompts sharing most of their words are not folded."""
+    tmp = Path(tempfile.mkdtemp())
+    data = json.loads(SAMPLE_FILE.read_text(encoding="utf-8"))
+    text = json.dumps(data[0])
+    prompts = {
+        "b": "What is the capital of France?",
+        "c": "What is the capital of Spain?",
+        "d": "How do I install numpy?",
+        "e": "How do I install pandas?",
+    }
+    convs = []
+    for prefix, prompt in prompts.items():
+        conv = json.loads(text.replace("a0000000-", f"{prefix}0000000-"))
+        for node in conv["mapping"].values():
+            message = node.get("message")
+            if message and message["author"]["role"] == "user":
+                message["content"]["parts"] = [prompt]
+        convs.append(conv)
+    export = tmp / "conversations.json"
+    export.write_text(json.dumps(data + convs), encoding="utf-8")
+    db_path = tmp / "index.db"
+    try:
+        build_index(export, db_path, rebuild=True, progress=False)
+
+        for query in ("capital", "install"):
+            results = search(db_path, query, role="user")
+            assert len(results) == 2
+            assert all(r.similar == 0 for r in results)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_search_refetches_when_near_duplicates_fold(monkeypatch):
+    """Test that folding still returns `limit` results when most hits fold."""
+    import chatgpt_search.searcher as searcher
+
+    monkeypatch.setattr(searcher, "_SIMILAR_OVERFETCH", 2)
+    tmp = Path(tempfile.mkdtemp())
+    data = json.loads(SAMPLE_FILE.read_text(encoding="utf-8"))
+    text = json.dumps(data[0])
+    copies = [
+        json.loads(
+            text.replace("a0000000-", f"{prefix}0000000-")
+            .replace("in Python?", "in Python" + "?" * n)
+        )
+        for n, prefix in enumerate("bcd", 2)
+    ]
+    other = json.loads(text.replace("a0000000-", "f0000000-"))
+    for node in other["mapping"].values():
+        message = node.get("message")
+        if message and message["author"]["role"] == "user":
+            message["content"]["parts"] = [
+                "Unrelated question that mentions dictionaries once, buried in a "
+                "long paragraph about hash tables, load factors and open addressing "
+                "strategies for collision resolution in interpreters."
+            ]
+    export = tmp / "conversations.json"
+    export.write_text(json.dumps(data + copies + [other]), encoding="utf-8")
+    db_path = tmp / "index.db"
+    try:
+        build_index(export, db_path, rebuild=True, progress=False)
+
+        expanded = search(db_path, "dictionaries", collapse=False)
+        results = search(db_path, "dictionaries", limit=2)
+        assert len(expanded) == 5
+        assert len(results) == 2
+        assert sum(r.similar for r in results) == 3
+        batch = list(search_many(db_path, ["dictionaries"], limit=2))
+        assert batch[0].results == results
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_search_include_branches():
+    """Test that branch messages are indexed on request and searched on opt-in."""
+    tmp = Path(tempfile.mkdtemp())
+    db_path = tmp / "index.db"
+    try:
+        build_index(SAMPLE_FILE, db_path, rebuild=True, progress=False, branches=True)
+
+        assert search(db_path, "alternate branch") == []
+        results = search(db_path, "alternate branch", include_branches=True)
+        assert [r.is_canonical for r in results] == [False]
+        assert get_timeline(db_path, "alternate branch") == []
+        assert get_timeline(db_path, "alternate branch", include_branches=True)
+
+        view = get_conversation(db_path, results[0].conversation_id)
+        assert not any("alternate" in (m.content or "") for m in view.messages)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_list_conversations_sorts_filters_and_pages():
+    """Test that listings come from conversation_summary with sort, filters and paging."""
+    db_path = _build_test_db()
+    try:
+        convs = list_conversations(db_path, limit=100)
+        conn = get_connection(db_path)
+        expected = conn.execute(
+            "SELECT COUNT(*) FROM conversations"
+        ).fetchone()[0]
+        code_blocks = conn.execute("SELECT COUNT(*) FROM code_blocks").fetchone()[0]
+        conn.close()
+
+        assert len(convs) == expected
+        dates = [c.created_at for c in convs]
+        assert dates == sorted(dates, reverse=True)
+        assert sum(c.code_count for c in convs) == code_blocks
+        assert all(c.word_count > 0 and c.first_prompt for c in convs)
+        assert any(c.keywords for c in convs)
+
+        by_words = list_conversations(db_path, sort="words", reverse=True, limit=100)
+        words = [c.word_count for c in by_words]
+        assert words == sorted(words)
+
+        first, second = (
+            list_conversations(db_path, sort="title", limit=2, offset=offset)
+            for offset in (0, 2)
+        )
+        titles = [c.title for c in first + second]
+        assert titles == sorted(titles, key=str.lower)
+        assert not {c.id for c in first} & {c.id for c in second}
+
+        model = convs[0].model
+        assert all(
+            c.model == model for c in list_conversations(db_path, model=model)
+        )
+        assert list_conversations(db_path, lang="xx") == []
+        with pytest.raises(ValueError):
+            list_conversations(db_path, sort="size")
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_rank_profile_applies_recency_and_role_in_sql():
+    """Test that ranking profiles rescore hits inside the query."""
+    import time
+
+    db_path = _build_test_db()
+    try:
+        base = {
+            r.message_id: r
+            for r in search(db_path, "python", limit=100, collapse=False)
+        }
+        assert len(base) > 3
+
+        same = search(
+            db_path, "python", limit=100, collapse=False,
+            rank_profile=parse_rank_profile("default"),
+        )
+        assert [(r.message_id, r.rank) for r in same] == [
+            (r.message_id, r.rank) for r in base.values()
+        ]
+
+        # Hyperbolic decay: bm25 / (1 + age / half_life)
+        profile = RankProfile(half_life_days=30.0, role_weights={"user": 3.0})
+        ranked = search(
+            db_path, "python", limit=100, collapse=False, rank_profile=profile
+        )
+        end_of_day = (int(time.time()) // 86400 + 1) * 86400
+        for r in ranked:
+            age = max(end_of_day - (r.created_at or end_of_day), 0)
+            expected = base[r.message_id].rank / (1 + age / (30.0 * 86400))
+            if r.role == "user":
+                expected *= 3.0
+            assert r.rank == pytest.approx(expected)
+        assert [r.rank for r in ranked] == sorted(r.rank for r in ranked)
+
+        # The top N under a profile is selected in SQL, not by re-sorting N
+        top = search(db_path, "python", limit=3, collapse=False, rank_profile=profile)
+        assert [r.message_id for r in top] == [r.message_id for r in ranked[:3]]
+    finally:
+        db_path.unlink(missing_ok=True)
+
+
+def test_parse_rank_profile():
+    """Test --rank profile names and overrides."""
+    profile = parse_rank_profile("recent-user,code=2,assistant=0.5,half_life=30")
+    assert profile.code == 2.0
+    assert profile.half_life_days == 30.0
+    assert profile.role_weights == {"user": 1.5, "assistant": 0.5}
+    assert parse_rank_profile("title=5").title == 5.0
+    assert parse_rank_profile("recent,half_life=0").half_life_days is None
+    # Overrides never leak into the named profile
+    assert parse_rank_profile("recent-user").role_weights == {"user": 1.5}
+
+    for spec in ("newest", "title=-1", "title=abc", "speed=2", "recent,user"):
+        with pytest.raises(ValueError):
+            parse_rank_profile(spec)
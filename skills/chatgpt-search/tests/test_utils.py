@@ -1,9 +1,16 @@
 """Tests for text processing utilities."""
 
 from chatgpt_search.utils import (
+    clean_and_split,
+    clean_and_split_blocks,
     clean_text,
     extract_text_from_parts,
+    has_cjk,
+    minhash_bands,
     parse_date_filter,
+    segment_cjk,
+    shingle_hashes,
+    shingle_jaccard,
     separate_code,
     strip_citeturn,
     strip_pua,
@@ -123,3 +130,68 @@ def test_truncate_long():
     result = truncate(long_text, 200)
     assert len(result) == 200
     assert result.endswith("...")
+
+
+def test_clean_and_split_matches_multi_pass_pipeline():
+    text = (
+        "Intro \ue200cite\ue202turn0search1\ue201 text\n\n\n\n"
+        "```python\nprint('hi')\n```"
+        "Outro \u043f\u0440\u0438\u0432\u0435\u0442\ue000"
+    )
+    assert clean_and_split(text) == separate_code(clean_text(text))
+
+
+def test_clean_and_split_plain_text_fast_path():
+    assert clean_and_split("  Just prose\n\nhere  ") == ("Just prose\n\nhere", "")
+
+
+def test_clean_and_split_collapses_newlines_left_by_code():
+    text = "Before\n\n```bash\nls\n```\n\nAfter"
+    prose, code = clean_and_split(text)
+    assert prose == "Before\n\nAfter"
+    assert code == "ls"
+
+
+def test_segment_cjk_emits_overlapping_bigrams():
+    assert segment_cjk("東京都庁 tower") == " 東京 京都 都庁 庁  tower"
+    assert segment_cjk("字") == " 字 "
+    assert segment_cjk("plain text") == "plain text"
+    assert has_cjk("검색 query")
+    assert not has_cjk("Привет")
+
+
+def test_clean_and_split_blocks_keeps_fence_languages():
+    text = "Intro\n```py\nprint(1)\n```\nMid\n```c++\nint x;\n```\n```\nraw\n```"
+    prose, blocks = clean_and_split_blocks(text)
+    assert prose == "Intro\n\nMid"
+    assert blocks == [("python", "print(1)"), ("c++", "int x;"), (None, "raw")]
+    assert clean_and_split(text) == (prose, "print(1)\n\nint x;\n\nraw")
+
+
+def test_minhash_bands_match_near_duplicates():
+    text = (
+        "You can use the built-in sorted function with a key argument. "
+        "The sorted function returns a new list while preserving the original."
+    )
+    variant = text.replace("original.", "original!").replace("key", "Key")
+    unrelated = "Check the worker core dump with gdb and look for the segfault."
+
+    def shared(a, b):
+        return sum(a[i : i + 8] == b[i : i + 8] for i in range(0, 64, 8))
+
+    bands = minhash_bands(text)
+    assert len(bands) == 64
+    assert minhash_bands("  " + text.upper() + "\n") == bands
+    assert shared(bands, minhash_bands(variant)) >= 1
+    assert shared(bands, minhash_bands(unrelated)) == 0
+    assert minhash_bands("ok") is None
+
+
+def test_shingle_jaccard_separates_short_prompts():
+    france = shingle_hashes("What is the capital of France?")
+    spain = shingle_hashes("What is the capital of Spain?")
+    typo = shingle_hashes("What is the capitol of France?")
+    assert shingle_jaccard(france, france) == 1.0
+    assert shingle_jaccard(france, spain) < 0.8
+    assert shingle_jaccard(france, typo) > shingle_jaccard(france, spain)
+    assert shingle_jaccard(france, set()) == 0.0
@@ -0,0 +1,109 @@
+"""Tests for the export directory watcher."""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from chatgpt_search.searcher import get_stats
+from chatgpt_search.watcher import find_exports, watch
+
+FIXTURES = Path(__file__).parent / "fixtures"
+SAMPLE_FILE = FIXTURES / "sample_conversations.json"
+
+
+def test_watch_once_indexes_new_exports():
+    """Test that a single watch pass indexes exports dropped in the folder."""
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = Path(tmp) / "inbox"
+        inbox.mkdir()
+        db_path = Path(tmp) / "index.db"
+        shutil.copy(SAMPLE_FILE, inbox / "conversations.json")
+        with zipfile.ZipFile(inbox / "export.zip", "w") as archive:
+            archive.write(SAMPLE_FILE, "conversations.json")
+        (inbox / "notes.txt").write_text("ignored", encoding="utf-8")
+
+        assert set(find_exports(inbox)) == {
+            inbox / "conversations.json",
+            inbox / "export.zip",
+        }
+
+        seen = []
+        watch(
+            inbox,
+            db_path,
+            once=True,
+            progress=False,
+            on_indexed=lambda path, stats: seen.append(stats),
+        )
+
+        assert len(seen) == 2
+        # The second export holds the same conversations, so nothing changes
+        assert seen[1]["unchanged"] == seen[0]["added"]
+        stats = get_stats(db_path)
+        assert stats.conversation_count == seen[0]["added"]
+        assert stats.index_generation == 1
+
+
+class _StopWatching(Exception):
+    pass
+
+
+def test_watch_retries_exports_that_failed(monkeypatch):
+    """Test that a locked database is logged and retried on the next poll."""
+    import chatgpt_search.watcher as watcher
+
+    errors = [sqlite3.OperationalError("database is locked")] * 2
+    calls = []
+
+    def flaky_update(path, db_path, progress=True):
+        calls.append(path)
+        if errors:
+            raise errors.pop(0)
+        return {"added": 1}
+
+    def stop(path, stats):
+        raise _StopWatching
+
+    monkeypatch.setattr(watcher, "update_index", flaky_update)
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(SAMPLE_FILE, Path(tmp) / "conversations.json")
+        with pytest.raises(_StopWatching):
+            watch(Path(tmp), Path(tmp) / "index.db", interval=0,
+                  progress=False, on_indexed=stop)
+
+    assert len(calls) == 3
+
+
+def test_watch_skips_broken_export_until_it_changes(monkeypatch):
+    """Test that an unreadable export is not retried until its signature changes."""
+    import chatgpt_search.watcher as watcher
+
+    calls = []
+    polls = []
+
+    def broken_update(path, db_path, progress=True):
+        calls.append(path)
+        raise ValueError("Invalid JSON")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        export = Path(tmp) / "conversations.json"
+        shutil.copy(SAMPLE_FILE, export)
+
+        def sleep(interval):
+            polls.append(interval)
+            if len(polls) == 5:
+                os.utime(export, ns=(1, 1))  # the file changes
+            if len(polls) == 10:
+                raise _StopWatching
+
+        monkeypatch.setattr(watcher, "update_index", broken_update)
+        monkeypatch.setattr(watcher.time, "sleep", sleep)
+        with pytest.raises(_StopWatching):
+            watch(Path(tmp), Path(tmp) / "index.db", interval=0, progress=False)
+
+    assert len(calls) == 2